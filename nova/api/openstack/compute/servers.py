@@ -15,9 +15,11 @@
 #    under the License.
 
 import copy
+import hashlib
 
 from oslo_log import log as logging
 import oslo_messaging as messaging
+from oslo_serialization import jsonutils
 from oslo_utils import strutils
 from oslo_utils import timeutils
 from oslo_utils import uuidutils
@@ -40,6 +42,7 @@ from nova.api.openstack.compute import user_data
 from nova.api.openstack.compute.views import servers as views_servers
 from nova.api.openstack import wsgi
 from nova.api import validation
+from nova import cache_utils
 from nova import compute
 from nova.compute import flavors
 from nova.compute import utils as compute_utils
@@ -133,6 +136,18 @@ class ServersController(wsgi.Controller):
         super(ServersController, self).__init__(**kwargs)
         self.compute_api = compute.API()
 
+        self._list_cache = None
+        if CONF.api.server_list_cache_ttl:
+            if CONF.cache.enabled:
+                self._list_cache = cache_utils.get_client(
+                    expiration_time=CONF.api.server_list_cache_ttl)
+            else:
+                # Without [cache], every page would be kept in the memory
+                # of the API worker until the same page is requested again.
+                LOG.warning("The [api]server_list_cache_ttl option is set "
+                            "but the [cache]enabled option is not, server "
+                            "list pages are not cached.")
+
         # TODO(alex_xu): The final goal is that merging all of
         # extended json-schema into server main json-schema.
         self._create_schema(self.schema_server_create_v263, '2.63')
@@ -302,6 +317,19 @@ class ServersController(wsgi.Controller):
             context, sort_keys, sort_dirs,
             schema_servers.SERVER_LIST_IGNORE_SORT_KEY, ('host', 'node'))
 
+        # The pages listing the servers of the requester's project are
+        # cached once extended, and served again as long as no server of the
+        # project changed since.
+        list_cache_key = list_cache_mark = None
+        if self._list_cache and context.project_id and not all_tenants:
+            list_cache_mark = self.compute_api.get_changes_mark(
+                context, context.project_id)
+        if list_cache_mark is not None:
+            list_cache_key = self._get_list_cache_key(req, is_detail)
+            cached = self._list_cache.get(list_cache_key)
+            if cached and cached['mark'] == list_cache_mark:
+                return wsgi.ResponseObject(cached['body'], extended=True)
+
         expected_attrs = []
         if is_detail:
             if api_version_request.is_supported(req, '2.16'):
@@ -336,8 +364,23 @@ class ServersController(wsgi.Controller):
         else:
             response = self._view_builder.index(req, instance_list)
         req.cache_db_instances(instance_list)
+
+        if list_cache_key:
+            def _cache_response(body):
+                self._list_cache.set(list_cache_key,
+                                     {'mark': list_cache_mark, 'body': body})
+            req.set_extended_response_callback(_cache_response)
         return response
 
+    @staticmethod
+    def _get_list_cache_key(req, is_detail):
+        context = req.environ['nova.context']
+        key = [context.project_id, context.user_id, context.is_admin,
+               sorted(context.roles), req.api_version_request.get_string(),
+               req.application_url, is_detail, sorted(req.GET.items())]
+        return 'server-list-%s' % hashlib.sha256(
+            utils.utf8(jsonutils.dumps(key))).hexdigest()
+
     def _get_server(self, context, req, instance_uuid, is_detail=False):
         """Utility function for looking up an instance by uuid.
 
@@ -28,6 +28,7 @@ from oslo_db import api as oslo_db_api
 from oslo_db import exception as db_exc
 from oslo_log import log as logging
 from oslo_utils import encodeutils
+from oslo_utils import timeutils
 from oslo_versionedobjects import base
 from oslo_versionedobjects import fields
 import six
@@ -912,6 +913,10 @@ class ResourceProvider(base.VersionedObject, base.TimestampedObject):
         """
         _set_aggregates(self._context, self, aggregate_uuids,
                         increment_generation=increment_generation)
+        # Only clear the cached lookups once the transaction is committed,
+        # otherwise a concurrent request could cache the old associations
+        # again before the change is visible.
+        _PROVIDER_IDS_CACHE.clear()
 
     def set_traits(self, traits):
         """Replaces the set of traits associated with the resource provider
@@ -921,6 +926,7 @@ class ResourceProvider(base.VersionedObject, base.TimestampedObject):
                        associate with the provider.
         """
         _set_traits(self._context, self, traits)
+        _PROVIDER_IDS_CACHE.clear()
         self.obj_reset_changes()
 
     @db_api.placement_context_manager.writer
@@ -2666,6 +2672,76 @@ def _get_provider_ids_having_all_traits(ctx, required_traits):
     return [r[0] for r in ctx.session.execute(sel)]
 
 
+class _ProviderIdsCache(object):
+    """A process-local cache of the results of the allocation candidates
+    lookups which do not depend on the usage of the providers, like the
+    providers having some traits or associated with some aggregates.
+
+    Entries expire after [placement]/allocation_candidates_cache_ttl seconds
+    and the whole cache is cleared when this process changes the traits or
+    aggregates of a provider. Changes made by other processes are seen once
+    the entries expire.
+    """
+
+    # Bound the memory used by the cache if requests use many distinct sets
+    # of traits and aggregates.
+    MAX_ENTRIES = 1024
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, key, fetch, *args):
+        """Returns the cached value for key, calling fetch(*args) to get it
+        if it is not cached or has expired.
+        """
+        ttl = CONF.placement.allocation_candidates_cache_ttl
+        if not ttl:
+            return fetch(*args)
+        entry = self._entries.get(key)
+        if entry is not None and not timeutils.is_older_than(entry[0], ttl):
+            return entry[1]
+        fetched_at = timeutils.utcnow()
+        value = fetch(*args)
+        if len(self._entries) >= self.MAX_ENTRIES:
+            self._entries.clear()
+        self._entries[key] = (fetched_at, value)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+_PROVIDER_IDS_CACHE = _ProviderIdsCache()
+
+
+def _cached_provider_ids_having_any_trait(ctx, traits):
+    """Cached version of _get_provider_ids_having_any_trait()."""
+    key = ('any_trait', frozenset(traits.values()))
+    return _PROVIDER_IDS_CACHE.get(
+        key, _get_provider_ids_having_any_trait, ctx, traits)
+
+
+def _cached_provider_ids_having_all_traits(ctx, required_traits):
+    """Cached version of _get_provider_ids_having_all_traits()."""
+    key = ('all_traits', frozenset(required_traits.values()))
+    return _PROVIDER_IDS_CACHE.get(
+        key, _get_provider_ids_having_all_traits, ctx, required_traits)
+
+
+def _cached_provider_ids_matching_aggregates(ctx, member_of, rp_ids=None):
+    """Cached version of _provider_ids_matching_aggregates().
+
+    The providers matching the aggregates are cached regardless of rp_ids,
+    and then limited to the ones in rp_ids.
+    """
+    key = ('member_of', tuple(frozenset(members) for members in member_of))
+    res = _PROVIDER_IDS_CACHE.get(
+        key, _provider_ids_matching_aggregates, ctx, member_of)
+    if rp_ids:
+        res = [rp_id for rp_id in res if rp_id in rp_ids]
+    return res
+
+
 @db_api.placement_context_manager.reader
 def _has_provider_trees(ctx):
     """Simple method that returns whether provider trees (i.e. nested resource
@@ -2710,11 +2786,12 @@ def _get_provider_ids_matching(ctx, resources, required_traits,
     trait_rps = None
     forbidden_rp_ids = None
     if required_traits:
-        trait_rps = _get_provider_ids_having_all_traits(ctx, required_traits)
+        trait_rps = _cached_provider_ids_having_all_traits(
+            ctx, required_traits)
         if not trait_rps:
             return []
     if forbidden_traits:
-        forbidden_rp_ids = _get_provider_ids_having_any_trait(
+        forbidden_rp_ids = _cached_provider_ids_having_any_trait(
             ctx, forbidden_traits)
 
     rpt = sa.alias(_RP_TBL, name="rp")
@@ -2801,7 +2878,8 @@ def _get_provider_ids_matching(ctx, resources, required_traits,
     # If 'member_of' has values, do a separate lookup to identify the
     # resource providers that meet the member_of constraints.
     if member_of:
-        rps_in_aggs = _provider_ids_matching_aggregates(ctx, member_of)
+        rps_in_aggs = _cached_provider_ids_matching_aggregates(
+            ctx, member_of)
         if not rps_in_aggs:
             # Short-circuit. The user either asked for a non-existing
             # aggregate or there were no resource providers that matched
@@ -3088,8 +3166,8 @@ def _get_trees_matching_all(ctx, resources, required_traits, forbidden_traits,
     # If 'member_of' has values, do a separate lookup to identify the
     # resource providers that meet the member_of constraints.
     if member_of:
-        rps_in_aggs = _provider_ids_matching_aggregates(ctx, member_of,
-                                                        rp_ids=trees_with_inv)
+        rps_in_aggs = _cached_provider_ids_matching_aggregates(
+            ctx, member_of, rp_ids=trees_with_inv)
         if not rps_in_aggs:
             # Short-circuit. The user either asked for a non-existing
             # aggregate or there were no resource providers that matched
@@ -3317,7 +3395,8 @@ def _check_traits_for_alloc_request(res_requests, summaries, prov_traits,
     return all_prov_ids
 
 
-def _alloc_candidates_single_provider(ctx, requested_resources, rp_tuples):
+def _alloc_candidates_single_provider(ctx, requested_resources, rp_tuples,
+                                      limit=None):
     """Returns a tuple of (allocation requests, provider summaries) for a
     supplied set of requested resource amounts and resource providers. The
     supplied resource providers have capacity to satisfy ALL of the resources
@@ -3337,10 +3416,22 @@ def _alloc_candidates_single_provider(ctx, requested_resources, rp_tuples):
                                 being requested for that resource class
     :param rp_tuples: List of two-tuples of (provider ID, root provider ID)s
                       for providers that matched the requested resources
+    :param limit: An optional integer, N, of allocation requests the caller
+                  will at most use. Every provider has at least one allocation
+                  request, so only N of the providers are considered. If
+                  CONF.placement.randomize_allocation_candidates is True they
+                  are a random sampling of the providers, otherwise the first
+                  N of them.
     """
     if not rp_tuples:
         return [], []
 
+    if limit and limit < len(rp_tuples):
+        if CONF.placement.randomize_allocation_candidates:
+            rp_tuples = random.sample(rp_tuples, limit)
+        else:
+            rp_tuples = rp_tuples[:limit]
+
     # Get all root resource provider IDs.
     root_ids = set(p[1] for p in rp_tuples)
 
@@ -3381,7 +3472,7 @@ def _alloc_candidates_single_provider(ctx, requested_resources, rp_tuples):
 
 
 def _alloc_candidates_multiple_providers(ctx, requested_resources,
-        required_traits, forbidden_traits, rp_tuples):
+        required_traits, forbidden_traits, rp_tuples, limit=None):
     """Returns a tuple of (allocation requests, provider summaries) for a
     supplied set of requested resource amounts and tuples of
     (rp_id, root_id, rc_id). The supplied resource provider trees have
@@ -3406,76 +3497,111 @@ def _alloc_candidates_multiple_providers(ctx, requested_resources,
     :param rp_tuples: List of tuples of (provider ID, anchor root provider ID,
                       resource class ID)s for providers that matched the
                       requested resources
+    :param limit: An optional integer, N, of allocation requests the caller
+                  will at most use. The provider trees are then processed in
+                  batches of N trees, and no more batches are processed once
+                  N allocation requests have been found. If
+                  CONF.placement.randomize_allocation_candidates is True the
+                  trees are processed in a random order.
     """
     if not rp_tuples:
         return [], []
 
-    # Get all the root resource provider IDs. We should include the first
-    # values of rp_tuples because while sharing providers are root providers,
-    # they have their "anchor" providers for the second value.
-    root_ids = set(p[0] for p in rp_tuples) | set(p[1] for p in rp_tuples)
-
-    # Grab usage summaries for each provider in the trees
-    usages = _get_usages_by_provider_tree(ctx, root_ids)
-
-    # Get a dict, keyed by resource provider internal ID, of trait string names
-    # that provider has associated with it
-    prov_traits = _get_traits_by_provider_tree(ctx, root_ids)
-
-    # Get a dict, keyed by resource provider internal ID, of ProviderSummary
-    # objects for all providers
-    summaries = _build_provider_summaries(ctx, usages, prov_traits)
-
-    # Get a dict, keyed by root provider internal ID, of a dict, keyed by
-    # resource class internal ID, of lists of AllocationRequestResource objects
-    tree_dict = collections.defaultdict(lambda: collections.defaultdict(list))
-
-    for rp_id, root_id, rc_id in rp_tuples:
-        rp_summary = summaries[rp_id]
-        rp_uuid = rp_summary.resource_provider.uuid
-        tree_dict[root_id][rc_id].append(
-            AllocationRequestResource(
-                ctx, resource_provider=ResourceProvider.get_by_uuid(ctx,
-                                                                    rp_uuid),
-                resource_class=_RC_CACHE.string_from_id(rc_id),
-                amount=requested_resources[rc_id]))
+    # Group the tuples by anchor root provider, in the order they come in.
+    tuples_by_root = collections.OrderedDict()
+    for rp_tuple in rp_tuples:
+        tuples_by_root.setdefault(rp_tuple[1], []).append(rp_tuple)
+    anchor_ids = list(tuples_by_root)
+    batch_size = len(anchor_ids)
+    if limit:
+        batch_size = limit
+        if CONF.placement.randomize_allocation_candidates:
+            random.shuffle(anchor_ids)
 
     # Next, build up a list of allocation requests. These allocation requests
     # are AllocationRequest objects, containing resource provider UUIDs,
     # resource class names and amounts to consume from that resource provider
     alloc_requests = []
 
-    # Build a list of lists of provider internal IDs that end up in
+    # Build a set of tuples of provider internal IDs that end up in
     # allocation request objects. This is used to ensure we don't end up
     # having allocation requests with duplicate sets of resource providers.
-    alloc_prov_ids = []
-
-    # Let's look into each tree
-    for root_id, alloc_dict in tree_dict.items():
-        # Get request_groups, which is a list of lists of
-        # AllocationRequestResource per requested resource class.
-        request_groups = alloc_dict.values()
-
-        root_summary = summaries[root_id]
-        root_uuid = root_summary.resource_provider.uuid
-
-        # Using itertools.product, we get all the combinations of resource
-        # providers in a tree.
-        for res_requests in itertools.product(*request_groups):
-            all_prov_ids = _check_traits_for_alloc_request(res_requests,
-                summaries, prov_traits, required_traits, forbidden_traits)
-            if (not all_prov_ids) or (all_prov_ids in alloc_prov_ids):
-                # This combination doesn't satisfy trait constraints,
-                # ...or we already have this permutation, which happens
-                # when multiple sharing providers with different resource
-                # classes are in one request.
-                continue
-            alloc_prov_ids.append(all_prov_ids)
-            alloc_requests.append(
-                AllocationRequest(ctx, resource_requests=list(res_requests),
-                                  anchor_root_provider_uuid=root_uuid)
-            )
-    return alloc_requests, list(summaries.values())
+    alloc_prov_ids = set()
+
+    # Dict, keyed by resource provider internal ID, of ProviderSummary
+    # objects for the providers of all the processed trees
+    all_summaries = {}
+
+    for start in range(0, len(anchor_ids), batch_size):
+        if limit and len(alloc_requests) >= limit:
+            break
+        batch_tuples = [rp_tuple
+                        for anchor_id in anchor_ids[start:start + batch_size]
+                        for rp_tuple in tuples_by_root[anchor_id]]
+
+        # Get all the root resource provider IDs. We should include the first
+        # values of rp_tuples because while sharing providers are root
+        # providers, they have their "anchor" providers for the second value.
+        root_ids = (set(p[0] for p in batch_tuples) |
+                    set(p[1] for p in batch_tuples))
+
+        # Grab usage summaries for each provider in the trees
+        usages = _get_usages_by_provider_tree(ctx, root_ids)
+
+        # Get a dict, keyed by resource provider internal ID, of trait string
+        # names that provider has associated with it
+        prov_traits = _get_traits_by_provider_tree(ctx, root_ids)
+
+        # Get a dict, keyed by resource provider internal ID, of
+        # ProviderSummary objects for all providers
+        summaries = _build_provider_summaries(ctx, usages, prov_traits)
+        all_summaries.update(summaries)
+
+        # Get a dict, keyed by root provider internal ID, of a dict, keyed by
+        # resource class internal ID, of lists of AllocationRequestResource
+        # objects
+        tree_dict = collections.OrderedDict()
+
+        for rp_id, root_id, rc_id in batch_tuples:
+            rp_summary = summaries[rp_id]
+            rp_uuid = rp_summary.resource_provider.uuid
+            alloc_dict = tree_dict.setdefault(root_id,
+                                              collections.OrderedDict())
+            alloc_dict.setdefault(rc_id, []).append(
+                AllocationRequestResource(
+                    ctx, resource_provider=ResourceProvider.get_by_uuid(
+                        ctx, rp_uuid),
+                    resource_class=_RC_CACHE.string_from_id(rc_id),
+                    amount=requested_resources[rc_id]))
+
+        # Let's look into each tree
+        for root_id, alloc_dict in tree_dict.items():
+            # Get request_groups, which is a list of lists of
+            # AllocationRequestResource per requested resource class.
+            request_groups = alloc_dict.values()
+
+            root_summary = summaries[root_id]
+            root_uuid = root_summary.resource_provider.uuid
+
+            # Using itertools.product, we get all the combinations of resource
+            # providers in a tree.
+            for res_requests in itertools.product(*request_groups):
+                all_prov_ids = _check_traits_for_alloc_request(res_requests,
+                    summaries, prov_traits, required_traits, forbidden_traits)
+                if (not all_prov_ids) or (
+                        tuple(all_prov_ids) in alloc_prov_ids):
+                    # This combination doesn't satisfy trait constraints,
+                    # ...or we already have this permutation, which happens
+                    # when multiple sharing providers with different resource
+                    # classes are in one request.
+                    continue
+                alloc_prov_ids.add(tuple(all_prov_ids))
+                alloc_requests.append(
+                    AllocationRequest(ctx,
+                                      resource_requests=list(res_requests),
+                                      anchor_root_provider_uuid=root_uuid)
+                )
+    return alloc_requests, list(all_summaries.values())
 
 
 @db_api.placement_context_manager.reader
@@ -3832,7 +3958,7 @@ class AllocationCandidates(base.VersionedObject):
         )
 
     @staticmethod
-    def _get_by_one_request(context, request):
+    def _get_by_one_request(context, request, limit=None):
         """Get allocation candidates for one RequestGroup.
 
         Must be called from within an placement_context_manager.reader
@@ -3840,6 +3966,10 @@ class AllocationCandidates(base.VersionedObject):
 
         :param context: Nova RequestContext.
         :param request: One nova.api.openstack.placement.util.RequestGroup
+        :param limit: An optional integer, N, of allocation requests the
+                      caller will at most use. If set, at least N allocation
+                      requests are returned when there are as many, but not
+                      necessarily all of them.
         :return: A tuple of (allocation_requests, provider_summaries)
                  satisfying `request`.
         """
@@ -3889,7 +4019,7 @@ class AllocationCandidates(base.VersionedObject):
                 # it should be possible to further optimize this attempt at
                 # a quick return, but we leave that to future patches for
                 # now.
-                trait_rps = _get_provider_ids_having_any_trait(
+                trait_rps = _cached_provider_ids_having_any_trait(
                     context, required_trait_map)
                 if not trait_rps:
                     return [], []
@@ -3897,7 +4027,8 @@ class AllocationCandidates(base.VersionedObject):
                 required_trait_map, forbidden_trait_map,
                 sharing_providers, member_of)
             return _alloc_candidates_multiple_providers(context, resources,
-                required_trait_map, forbidden_trait_map, rp_tuples)
+                required_trait_map, forbidden_trait_map, rp_tuples,
+                limit=limit)
 
         # Either we are processing a single-RP request group, or there are no
         # sharing providers that (help) satisfy the request.  Get a list of
@@ -3910,7 +4041,8 @@ class AllocationCandidates(base.VersionedObject):
         rp_ids = _get_provider_ids_matching(context, resources,
                                             required_trait_map,
                                             forbidden_trait_map, member_of)
-        return _alloc_candidates_single_provider(context, resources, rp_ids)
+        return _alloc_candidates_single_provider(context, resources, rp_ids,
+                                                 limit=limit)
 
     @classmethod
     # TODO(efried): This is only a writer context because it accesses the
@@ -3920,9 +4052,14 @@ class AllocationCandidates(base.VersionedObject):
     @db_api.placement_context_manager.writer
     def _get_by_requests(cls, context, requests, limit=None,
                          group_policy=None):
+        # With a single RequestGroup its allocation requests are the final
+        # ones, so only the first `limit` of them need to be built. With more
+        # groups, merging them may discard any of the allocation requests.
+        group_limit = limit if len(requests) == 1 else None
         candidates = {}
         for suffix, request in requests.items():
-            alloc_reqs, summaries = cls._get_by_one_request(context, request)
+            alloc_reqs, summaries = cls._get_by_one_request(
+                context, request, limit=group_limit)
             if not alloc_reqs:
                 # Shortcut: If any one request resulted in no candidates, the
                 # whole operation is shot.
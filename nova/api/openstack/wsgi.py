@@ -122,6 +122,15 @@ class Request(wsgi.Request):
         """
         return self.get_db_items(key).get(item_key)
 
+    def set_extended_response_callback(self, callback):
+        """Allow API methods to get the body of their response once every
+        API extension processed it, for instance to cache it.
+        """
+        self._extension_data['extended_response_callback'] = callback
+
+    def get_extended_response_callback(self):
+        return self._extension_data.get('extended_response_callback')
+
     def cache_db_instances(self, instances):
         self.cache_db_items('instances', instances, 'uuid')
 
@@ -296,10 +305,15 @@ class ResponseObject(object):
     should only be used if you really know what you are doing).
     """
 
-    def __init__(self, obj, code=None, headers=None):
-        """Builds a response object."""
+    def __init__(self, obj, code=None, headers=None, extended=False):
+        """Builds a response object.
+
+        If extended is True, the object was already processed by the API
+        extensions, which are not run again.
+        """
 
         self.obj = obj
+        self.extended = extended
         self._default_code = 200
         self._code = code
         self._headers = headers or {}
@@ -661,8 +675,12 @@ class Resource(wsgi.Application):
                 if hasattr(meth, 'wsgi_code'):
                     resp_obj._default_code = meth.wsgi_code
                 # Process extensions
-                response = self.process_extensions(extensions, resp_obj,
-                                                        request, action_args)
+                if not resp_obj.extended:
+                    response = self.process_extensions(extensions, resp_obj,
+                                                       request, action_args)
+                    callback = request.get_extended_response_callback()
+                    if callback and not response:
+                        callback(resp_obj.obj)
 
             if resp_obj and not response:
                 response = resp_obj.serialize(request, accept)
@@ -26,6 +26,7 @@ import re
 import string
 
 from castellan import key_manager
+import netaddr
 from oslo_log import log as logging
 from oslo_messaging import exceptions as oslo_exceptions
 from oslo_serialization import base64 as base64utils
@@ -2372,6 +2373,12 @@ class API(base.Base):
 
         return instance
 
+    def get_changes_mark(self, context, project_id):
+        """Get a value which changes whenever a server of a project is
+        created, updated or deleted, or None if it cannot be determined.
+        """
+        return instance_list.get_changes_mark(context, project_id)
+
     def get_all(self, context, search_opts=None, limit=None, marker=None,
                 expected_attrs=None, sort_keys=None, sort_dirs=None):
         """Get all instances filtered by one of the given parameters.
@@ -2444,13 +2451,19 @@ class API(base.Base):
         orig_limit = limit
         if filter_ip:
             skip_build_request = True
+            instance_uuids = None
             if self.network_api.has_substr_port_filtering_extension(context):
+                instance_uuids = self._ip_filter_using_neutron(context,
+                                                               filters)
+            elif (CONF.api.instance_list_ip_filter_using_ports and
+                    utils.is_neutron()):
+                instance_uuids = self._ip_filter_using_ports(context,
+                                                             filters)
+            if instance_uuids is not None:
                 # We're going to filter by IP using Neutron so set filter_ip
                 # to False so we don't attempt post-DB query filtering in
                 # memory below.
                 filter_ip = False
-                instance_uuids = self._ip_filter_using_neutron(context,
-                                                               filters)
                 if instance_uuids:
                     # Note that 'uuid' is not in the 2.1 GET /servers query
                     # parameter schema, however, we allow additionalProperties
@@ -2633,6 +2646,45 @@ class API(base.Base):
                               address, six.text_type(e))
         return uuids
 
+    def _ip_filter_using_ports(self, context, filters):
+        """Returns the UUIDs of the instances with a port matching the ip or
+        ip6 filters, by matching the fixed IPs of the ports listed from
+        neutron the same way _ip_filter matches the network info cache.
+
+        Returns None if the ports could not be listed.
+        """
+        ip_filters = {}
+        for version, key in ((4, 'ip'), (6, 'ip6')):
+            if filters.get(key):
+                ip_filters[version] = re.compile(str(filters[key]))
+
+        search_opts = {'fields': ['device_id', 'fixed_ips']}
+        project_id = filters.get('project_id')
+        if isinstance(project_id, six.string_types):
+            search_opts['tenant_id'] = project_id
+        try:
+            ports = self.network_api.list_ports(context,
+                                                **search_opts)['ports']
+        except Exception as e:
+            LOG.warning('Unable to list ports to filter instances by IP '
+                        'address, filtering the instances instead. '
+                        'Error: %s', six.text_type(e))
+            return None
+
+        uuids = []
+        for port in ports:
+            if not port.get('device_id'):
+                continue
+            for fixed_ip in port.get('fixed_ips', []):
+                address = fixed_ip.get('ip_address')
+                if not address:
+                    continue
+                ip_filter = ip_filters.get(netaddr.IPAddress(address).version)
+                if ip_filter and ip_filter.match(address):
+                    uuids.append(port['device_id'])
+                    break
+        return uuids
+
     def _get_instances_by_filters(self, context, filters,
                                   limit=None, marker=None, fields=None,
                                   sort_keys=None, sort_dirs=None):
@@ -11,7 +11,12 @@
 #    under the License.
 
 import copy
+import datetime
 
+from oslo_log import log as logging
+from oslo_utils import timeutils
+
+from nova import cache_utils
 from nova.compute import multi_cell_list
 import nova.conf
 from nova import context
@@ -22,6 +27,7 @@ from nova.objects import instance as instance_obj
 
 
 CONF = nova.conf.CONF
+LOG = logging.getLogger(__name__)
 
 
 class InstanceSortContext(multi_cell_list.RecordSortContext):
@@ -44,10 +50,36 @@ class InstanceSortContext(multi_cell_list.RecordSortContext):
         super(InstanceSortContext, self).__init__(sort_keys, sort_dirs)
 
 
+MARKER_CACHE = None
+_MARKER_CACHE_DISABLED_WARNED = False
+
+
+def _get_marker_cache():
+    global MARKER_CACHE
+    global _MARKER_CACHE_DISABLED_WARNED
+
+    expiration = CONF.api.instance_list_marker_cache_expiration
+    if not expiration:
+        return None
+    if not CONF.cache.enabled:
+        # Without [cache], every position would be kept in the memory of the
+        # API worker until the same page is requested again.
+        if not _MARKER_CACHE_DISABLED_WARNED:
+            LOG.warning("The [api]instance_list_marker_cache_expiration "
+                        "option is set but the [cache]enabled option is "
+                        "not, instance list positions are not cached.")
+            _MARKER_CACHE_DISABLED_WARNED = True
+        return None
+    if MARKER_CACHE is None:
+        MARKER_CACHE = cache_utils.get_client(expiration_time=expiration)
+    return MARKER_CACHE
+
+
 class InstanceLister(multi_cell_list.CrossCellLister):
-    def __init__(self, sort_keys, sort_dirs, cells=None):
+    def __init__(self, sort_keys, sort_dirs, cells=None, batch_size=None):
         super(InstanceLister, self).__init__(
-            InstanceSortContext(sort_keys, sort_dirs), cells=cells)
+            InstanceSortContext(sort_keys, sort_dirs), cells=cells,
+            batch_size=batch_size, marker_cache=_get_marker_cache())
 
     @property
     def marker_identifier(self):
@@ -86,12 +118,52 @@ class InstanceLister(multi_cell_list.CrossCellLister):
             **kwargs)
 
 
+def get_instance_list_cells_batch_size(limit, cells):
+    """Calculate the proper batch size for a list request.
+
+    This will consider config, request limit, and cells being queried and
+    return an appropriate batch size to use for querying said cells.
+
+    :param limit: The overall limit specified in the request
+    :param cells: The list of CellMapping objects being queried
+    :returns: An integer batch size
+    """
+    strategy = CONF.api.instance_list_cells_batch_strategy
+    limit = limit or CONF.api.max_limit
+
+    if len(cells) <= 1:
+        # If we're limited to one (or no) cell for whatever reason, do
+        # not do any batching and just pull the desired limit from the
+        # single cell in one shot.
+        return limit
+
+    if strategy == 'fixed':
+        # Fixed strategy, always a static batch size
+        batch_size = CONF.api.instance_list_cells_batch_fixed_size
+    elif strategy == 'distributed':
+        # Distributed strategy, 10% more than even partitioning
+        batch_size = int((limit / len(cells)) * 1.10)
+
+    # We never query a larger batch than the total requested, and never
+    # smaller than the lower limit of 100.
+    return max(min(batch_size, limit), 100)
+
+
 # NOTE(danms): These methods are here for legacy glue reasons. We should not
 # replicate these for every data type we implement.
 def get_instances_sorted(ctx, filters, limit, marker, columns_to_join,
                          sort_keys, sort_dirs, cell_mappings=None):
+    batch_size = None
+    if limit:
+        if cell_mappings is None:
+            context.load_cells()
+            cells = context.CELLS
+        else:
+            cells = cell_mappings
+        batch_size = get_instance_list_cells_batch_size(limit, cells)
     return InstanceLister(sort_keys, sort_dirs,
-                          cells=cell_mappings).get_records_sorted(
+                          cells=cell_mappings,
+                          batch_size=batch_size).get_records_sorted(
         ctx, filters, limit, marker, columns_to_join=columns_to_join)
 
 
@@ -124,3 +196,37 @@ def get_instance_objects_sorted(ctx, filters, limit, marker, expected_attrs,
     return instance_obj._make_instance_list(ctx, objects.InstanceList(),
                                             instance_generator,
                                             expected_attrs)
+
+
+def get_changes_mark(ctx, project_id):
+    """Return a value which changes whenever a server of a project does.
+
+    The value is made of the build requests mark of the project followed by
+    the instances mark of every cell the project may have instances in. None
+    is returned when a cell could not be queried, or when the latest change
+    is so recent that another change in the same second, which the precision
+    of the timestamps cannot tell apart, could still go unnoticed.
+    """
+    if CONF.api.instance_list_per_project_cells:
+        cell_mappings = objects.CellMappingList.get_by_project_id(
+            ctx, project_id)
+    else:
+        context.load_cells()
+        cell_mappings = context.CELLS
+    results = context.scatter_gather_cells(ctx, cell_mappings, 60,
+                                           db.instance_get_changes_mark,
+                                           project_id)
+
+    mark = [objects.BuildRequestList.get_changes_mark(ctx, project_id)]
+    for cell_uuid in sorted(results):
+        result = results[cell_uuid]
+        if result in (context.did_not_respond_sentinel,
+                      context.raised_exception_sentinel):
+            return None
+        mark.append(result)
+
+    timestamps = [value for values in mark for value in values
+                  if isinstance(value, datetime.datetime)]
+    if timestamps and not timeutils.is_older_than(max(timestamps), 1):
+        return None
+    return mark
@@ -512,6 +512,8 @@ class ComputeManager(manager.Manager):
         self.instance_events = InstanceEvents()
         self._sync_power_pool = eventlet.GreenPool(
             size=CONF.sync_power_state_pool_size)
+        self._update_resources_pool = eventlet.GreenPool(
+            size=CONF.update_resources_pool_size)
         self._syncs_in_progress = {}
         self.send_instance_updates = (
             CONF.filter_scheduler.track_instance_changes)
@@ -528,6 +530,7 @@ class ComputeManager(manager.Manager):
 
         super(ComputeManager, self).__init__(service_name="compute",
                                              *args, **kwargs)
+        self._init_periodic_task_pool(CONF.periodic_task_pool_size)
 
         # NOTE(russellb) Load the driver last.  It may call back into the
         # compute manager via the virtapi, so we want it to be fully
@@ -6744,13 +6747,18 @@ class ComputeManager(manager.Manager):
         list, pull the DB record, and try the call to the network API.
         If anything errors don't fail, as it's possible the instance
         has been deleted, etc.
+
+        Up to heal_instance_info_cache_batch_size instances are popped off
+        the list on each call. The ports of a batch of instances are then
+        listed with a single call to the network API, if supported.
         """
         heal_interval = CONF.heal_instance_info_cache_interval
         if not heal_interval:
             return
 
+        batch_size = CONF.heal_instance_info_cache_batch_size
         instance_uuids = getattr(self, '_instance_uuids_to_heal', [])
-        instance = None
+        instances = []
 
         LOG.debug('Starting heal instance info cache')
 
@@ -6773,17 +6781,17 @@ class ComputeManager(manager.Manager):
                               'because it is being deleted.', instance=inst)
                     continue
 
-                if not instance:
-                    # Save the first one we find so we don't
-                    # have to get it again
-                    instance = inst
+                if len(instances) < batch_size:
+                    # Save the first ones we find so we don't
+                    # have to get them again
+                    instances.append(inst)
                 else:
                     instance_uuids.append(inst['uuid'])
 
             self._instance_uuids_to_heal = instance_uuids
         else:
-            # Find the next valid instance on the list
-            while instance_uuids:
+            # Find the next valid instances on the list
+            while instance_uuids and len(instances) < batch_size:
                 try:
                     inst = objects.Instance.get_by_uuid(
                             context, instance_uuids.pop(0),
@@ -6804,32 +6812,52 @@ class ComputeManager(manager.Manager):
                     LOG.debug('Skipping network cache update for instance '
                               'because it is being deleted.', instance=inst)
                 else:
-                    instance = inst
-                    break
+                    instances.append(inst)
 
-        if instance:
-            # We have an instance now to refresh
-            try:
-                # Call to network API to get instance info.. this will
-                # force an update to the instance's info_cache
-                self.network_api.get_instance_nw_info(context, instance)
-                LOG.debug('Updated the network info_cache for instance',
-                          instance=instance)
-            except exception.InstanceNotFound:
-                # Instance is gone.
-                LOG.debug('Instance no longer exists. Unable to refresh',
-                          instance=instance)
-                return
-            except exception.InstanceInfoCacheNotFound:
-                # InstanceInfoCache is gone.
-                LOG.debug('InstanceInfoCache no longer exists. '
-                          'Unable to refresh', instance=instance)
-            except Exception:
-                LOG.error('An error occurred while refreshing the network '
-                          'cache.', instance=instance, exc_info=True)
-        else:
+        if not instances:
             LOG.debug("Didn't find any instances for network info cache "
                       "update.")
+            return
+
+        ports = None
+        if len(instances) > 1:
+            try:
+                ports = self.network_api.get_instances_ports(context,
+                                                             instances)
+            except NotImplementedError:
+                pass
+            except Exception:
+                LOG.warning('Failed to list the ports of %d instances, '
+                            'their network info cache will be refreshed '
+                            'one by one.', len(instances), exc_info=True)
+
+        for instance in instances:
+            # We have an instance now to refresh
+            if ports is None:
+                self._heal_instance_info_cache_for(context, instance)
+            else:
+                self._heal_instance_info_cache_for(
+                    context, instance, ports=ports.get(instance.uuid, []))
+
+    def _heal_instance_info_cache_for(self, context, instance, **kwargs):
+        try:
+            # Call to network API to get instance info.. this will
+            # force an update to the instance's info_cache
+            self.network_api.get_instance_nw_info(context, instance,
+                                                  **kwargs)
+            LOG.debug('Updated the network info_cache for instance',
+                      instance=instance)
+        except exception.InstanceNotFound:
+            # Instance is gone.
+            LOG.debug('Instance no longer exists. Unable to refresh',
+                      instance=instance)
+        except exception.InstanceInfoCacheNotFound:
+            # InstanceInfoCache is gone.
+            LOG.debug('InstanceInfoCache no longer exists. '
+                      'Unable to refresh', instance=instance)
+        except Exception:
+            LOG.error('An error occurred while refreshing the network '
+                      'cache.', instance=instance, exc_info=True)
 
     @periodic_task.periodic_task
     def _poll_rebooting_instances(self, context):
@@ -7186,12 +7214,29 @@ class ComputeManager(manager.Manager):
         number of virtual machines known by the database, we proceed in a lazy
         loop, one database record at a time, checking if the hypervisor has the
         same power state as is in the database.
+
+        When the driver supports it, the power state of all the virtual
+        machines is retrieved with a single call to the hypervisor, rather
+        than with one call per instance.
         """
         db_instances = objects.InstanceList.get_by_host(context, self.host,
                                                         expected_attrs=[],
                                                         use_slave=True)
 
-        num_vm_instances = self.driver.get_num_instances()
+        try:
+            vm_power_states = self.driver.get_power_states()
+        except NotImplementedError:
+            vm_power_states = None
+        except Exception:
+            LOG.exception("Failed to retrieve the power state of all the "
+                          "instances from the hypervisor, querying the "
+                          "power state of each instance instead.")
+            vm_power_states = None
+
+        if vm_power_states is None:
+            num_vm_instances = self.driver.get_num_instances()
+        else:
+            num_vm_instances = len(vm_power_states)
         num_db_instances = len(db_instances)
 
         if num_vm_instances != num_db_instances:
@@ -7202,13 +7247,14 @@ class ComputeManager(manager.Manager):
                         {'num_db_instances': num_db_instances,
                          'num_vm_instances': num_vm_instances})
 
-        def _sync(db_instance):
+        def _sync(db_instance, vm_power_state):
             # NOTE(melwitt): This must be synchronized as we query state from
             #                two separate sources, the driver and the database.
             #                They are set (in stop_instance) and read, in sync.
             @utils.synchronized(db_instance.uuid)
             def query_driver_power_state_and_sync():
-                self._query_driver_power_state_and_sync(context, db_instance)
+                self._query_driver_power_state_and_sync(
+                    context, db_instance, vm_power_state=vm_power_state)
 
             try:
                 query_driver_power_state_and_sync()
@@ -7228,38 +7274,57 @@ class ComputeManager(manager.Manager):
             else:
                 LOG.debug('Triggering sync for uuid %s', uuid)
                 self._syncs_in_progress[uuid] = True
-                self._sync_power_pool.spawn_n(_sync, db_instance)
-
-    def _query_driver_power_state_and_sync(self, context, db_instance):
+                vm_power_state = None
+                if vm_power_states is not None:
+                    vm_power_state = vm_power_states.get(
+                        uuid, power_state.NOSTATE)
+                self._sync_power_pool.spawn_n(_sync, db_instance,
+                                              vm_power_state)
+
+    def _query_driver_power_state_and_sync(self, context, db_instance,
+                                           vm_power_state=None):
+        """Sync the power state of an instance with the hypervisor.
+
+        :param vm_power_state: The power state of the instance, as returned
+            by a call to get_power_states made before the instance was
+            locked. If None, the driver is asked for it with get_info.
+        """
         if db_instance.task_state is not None:
             LOG.info("During sync_power_state the instance has a "
                      "pending task (%(task)s). Skip.",
                      {'task': db_instance.task_state}, instance=db_instance)
             return
+        # The bulk power state may predate an operation which completed
+        # before the instance lock was taken, so it is confirmed with the
+        # driver if it does not match the refreshed database power state.
+        confirm_power_state = vm_power_state is not None
         # No pending tasks. Now try to figure out the real vm_power_state.
-        try:
-            vm_instance = self.driver.get_info(db_instance)
-            vm_power_state = vm_instance.state
-        except exception.InstanceNotFound:
-            vm_power_state = power_state.NOSTATE
+        if vm_power_state is None:
+            try:
+                vm_instance = self.driver.get_info(db_instance)
+                vm_power_state = vm_instance.state
+            except exception.InstanceNotFound:
+                vm_power_state = power_state.NOSTATE
         # Note(maoy): the above get_info call might take a long time,
         # for example, because of a broken libvirt driver.
         try:
-            self._sync_instance_power_state(context,
-                                            db_instance,
-                                            vm_power_state,
-                                            use_slave=True)
+            self._sync_instance_power_state(
+                context, db_instance, vm_power_state, use_slave=True,
+                confirm_power_state=confirm_power_state)
         except exception.InstanceNotFound:
             # NOTE(hanlind): If the instance gets deleted during sync,
             # silently ignore.
             pass
 
     def _sync_instance_power_state(self, context, db_instance, vm_power_state,
-                                   use_slave=False):
+                                   use_slave=False, confirm_power_state=False):
         """Align instance power state between the database and hypervisor.
 
         If the instance is not found on the hypervisor, but is in the database,
         then a stop() API will be called on the instance.
+
+        :param confirm_power_state: If True, vm_power_state is asked again
+            from the driver when it does not match the database power state.
         """
 
         # We re-query the DB to get the latest instance info to minimize
@@ -7295,6 +7360,9 @@ class ComputeManager(manager.Manager):
                      instance=db_instance)
             return
 
+        if confirm_power_state and vm_power_state != db_power_state:
+            vm_power_state = self._get_power_state(context, db_instance)
+
         orig_db_power_state = db_power_state
         if vm_power_state != db_power_state:
             LOG.info('During _sync_instance_power_state the DB '
@@ -7496,8 +7564,17 @@ class ComputeManager(manager.Manager):
             LOG.warning("Virt driver is not ready.")
             return
 
-        for nodename in nodenames:
-            self._update_available_resource_for_node(context, nodename)
+        if CONF.update_resources_pool_size > 1 and len(nodenames) > 1:
+            # The resource tracker locks each node separately, so the nodes
+            # can be audited concurrently.
+            for nodename in nodenames:
+                self._update_resources_pool.spawn_n(
+                    self._update_available_resource_for_node, context,
+                    nodename)
+            self._update_resources_pool.waitall()
+        else:
+            for nodename in nodenames:
+                self._update_available_resource_for_node(context, nodename)
 
         # Delete orphan compute node not reported by driver but still in db
         for cn in compute_nodes_in_db:
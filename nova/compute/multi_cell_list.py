@@ -12,14 +12,18 @@
 
 import abc
 import copy
+import hashlib
 import heapq
 import itertools
 
 import six
 
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
+from oslo_utils import encodeutils
 
 from nova import context
+from nova import exception
 
 LOG = logging.getLogger(__name__)
 
@@ -55,9 +59,10 @@ class RecordWrapper(object):
 
     Implementing __lt__ is enough for heapq.merge() to do its work.
     """
-    def __init__(self, sort_ctx, db_record):
+    def __init__(self, sort_ctx, db_record, cell_uuid=None):
         self._sort_ctx = sort_ctx
         self._db_record = db_record
+        self.cell_uuid = cell_uuid
 
     def __lt__(self, other):
         r = self._sort_ctx.compare_records(self._db_record,
@@ -77,9 +82,12 @@ class CrossCellLister(object):
     your data type from cell databases.
 
     """
-    def __init__(self, sort_ctx, cells=None):
+    def __init__(self, sort_ctx, cells=None, batch_size=None,
+                 marker_cache=None):
         self.sort_ctx = sort_ctx
         self.cells = cells
+        self.batch_size = batch_size
+        self.marker_cache = marker_cache
 
     @property
     @abc.abstractmethod
@@ -142,6 +150,100 @@ class CrossCellLister(object):
         """
         pass
 
+    def _get_marker_cache_key(self, filters, marker):
+        key = [marker, self.sort_ctx.sort_keys, self.sort_ctx.sort_dirs,
+               filters]
+        return '%s-%s' % (
+            self.__class__.__name__,
+            hashlib.sha256(encodeutils.safe_encode(
+                jsonutils.dumps(key, sort_keys=True,
+                                default=repr))).hexdigest())
+
+    def _cache_marker(self, filters, last, last_cell_records, failed_cells):
+        """Cache where each cell resumes from when last is the marker.
+
+        :param filters: A dict of column=filter items
+        :param last: The RecordWrapper of the last record returned
+        :param last_cell_records: A dict, keyed by cell uuid, of the
+                                  identifier of the last record returned
+                                  from each cell, or None if no record of
+                                  the cell was returned yet
+        :param failed_cells: A set of the uuids of the cells which failed
+                             to return all their records
+        """
+        if failed_cells or None in last_cell_records:
+            # The records skipped from a failed cell would never be
+            # returned if the cell resumed after the records it returned.
+            return
+        marker = last._db_record[self.marker_identifier]
+        values = [last._db_record[key] for key in self.sort_ctx.sort_keys]
+        self.marker_cache.set(self._get_marker_cache_key(filters, marker),
+                              {'values': values, 'cells': last_cell_records})
+
+    def _query_cell(self, ctx, filters, limit, batch_size, marker,
+                    failed_cells, **kwargs):
+        """Query the records of a cell after a local marker.
+
+        :param ctx: A RequestContext targeted at the cell
+        :param filters: A dict of column=filter items
+        :param limit: A numeric limit on the number of results, or None
+        :param batch_size: The number of records queried at once, or None
+                           to query them all at once
+        :param marker: The local marker identifier, or None
+        :param failed_cells: A set the uuid of the cell is added to if it
+                             fails to return all its records
+        :returns: A list or a generator of records
+        """
+        if not batch_size:
+            return self.get_by_filters(ctx, filters, limit=limit,
+                                       marker=marker, **kwargs)
+        # Only the first batch is queried in this thread, the next ones are
+        # queried as the merge consumes the records.
+        return self._get_batches(ctx, filters, limit, batch_size,
+                                 self.get_by_filters(ctx, filters,
+                                                     limit=batch_size,
+                                                     marker=marker,
+                                                     **kwargs),
+                                 failed_cells, **kwargs)
+
+    def _get_batches(self, ctx, filters, limit, batch_size, batch,
+                     failed_cells, **kwargs):
+        """Generate the records of a cell, querying them in batches.
+
+        :param ctx: A RequestContext targeted at the cell
+        :param filters: A dict of column=filter items
+        :param limit: The maximum number of records to generate
+        :param batch_size: The number of records queried at once
+        :param batch: The first batch of records, already queried
+        :param failed_cells: A set the uuid of the cell is added to if a
+                             batch query fails
+        :returns: A generator of records
+        """
+        count = 0
+        requested = batch_size
+        while True:
+            for record in batch:
+                yield record
+            count += len(batch)
+            if len(batch) < requested or count >= limit:
+                # The cell has no more records, or we have generated as
+                # many records as could possibly be returned.
+                return
+            requested = min(batch_size, limit - count)
+            try:
+                batch = self.get_by_filters(
+                    ctx, filters, limit=requested,
+                    marker=batch[-1][self.marker_identifier], **kwargs)
+            except Exception:
+                # Like a cell which did not respond to the first query,
+                # a cell failing a later one is skipped from the rest of
+                # the results.
+                LOG.exception('Error querying the next batch of records '
+                              'from cell %s, it is skipped from the rest of '
+                              'the results.', ctx.cell_uuid)
+                failed_cells.add(ctx.cell_uuid)
+                return
+
     def get_records_sorted(self, ctx, filters, limit, marker, **kwargs):
         """Get a cross-cell list of records matching filters.
 
@@ -160,11 +262,37 @@ class CrossCellLister(object):
         NOTE: Since we do these in parallel, a nonzero limit will be passed
         to each database query, although the limit will be enforced in the
         output of this function. Meaning, we will still query $limit from each
-        database, but only return $limit total results.
+        database, but only return $limit total results. If a batch size
+        smaller than the limit was provided to the constructor, each database
+        is first queried for a batch of records only, and the next batch is
+        queried from a database once all of its previous batch was consumed
+        by the merge, so that cells only return the records actually needed.
+
+        If a marker cache was provided to the constructor, the sort key
+        values of the last record of each page and the last record returned
+        from each cell up to it are cached. When that record is the marker
+        of the next page, each cell resumes after its own last record
+        instead of looking the marker up again.
 
         """
 
-        if marker:
+        batch_size = None
+        if limit and self.batch_size and self.batch_size < limit:
+            batch_size = self.batch_size
+
+        # The cached position of every cell after the marker, if the marker
+        # was the last record of a page we returned for the same query.
+        marker_cache_key = None
+        cached_marker = None
+        if self.marker_cache is not None and limit:
+            marker_cache_key = self._get_marker_cache_key(filters, marker)
+        if marker_cache_key and marker:
+            cached_marker = self.marker_cache.get(marker_cache_key)
+
+        if cached_marker:
+            global_marker_values = cached_marker['values']
+            cell_markers = cached_marker['cells']
+        elif marker:
             # A marker identifier was provided from the API. Call this
             # the 'global' marker as it determines where we start the
             # process across all cells. Look up the record in
@@ -174,6 +302,12 @@ class CrossCellLister(object):
             global_marker_record = self.get_marker_record(ctx, marker)
             global_marker_values = [global_marker_record[key]
                                     for key in self.sort_ctx.sort_keys]
+            cell_markers = {}
+
+        # The cells which resumed from their cached position, and the cells
+        # which failed to return all the records they should have.
+        resumed_cells = set()
+        failed_cells = set()
 
         def do_query(ctx):
             """Generate RecordWrapper(record) objects from a cell.
@@ -200,10 +334,25 @@ class CrossCellLister(object):
 
             marker_id = self.marker_identifier
 
-            if marker:
-                # FIXME(danms): If we knew which cell we were in here, we could
-                # avoid looking up the marker again. But, we don't currently.
+            if marker and ctx.cell_uuid in cell_markers:
+                # We know the last record of this cell which was returned
+                # up to the marker, if any, so we simply resume after it.
+                try:
+                    records = self._query_cell(
+                        ctx, filters, limit, batch_size,
+                        cell_markers[ctx.cell_uuid], failed_cells, **kwargs)
+                except exception.MarkerNotFound:
+                    # The record was deleted since, so look the local
+                    # marker up by value as if it was not cached.
+                    LOG.debug('Cached marker %s not found in cell %s',
+                              cell_markers[ctx.cell_uuid], ctx.cell_uuid)
+                else:
+                    resumed_cells.add(ctx.cell_uuid)
+                    return (RecordWrapper(self.sort_ctx, inst,
+                                          cell_uuid=ctx.cell_uuid)
+                            for inst in records)
 
+            if marker:
                 local_marker = self.get_marker_by_values(ctx,
                                                          global_marker_values)
                 if local_marker:
@@ -239,12 +388,12 @@ class CrossCellLister(object):
                     # full unpaginated set for our cell.
                     return []
 
-            main_query_result = self.get_by_filters(
-                ctx, filters,
-                limit=limit, marker=local_marker,
-                **kwargs)
+            main_query_result = self._query_cell(ctx, filters, limit,
+                                                 batch_size, local_marker,
+                                                 failed_cells, **kwargs)
 
-            return (RecordWrapper(self.sort_ctx, inst) for inst in
+            return (RecordWrapper(self.sort_ctx, inst,
+                                  cell_uuid=ctx.cell_uuid) for inst in
                     itertools.chain(local_marker_prefix, main_query_result))
 
         # NOTE(tssurya): When the below routine provides sentinels to indicate
@@ -264,6 +413,15 @@ class CrossCellLister(object):
                 LOG.warning("Cell %s is not responding and hence skipped "
                             "from the results.", cell_uuid)
                 results.pop(cell_uuid)
+                failed_cells.add(cell_uuid)
+
+        # The last record returned from each cell, which is where the cell
+        # resumes from if the last record returned is the next marker.
+        if marker:
+            last_cell_records = {cell_uuid: cell_markers[cell_uuid]
+                                 for cell_uuid in resumed_cells}
+        else:
+            last_cell_records = {cell_uuid: None for cell_uuid in results}
 
         # If a limit was provided, it was passed to the per-cell query
         # routines.  That means we have NUM_CELLS * limit items across
@@ -274,10 +432,26 @@ class CrossCellLister(object):
         # Generate results from heapq so we can return the inner
         # instance instead of the wrapper. This is basically free
         # as it works as our caller iterates the results.
-        for i in heapq.merge(*results.values()):
-            yield i._db_record
-            limit -= 1
-            if limit == 0:
-                # We'll only hit this if limit was nonzero and we just
-                # generated our last one
-                return
+        last = None
+        try:
+            for i in heapq.merge(*results.values()):
+                last = i
+                last_cell_records[i.cell_uuid] = (
+                    i._db_record[self.marker_identifier])
+                yield i._db_record
+                limit -= 1
+                if limit == 0:
+                    # We'll only hit this if limit was nonzero and we just
+                    # generated our last one
+                    break
+        except GeneratorExit:
+            # Our caller stopped iterating, so the last record we generated
+            # is the last one it returned.
+            if marker_cache_key and last:
+                self._cache_marker(filters, last, last_cell_records,
+                                   failed_cells)
+            raise
+
+        if marker_cache_key and last and limit == 0:
+            self._cache_marker(filters, last, last_cell_records,
+                               failed_cells)
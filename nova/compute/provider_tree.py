@@ -95,22 +95,6 @@ class _Provider(object):
             ret.extend(child.get_provider_uuids())
         return ret
 
-    def find(self, search):
-        if self.name == search or self.uuid == search:
-            return self
-        if search in self.children:
-            return self.children[search]
-        if self.children:
-            for child in self.children.values():
-                # We already searched for the child by UUID above, so here we
-                # just check for a child name match
-                if child.name == search:
-                    return child
-                subchild = child.find(search)
-                if subchild:
-                    return subchild
-        return None
-
     def add_child(self, provider):
         self.children[provider.uuid] = provider
 
@@ -227,6 +211,48 @@ class ProviderTree(object):
         """Create an empty provider tree."""
         self.lock = lockutils.internal_lock(_LOCK_NAME)
         self.roots = []
+        # Indexes of the providers in the tree, kept up to date as providers
+        # are added and removed so lookups don't have to walk the tree.
+        self._providers_by_uuid = {}
+        self._providers_by_name = {}
+        # Dict, keyed by resource class, of the set of UUIDs of the providers
+        # having inventory of that resource class
+        self._provider_uuids_by_rc = collections.defaultdict(set)
+        # Cached list, in top-down traversal order, of the UUIDs of all the
+        # providers; None when it needs to be rebuilt
+        self._provider_uuids = None
+
+    def _add_with_lock(self, provider, parent=None):
+        """Add a provider to the tree, under the parent provider if any, and
+        index it.
+        """
+        if parent is None:
+            self.roots.append(provider)
+        else:
+            parent.add_child(provider)
+        self._providers_by_uuid[provider.uuid] = provider
+        self._providers_by_name[provider.name] = provider
+        self._index_inventory_with_lock(provider, ())
+        self._provider_uuids = None
+
+    def _unindex_with_lock(self, provider):
+        """Drop a provider and all of its descendants from the indexes."""
+        for uuid in provider.get_provider_uuids():
+            found = self._providers_by_uuid.pop(uuid)
+            if self._providers_by_name.get(found.name) is found:
+                del self._providers_by_name[found.name]
+            for rc in found.inventory:
+                self._provider_uuids_by_rc[rc].discard(uuid)
+        self._provider_uuids = None
+
+    def _index_inventory_with_lock(self, provider, old_rcs):
+        """Update the resource class index for the inventory of a provider,
+        given the resource classes it previously had inventory of.
+        """
+        for rc in set(old_rcs) - set(provider.inventory):
+            self._provider_uuids_by_rc[rc].discard(provider.uuid)
+        for rc in provider.inventory:
+            self._provider_uuids_by_rc[rc].add(provider.uuid)
 
     def get_provider_uuids(self, name_or_uuid=None):
         """Return a list, in top-down traversable order, of the UUIDs of all
@@ -242,11 +268,13 @@ class ProviderTree(object):
                 return self._find_with_lock(name_or_uuid).get_provider_uuids()
 
         # If no name_or_uuid, get UUIDs for all providers recursively.
-        ret = []
         with self.lock:
-            for root in self.roots:
-                ret.extend(root.get_provider_uuids())
-        return ret
+            if self._provider_uuids is None:
+                ret = []
+                for root in self.roots:
+                    ret.extend(root.get_provider_uuids())
+                self._provider_uuids = ret
+            return list(self._provider_uuids)
 
     def populate_from_iterable(self, provider_dicts):
         """Populates this ProviderTree from an iterable of provider dicts.
@@ -278,10 +306,7 @@ class ProviderTree(object):
             # (the provider is a root), or be in the tree already, or exist as
             # a key in to_add_by_uuid (we're adding it).
             all_parents = set([None]) | set(to_add_by_uuid)
-            # NOTE(efried): Can't use get_provider_uuids directly because we're
-            # already under lock.
-            for root in self.roots:
-                all_parents |= set(root.get_provider_uuids())
+            all_parents |= set(self._providers_by_uuid)
             missing_parents = set()
             for pd in to_add_by_uuid.values():
                 parent_uuid = pd.get('parent_provider_uuid')
@@ -324,11 +349,10 @@ class ProviderTree(object):
                     pass
 
                 provider = _Provider.from_dict(pd)
-                if parent_uuid is None:
-                    self.roots.append(provider)
-                else:
+                parent = None
+                if parent_uuid is not None:
                     parent = self._find_with_lock(parent_uuid)
-                    parent.add_child(provider)
+                self._add_with_lock(provider, parent)
 
                 # Remove this entry to signify we're done with it.
                 to_add_by_uuid.pop(uuid)
@@ -340,6 +364,7 @@ class ProviderTree(object):
             parent.remove_child(found)
         else:
             self.roots.remove(found)
+        self._unindex_with_lock(found)
 
     def remove(self, name_or_uuid):
         """Safely removes the provider identified by the supplied name_or_uuid
@@ -375,16 +400,51 @@ class ProviderTree(object):
                 raise ValueError(err % uuid)
 
             p = _Provider(name, uuid=uuid, generation=generation)
-            self.roots.append(p)
+            self._add_with_lock(p)
             return p.uuid
 
     def _find_with_lock(self, name_or_uuid):
-        for root in self.roots:
-            found = root.find(name_or_uuid)
-            if found:
-                return found
+        found = (self._providers_by_uuid.get(name_or_uuid) or
+                 self._providers_by_name.get(name_or_uuid))
+        if found:
+            return found
         raise ValueError(_("No such provider %s") % name_or_uuid)
 
+    def _walk_with_lock(self):
+        """Yield the providers of the tree in top-down traversal order."""
+        stack = list(reversed(self.roots))
+        while stack:
+            provider = stack.pop()
+            yield provider
+            stack.extend(reversed(list(provider.children.values())))
+
+    def get_changed_providers(self, other):
+        """Return the data of the providers whose inventory, traits or
+        aggregates differ from those of the same providers in another tree.
+
+        Providers are compared in place, so only the ones which changed are
+        copied.
+
+        :param other: The ProviderTree to compare against, such as the cache of
+                      the scheduler report client.
+        :return: A list, in top-down traversal order, of ProviderData objects
+                 for the providers of this tree which differ from, or are
+                 missing in, the other tree.
+        """
+        # All ProviderTree instances share the same lock, so the other tree is
+        # walked under it as well.
+        with self.lock:
+            others = {p.uuid: p for p in other._walk_with_lock()}
+            ret = []
+            for provider in self._walk_with_lock():
+                cur = others.get(provider.uuid)
+                if (cur is None or
+                        cur.has_inventory_changed(provider.inventory) or
+                        cur.have_traits_changed(provider.traits) or
+                        cur.have_aggregates_changed(provider.aggregates)):
+                    ret.append(provider.data())
+            return ret
+
     def data(self, name_or_uuid):
         """Return a point-in-time copy of the specified provider's data.
 
@@ -433,7 +493,7 @@ class ProviderTree(object):
 
             parent_node = self._find_with_lock(parent)
             p = _Provider(name, uuid, generation, parent_node.uuid)
-            parent_node.add_child(p)
+            self._add_with_lock(p, parent_node)
             return p.uuid
 
     def has_inventory(self, name_or_uuid):
@@ -483,18 +543,21 @@ class ProviderTree(object):
         """
         with self.lock:
             provider = self._find_with_lock(name_or_uuid)
-            return provider.update_inventory(inventory, generation)
+            old_rcs = list(provider.inventory)
+            changed = provider.update_inventory(inventory, generation)
+            if changed:
+                self._index_inventory_with_lock(provider, old_rcs)
+            return changed
 
     def has_sharing_provider(self, resource_class):
         """Returns whether the specified provider_tree contains any sharing
         providers of inventory of the specified resource_class.
         """
-        for rp_uuid in self.get_provider_uuids():
-            pdata = self.data(rp_uuid)
-            has_rc = resource_class in pdata.inventory
-            is_sharing = os_traits.MISC_SHARES_VIA_AGGREGATE in pdata.traits
-            if has_rc and is_sharing:
-                return True
+        with self.lock:
+            for rp_uuid in self._provider_uuids_by_rc.get(resource_class, ()):
+                provider = self._providers_by_uuid[rp_uuid]
+                if os_traits.MISC_SHARES_VIA_AGGREGATE in provider.traits:
+                    return True
         return False
 
     def has_traits(self, name_or_uuid, traits):
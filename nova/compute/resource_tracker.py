@@ -20,6 +20,7 @@ model.
 """
 import collections
 import copy
+import functools
 
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
@@ -51,6 +52,44 @@ LOG = logging.getLogger(__name__)
 COMPUTE_RESOURCE_SEMAPHORE = "compute_resources"
 
 
+def _node_semaphore(nodename):
+    """Return the name of the lock guarding the resources of a node."""
+    return '%s-%s' % (COMPUTE_RESOURCE_SEMAPHORE, nodename)
+
+
+def _synchronized_node(f):
+    """Serialize calls to a ResourceTracker method per compute node.
+
+    The node is taken from the ``nodename`` argument of the call, or from the
+    ``resources`` reported by the virt driver for the resource audit. Claims
+    and audits of different nodes managed by the same service, as with the
+    ironic driver, therefore do not wait on each other.
+    """
+    argnames = utils.getargspec(f).args
+    argname = 'nodename' if 'nodename' in argnames else 'resources'
+    # The position of the argument in the positional arguments of a call,
+    # which do not include self.
+    argindex = argnames.index(argname) - 1
+
+    @functools.wraps(f)
+    def wrapper(self, *args, **kwargs):
+        if argindex < len(args):
+            arg = args[argindex]
+        else:
+            arg = kwargs[argname]
+        if argname == 'nodename':
+            nodename = arg
+        else:
+            nodename = arg['hypervisor_hostname']
+
+        @utils.synchronized(_node_semaphore(nodename))
+        def _locked():
+            return f(self, *args, **kwargs)
+
+        return _locked()
+    return wrapper
+
+
 def _instance_in_resize_state(instance):
     """Returns True if the instance is in one of the resizing states.
 
@@ -136,7 +175,10 @@ class ResourceTracker(object):
         self.pci_tracker = None
         # Dict of objects.ComputeNode objects, keyed by nodename
         self.compute_nodes = {}
+        # Host wide stats, only the failed builds counter is kept here
         self.stats = stats.Stats()
+        # Dict of stats.Stats objects, keyed by nodename
+        self.node_stats = collections.defaultdict(stats.Stats)
         self.tracked_instances = {}
         self.tracked_migrations = {}
         monitor_handler = monitors.MonitorHandler(self)
@@ -154,7 +196,7 @@ class ResourceTracker(object):
         except KeyError:
             raise exception.ComputeHostNotFound(host=nodename)
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_node
     def instance_claim(self, context, instance, nodename, limits=None):
         """Indicate that some resources are needed for an upcoming compute
         instance build operation.
@@ -215,8 +257,8 @@ class ResourceTracker(object):
 
         # self._set_instance_host_and_node() will save instance to the DB
         # so set instance.numa_topology first.  We need to make sure
-        # that numa_topology is saved while under COMPUTE_RESOURCE_SEMAPHORE
-        # so that the resource audit knows about any cpus we've pinned.
+        # that numa_topology is saved while under the lock of the node so
+        # that the resource audit knows about any cpus we've pinned.
         instance_numa_topology = claim.claimed_numa_topology
         instance.numa_topology = instance_numa_topology
         self._set_instance_host_and_node(instance, nodename)
@@ -236,7 +278,7 @@ class ResourceTracker(object):
 
         return claim
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_node
     def rebuild_claim(self, context, instance, nodename, limits=None,
                       image_meta=None, migration=None):
         """Create a claim for a rebuild operation."""
@@ -245,7 +287,7 @@ class ResourceTracker(object):
                                 migration, move_type='evacuation',
                                 limits=limits, image_meta=image_meta)
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_node
     def resize_claim(self, context, instance, instance_type, nodename,
                      migration, image_meta=None, limits=None):
         """Create a claim for a resize or cold-migration move."""
@@ -359,8 +401,8 @@ class ResourceTracker(object):
     def _create_migration(self, context, instance, new_instance_type,
                           nodename, move_type=None):
         """Create a migration record for the upcoming resize.  This should
-        be done while the COMPUTE_RESOURCES_SEMAPHORE is held so the resource
-        claim will not be lost if the audit process starts.
+        be done while the lock of the node is held so the resource claim
+        will not be lost if the audit process starts.
         """
         migration = objects.Migration(context=context.elevated())
         migration.dest_compute = self.host
@@ -386,7 +428,7 @@ class ResourceTracker(object):
         If a migration record was created already before the request made
         it to this compute host, only set up the migration so it's included in
         resource tracking. This should be done while the
-        COMPUTE_RESOURCES_SEMAPHORE is held.
+        lock of the node is held.
         """
         migration.dest_compute = self.host
         migration.dest_node = nodename
@@ -396,8 +438,8 @@ class ResourceTracker(object):
 
     def _set_instance_host_and_node(self, instance, nodename):
         """Tag the instance as belonging to this host.  This should be done
-        while the COMPUTE_RESOURCES_SEMAPHORE is held so the resource claim
-        will not be lost if the audit process starts.
+        while the lock of the node is held so the resource claim will not be
+        lost if the audit process starts.
         """
         instance.host = self.host
         instance.launched_on = self.host
@@ -407,14 +449,14 @@ class ResourceTracker(object):
     def _unset_instance_host_and_node(self, instance):
         """Untag the instance so it no longer belongs to the host.
 
-        This should be done while the COMPUTE_RESOURCES_SEMAPHORE is held so
-        the resource claim will not be lost if the audit process starts.
+        This should be done while the lock of the node is held so the
+        resource claim will not be lost if the audit process starts.
         """
         instance.host = None
         instance.node = None
         instance.save()
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_node
     def abort_instance_claim(self, context, instance, nodename):
         """Remove usage from the given instance."""
         self._update_usage_from_instance(context, instance, nodename,
@@ -437,7 +479,7 @@ class ResourceTracker(object):
                 dev_pools_obj = self.pci_tracker.stats.to_device_pools_obj()
                 self.compute_nodes[nodename].pci_device_pools = dev_pools_obj
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_node
     def drop_move_claim(self, context, instance, nodename,
                         instance_type=None, prefix='new_'):
         # Remove usage for an incoming/outgoing migration on the destination
@@ -472,7 +514,7 @@ class ResourceTracker(object):
             ctxt = context.elevated()
             self._update(ctxt, self.compute_nodes[nodename])
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_node
     def update_usage(self, context, instance, nodename):
         """Update the resource usage and stats after a change in an
         instance
@@ -608,11 +650,11 @@ class ResourceTracker(object):
         # as that is not part of resources
         # TODO(danms): Stop doing this when we get a column to store this
         # directly
-        prev_failed_builds = self.stats.get('failed_builds', 0)
-        self.stats.clear()
-        self.stats['failed_builds'] = prev_failed_builds
-        self.stats.digest_stats(resources.get('stats'))
-        compute_node.stats = copy.deepcopy(self.stats)
+        node_stats = self.node_stats[resources['hypervisor_hostname']]
+        node_stats.clear()
+        node_stats['failed_builds'] = self.stats.get('failed_builds', 0)
+        node_stats.digest_stats(resources.get('stats'))
+        compute_node.stats = copy.deepcopy(node_stats)
 
         # update the allocation ratios for the related ComputeNode object
         compute_node.ram_allocation_ratio = self.ram_allocation_ratio
@@ -702,7 +744,7 @@ class ResourceTracker(object):
                               'another host\'s instance!',
                           {'uuid': migration.instance_uuid})
 
-    @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
+    @_synchronized_node
     def _update_available_resource(self, context, resources):
 
         # initialize the compute node object, creating it
@@ -935,7 +977,7 @@ class ResourceTracker(object):
         cn.free_ram_mb = cn.memory_mb - cn.memory_mb_used
         cn.free_disk_gb = cn.local_gb - cn.local_gb_used
 
-        cn.running_vms = self.stats.num_instances
+        cn.running_vms = self.node_stats[nodename].num_instances
 
         # Calculate the numa usage
         free = sign == -1
@@ -1031,10 +1073,23 @@ class ResourceTracker(object):
                 cn.pci_device_pools = obj
             self.tracked_migrations[uuid] = migration
 
+    def _tracked_on_other_node(self, nodename, *nodes):
+        """Return True if an instance or migration tracked against the nodes
+        belongs to another node of this host than nodename.
+
+        The audit of a node only resets what is tracked for that node, so that
+        claims made meanwhile on the other nodes of the host are kept.
+        """
+        return (nodename not in nodes and
+                any(node in self.compute_nodes for node in nodes))
+
     def _update_usage_from_migrations(self, context, migrations, nodename):
         filtered = {}
         instances = {}
-        self.tracked_migrations.clear()
+        for uuid, migration in list(self.tracked_migrations.items()):
+            if not self._tracked_on_other_node(
+                    nodename, migration.source_node, migration.dest_node):
+                del self.tracked_migrations[uuid]
 
         # do some defensive filtering against bad migrations records in the
         # database:
@@ -1113,8 +1168,12 @@ class ResourceTracker(object):
             sign = -1
 
         cn = self.compute_nodes[nodename]
-        self.stats.update_stats_for_instance(instance, is_removed_instance)
-        cn.stats = copy.deepcopy(self.stats)
+        node_stats = self.node_stats[nodename]
+        node_stats.update_stats_for_instance(instance, is_removed_instance)
+        # Like when the resources are audited, report the failed builds
+        # counted by the compute manager since.
+        node_stats['failed_builds'] = self.stats.get('failed_builds', 0)
+        cn.stats = copy.deepcopy(node_stats)
 
         # if it's a new or deleted instance:
         if is_new_instance or is_removed_instance:
@@ -1130,7 +1189,7 @@ class ResourceTracker(object):
             self._update_usage(self._get_usage_dict(instance), nodename,
                                sign=sign)
 
-        cn.current_workload = self.stats.calculate_workload()
+        cn.current_workload = node_stats.calculate_workload()
         if self.pci_tracker:
             obj = self.pci_tracker.stats.to_device_pools_obj()
             cn.pci_device_pools = obj
@@ -1143,7 +1202,9 @@ class ResourceTracker(object):
         instances assigned to the local compute host, even if they are not
         currently powered on.
         """
-        self.tracked_instances.clear()
+        for uuid, instance in list(self.tracked_instances.items()):
+            if not self._tracked_on_other_node(nodename, instance.get('node')):
+                del self.tracked_instances[uuid]
 
         cn = self.compute_nodes[nodename]
         # set some initial values, reserve room for host/hypervisor:
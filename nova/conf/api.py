@@ -265,6 +265,134 @@ to provide the result. If you have a small number of cells, or tenants
 are likely to have instances in all cells, then this should be
 False. If you have many cells, especially if you confine tenants to a
 small subset of those cells, this should be True.
+"""),
+    cfg.StrOpt("instance_list_cells_batch_strategy",
+        choices=("fixed", "distributed"),
+        default="distributed",
+        help="""
+This controls the method by which the API queries cell databases in
+smaller batches during large instance list operations. If batching is
+performed, a large instance list operation will request some fraction
+of the overall API limit from each cell database initially, and will
+re-request that same batch size as records are consumed (returned)
+from each cell as necessary. Larger batches mean less chattiness
+between the API and the database, but potentially more wasted effort
+processing the results from the database which will not be returned to
+the user. Any strategy will yield a batch size of at least 100 records,
+to avoid a user causing many tiny database queries in their request.
+
+``distributed`` (the default) will attempt to divide the limit
+requested by the user by the number of cells in the system. This
+requires counting the cells in the system initially, which will not be
+refreshed until service restart or SIGHUP. The actual batch size will
+be increased by 10% over the result of ($limit / $num_cells).
+
+``fixed`` will simply request fixed-size batches from each cell, as
+defined by ``instance_list_cells_batch_fixed_size``. If the limit is
+smaller than the batch size, the limit will be used instead. If you do
+not wish batching to be used at all, setting the fixed size equal to
+the ``max_limit`` value will cause only one request per cell database
+to be issued.
+
+Related options:
+
+* instance_list_cells_batch_fixed_size
+* max_limit
+"""),
+    cfg.IntOpt("instance_list_cells_batch_fixed_size",
+        min=100,
+        default=100,
+        help="""
+This controls the batch size of instances requested from each cell
+database if ``instance_list_cells_batch_strategy`` is set to ``fixed``.
+This integral value will define the limit issued to each cell every time
+a batch of instances is requested, regardless of the number of cells in
+the system or any other factors. Per the general logic called out in
+the documentation for ``instance_list_cells_batch_strategy``, the
+minimum value for this is 100 records per batch.
+
+Related options:
+
+* instance_list_cells_batch_strategy
+* max_limit
+"""),
+    cfg.IntOpt("instance_list_marker_cache_expiration",
+        default=0,
+        min=0,
+        help="""
+Number of seconds the position of every cell after the last instance of a
+page of an instance list is cached.
+
+When a page of an instance list request ends, the sort key values of its last
+instance and the last instance returned from each cell are cached for the
+same filters and sort order. If that last instance is then used as the marker
+of the next page, which is what the ``next`` link of the page does, each cell
+resumes the listing after its own last instance. This avoids looking the
+marker instance up in its cell, and the equivalent marker up by value in
+every other cell, for every page.
+
+Instances created since the previous page in a cell, which sort between the
+last instance returned from that cell and the marker, are returned in the
+next page instead of being skipped.
+
+The cache is configured in the ``[cache]`` section, which must be enabled for
+positions to be cached. As the next page may be requested from another API
+worker, the cache backend should be shared by the API workers. An in-memory
+backend keeps its entries in every API worker, and may only evict an expired
+position when the same page is requested again.
+
+Possible values:
+
+* 0: Positions are not cached (default).
+* Any positive integer: Number of seconds a position is cached.
+"""),
+    cfg.BoolOpt("instance_list_ip_filter_using_ports",
+        default=False,
+        help="""
+When enabled, listing servers filtered by the ``ip`` or ``ip6`` query
+parameters resolves the matching servers from the fixed IPs of the Neutron
+ports of the project, and then only queries the cell databases for those
+servers, with the requested limit.
+
+When disabled, and Neutron does not have the ``ip-substring-filtering``
+extension, the limit is removed from the cell database queries and the
+filter is applied to the network info cache of every server of the project,
+which is slow for projects with many servers.
+
+This option only applies when Neutron is used and does not have the
+``ip-substring-filtering`` extension.
+"""),
+    cfg.IntOpt("server_list_cache_ttl",
+        default=0,
+        min=0,
+        help="""
+Number of seconds a rendered page of ``GET /servers`` or
+``GET /servers/detail`` is cached by the API.
+
+Pages are cached per project, user, roles, microversion and query. Before a
+cached page is returned, the API checks in the API database and in every cell
+database the project may have servers in that no server of the project was
+created, updated or deleted, and that the network info of none of them
+changed, since the page was rendered. This check is a few aggregate queries
+which are much cheaper than listing the servers, so that pages polled often
+and seldom changing are served quickly.
+
+Changes which are not recorded on the server itself, like metadata or tag
+updates, or the status of the compute service shown to administrators, are
+only picked up once the cached page expires. Listings across all projects are
+never cached.
+
+The cache is configured in the ``[cache]`` section, which must be enabled for
+pages to be cached. Every page rendered is stored for this number of seconds,
+and a page can be several megabytes for large limits, so the cache backend
+should have enough memory for all the pages requested in that period. An
+in-memory backend keeps its entries in every API worker, and may only evict an
+expired page when the same page is requested again.
+
+Possible values:
+
+* 0: Pages are not cached (default).
+* Any positive integer: Number of seconds a page is cached.
 """),
 ]
 
@@ -606,7 +606,49 @@ for performance reasons, for example, with Ironic.
 Possible values:
 
 * Any positive integer representing greenthreads count.
-""")
+"""),
+    cfg.IntOpt('update_resources_pool_size',
+        default=1,
+        min=1,
+        help="""
+Number of compute nodes audited concurrently by the update_available_resource
+periodic task.
+
+Compute services managing many nodes, like those using the ironic driver,
+audit each node in turn by default. Raising this value lets the audit of
+slow nodes overlap, so the periodic task can complete within its interval.
+Instance claims only wait for the audit of the node they are made on.
+
+Possible values:
+
+* 1 (default): Nodes are audited one at a time.
+* Any integer greater than 1 representing greenthreads count.
+
+Related options:
+
+* ``update_resources_interval``
+"""),
+    cfg.IntOpt('periodic_task_pool_size',
+        default=1,
+        min=1,
+        help="""
+Number of greenthreads available to run the periodic tasks of the compute
+service.
+
+By default the periodic tasks of the compute service, such as the power state
+sync, the image cache manager pass or the resource audit, run one after the
+other, so a slow task delays all the others. Raising this value runs the due
+tasks concurrently. A task is skipped while its previous run is still in
+progress.
+
+The duration of each run, the number of skipped runs and the number of runs
+lasting longer than the interval of the task are logged and counted per task.
+
+Possible values:
+
+* 1 (default): Periodic tasks run one at a time.
+* Any integer greater than 1 representing greenthreads count.
+"""),
 ]
 
 compute_group_opts = [
@@ -791,6 +833,27 @@ Possible values:
 
 * Any positive integer in seconds.
 * Any value <=0 will disable the sync. This is not recommended.
+"""),
+    cfg.IntOpt('heal_instance_info_cache_batch_size',
+        default=1,
+        min=1,
+        help="""
+Number of instances whose network information cache is updated per run.
+
+By default the network information cache of a single instance is updated
+every ``heal_instance_info_cache_interval`` seconds, so healing the cache of
+all the instances of a host with many instances can take hours. When more
+than one instance is updated per run, the ports of all of them are listed
+with one request to Neutron per 150 instances.
+
+Possible values:
+
+* Any positive integer. Setting it to at least the number of instances on
+  the host updates the cache of every instance on each run.
+
+Related options:
+
+* ``heal_instance_info_cache_interval``
 """),
     cfg.IntOpt('reclaim_instance_interval',
         default=0,
@@ -79,6 +79,49 @@ Related options:
         min=0,
         help='Timeout (seconds) to wait for node serial console state '
              'changed. Set to 0 to disable timeout.'),
+    cfg.BoolOpt(
+        'incremental_node_cache_refresh',
+        default=False,
+        help="""
+Refresh the cache of nodes incrementally.
+
+The compute service refreshes its cache of the nodes it manages at every run
+of the update_available_resource periodic task. By default, this lists the
+details of all the nodes known to ironic. When enabled, only the UUID,
+instance UUID and last update time of the nodes are listed, and only the
+nodes managed by this compute service which changed since the last refresh
+are fetched. The details of all nodes are still listed when the cache is
+empty or many nodes changed.
+
+Related options:
+
+* node_cache_max_age
+"""),
+    cfg.IntOpt(
+        'node_cache_max_age',
+        default=0,
+        min=0,
+        help="""
+Maximum age, in seconds, of the node cache for it to be used to get the power
+state of instances.
+
+By default, every instance power state lookup, like those of the
+_sync_power_states periodic task, gets the node of the instance from ironic.
+When set, the node is taken from the cache of nodes refreshed by the
+update_available_resource periodic task, as long as the cache is not older
+than this value. Nodes acted upon by this compute service are always fetched
+from ironic until the next refresh of the cache.
+
+Possible values:
+
+* 0 (default): Always get the node of an instance from ironic.
+* Any positive integer in seconds.
+
+Related options:
+
+* incremental_node_cache_refresh
+* ``[DEFAULT] update_resources_interval``
+"""),
 ]
 
 deprecated_opts = {
@@ -76,6 +76,22 @@ Neutron for extensions.  After this number of seconds the next time Nova
 needs to create a resource in Neutron it will requery Neutron for the
 extensions that it has loaded.  Setting value to 0 will refresh the
 extensions with no wait.
+"""),
+    cfg.IntOpt('port_operations_pool_size',
+        default=1,
+        min=1,
+        help="""
+Number of greenthreads available to create and update the ports of an
+instance concurrently.
+
+When allocating the network of an instance with several ports, nova creates
+one port per requested network and then updates every port to bind it to the
+instance and host. With the default value of 1, those calls are sent to
+Neutron one after the other. Setting a higher value sends up to this many
+port create and update requests at the same time, which reduces the time it
+takes to build instances with many ports. If any of the requests fails, every
+port created for the instance is deleted and the pre-existing ports which were
+updated are unbound again.
 """),
 ]
 
@@ -35,6 +35,30 @@ are returned in a deterministic but undefined order. That is, all things
 being equal, two requests for allocation candidates will return the same
 results in the same order; but no guarantees are made as to how that order
 is determined.
+"""),
+    cfg.IntOpt(
+        'allocation_candidates_cache_ttl',
+        default=0,
+        min=0,
+        help="""
+Number of seconds the placement service caches the providers having some
+traits or associated with some aggregates when listing allocation candidates.
+
+Looking up the providers matching the required and forbidden traits and the
+member_of aggregates of a GET /allocation_candidates request is repeated for
+every request, while these associations rarely change. Caching them reduces
+the load on the placement database when many instances are scheduled at
+once. The usage and inventory of the providers are always read from the
+database.
+
+The cache of a placement API process is cleared when that process changes
+the traits or aggregates of a provider. Changes made through other placement
+API processes are taken into account after at most this number of seconds.
+
+Possible values:
+
+* 0 (default), the lookups are not cached.
+* A positive integer, the number of seconds the lookups are cached for.
 """),
     # TODO(mriedem): When placement is split out of nova, this should be
     # deprecated since then [oslo_policy]/policy_file can be used.
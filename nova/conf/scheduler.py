@@ -278,6 +278,56 @@ NOTE: In a multi-cell (v2) setup where the cell MQ is separated from the
 top-level, computes cannot directly communicate with the scheduler. Thus,
 this option cannot be enabled in that scenario. See also the
 [workarounds]/disable_group_policy_check_upcall option.
+"""),
+    cfg.BoolOpt("batch_claims",
+        default=False,
+        help="""
+Claim the resources of all the instances of a multi-create request at once.
+
+By default, when several instances are requested at once, the scheduler
+selects a host for each instance and claims its resources in the placement
+service one instance at a time, which takes one placement request per
+instance. When this option is enabled, the scheduler first selects a host for
+every instance and then claims the resources of all of them with a single
+placement request. If that claim fails, for example because another scheduler
+consumed the resources of one of the selected hosts in the meantime, nothing
+is claimed and the scheduler falls back to claiming one instance at a time.
+
+This option is only used by the FilterScheduler and its subclasses; if you use
+a different scheduler, this option has no effect.
+"""),
+    cfg.IntOpt("host_state_resync_interval",
+        default=0,
+        min=0,
+        help="""
+Interval in seconds between full reloads of the compute node records used to
+build host states.
+
+By default, the scheduler reads every compute node record from every cell on
+each scheduling request. When this option is set to a positive value, the
+scheduler caches the compute node records and, on each request, only reads
+the records which were created, updated or deleted since the previous request.
+The full list of compute nodes is reloaded from each cell once this many
+seconds have passed since the last full reload, as a safety net against
+missed changes (for example because of clock skew between the compute hosts
+and the scheduler).
+
+Instance changes on hosts are tracked separately, see the
+``track_instance_changes`` option.
+
+This option is only used by the FilterScheduler and its subclasses; if you use
+a different scheduler, this option has no effect.
+
+Possible values:
+
+* 0: Disable the compute node cache and always read all compute node records
+  (the default).
+* A positive integer, where the integer corresponds to the number of seconds
+  between full reloads of the compute node records.
+
+Related options:
+
+* track_instance_changes
 """),
     cfg.MultiStrOpt("available_filters",
         default=["nova.scheduler.filters.all_filters"],
@@ -537,6 +587,60 @@ In such case enabling this option will reduce contention and chances for
 rescheduling events.
 At the same time it will make the instance packing (even in unweighed case)
 less dense.
+"""),
+    cfg.IntOpt(
+        "host_filter_batch_size",
+        default=0,
+        min=0,
+        help="""
+Number of hosts checked by a filter before yielding to the other requests.
+
+The scheduler service runs the requests it receives in greenthreads, which
+share a single CPU. Filters which check the hosts one by one, like the
+NUMATopologyFilter, the PciPassthroughFilter or the JsonFilter, can take a
+long time on deployments with a large number of hosts, during which the
+other requests and the heartbeats of the service are blocked. Setting this
+option makes these filters yield to the other greenthreads after checking
+each batch of this number of hosts, which bounds the latency added to the
+other requests.
+
+This option is only used by the FilterScheduler and its subclasses; if you use
+a different scheduler, this option has no effect.
+
+Possible values:
+
+* 0 (default), the filters check all of the hosts without yielding.
+* A positive integer, the number of hosts checked by a filter between two
+  yields.
+"""),
+    cfg.BoolOpt(
+        "sort_best_hosts_only",
+        default=False,
+        help="""
+Only sort the best weighed hosts instead of all of the filtered hosts.
+
+The scheduler picks a host for an instance among the host_subset_size best
+weighed hosts, and the alternate hosts among the next best weighed hosts of
+the same cell. Enabling this option makes the scheduler only sort the
+host_subset_size + max_attempts best weighed hosts, the other filtered hosts
+being kept in no particular order after them. This saves sorting all of the
+filtered hosts for each instance, which is beneficial for deployments with a
+large number of hosts.
+
+The hosts which are not sorted are only used when the resources could not be
+claimed on any of the sorted hosts, or when the sorted hosts do not include
+enough alternate hosts from the cell of the selected host. The
+shuffle_best_same_weighed_hosts option only shuffles the hosts with the best
+weight among the sorted hosts.
+
+This option is only used by the FilterScheduler and its subclasses; if you use
+a different scheduler, this option has no effect.
+
+Related options:
+
+* host_subset_size
+* [scheduler]/max_attempts
+* shuffle_best_same_weighed_hosts
 """),
     cfg.StrOpt(
         "image_properties_default_architecture",
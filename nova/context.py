@@ -145,6 +145,7 @@ class RequestContext(context.RequestContext):
         # provided by this module
         self.db_connection = None
         self.mq_connection = None
+        self.cell_uuid = None
 
         self.user_auth_plugin = user_auth_plugin
         if self.is_admin is None:
@@ -378,9 +379,11 @@ def set_target_cell(context, cell_mapping):
                 context.mq_connection = cell_tuple[1]
 
         get_or_set_cached_cell_and_set_connections()
+        context.cell_uuid = cell_mapping.uuid
     else:
         context.db_connection = None
         context.mq_connection = None
+        context.cell_uuid = None
 
 
 @contextmanager
@@ -774,6 +774,16 @@ def instance_get_all_uuids_by_host(context, host):
     return IMPL.instance_get_all_uuids_by_host(context, host)
 
 
+def instance_get_changes_mark(context, project_id):
+    """Get a value which changes whenever an instance of a project does.
+
+    The value is made of the number of instances of the project, deleted or
+    not, and of the latest time one of them was created, updated or deleted,
+    or had its network info cache updated.
+    """
+    return IMPL.instance_get_changes_mark(context, project_id)
+
+
 def instance_get_all_by_filters(context, filters, sort_key='created_at',
                                 sort_dir='desc', limit=None, marker=None,
                                 columns_to_join=None):
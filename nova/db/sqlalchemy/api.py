@@ -2598,6 +2598,27 @@ def instance_get_all_uuids_by_host(context, host):
     return _instance_get_all_uuids_by_host(context, host)
 
 
+@require_context
+@pick_context_manager_reader
+def instance_get_changes_mark(context, project_id):
+    instance_mark = model_query(context, models.Instance,
+                                (func.count(models.Instance.id),
+                                 func.max(models.Instance.created_at),
+                                 func.max(models.Instance.updated_at),
+                                 func.max(models.Instance.deleted_at)),
+                                read_deleted='yes').\
+                    filter(models.Instance.project_id == project_id).\
+                    one()
+    info_cache_mark = model_query(context, models.InstanceInfoCache,
+                                  (func.max(
+                                      models.InstanceInfoCache.updated_at),),
+                                  read_deleted='yes').\
+                      join(models.InstanceInfoCache.instance).\
+                      filter(models.Instance.project_id == project_id).\
+                      one()
+    return tuple(instance_mark) + tuple(info_cache_mark)
+
+
 @pick_context_manager_reader
 def instance_get_all_by_host_and_node(context, host, node,
                                       columns_to_join=None):
@@ -2916,6 +2937,10 @@ def instance_info_cache_update(context, instance_uuid, values):
         values['instance_uuid'] = instance_uuid
         info_cache = models.InstanceInfoCache(**values)
         needs_create = True
+    elif all(info_cache[key] == value for key, value in values.items()):
+        # The network info is refreshed periodically and usually does not
+        # change, so skip rewriting the same blob.
+        return info_cache
 
     try:
         with get_context_manager(context).writer.savepoint.using(context):
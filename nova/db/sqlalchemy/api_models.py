@@ -236,6 +236,7 @@ class BuildRequest(API_BASE):
     __table_args__ = (
         Index('build_requests_instance_uuid_idx', 'instance_uuid'),
         Index('build_requests_project_id_idx', 'project_id'),
+        Index('build_requests_created_at_idx', 'created_at'),
         schema.UniqueConstraint('instance_uuid',
             name='uniq_build_requests0instance_uuid'),
         )
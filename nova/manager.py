@@ -51,7 +51,12 @@ This module provides Manager, a base class for managers.
 
 """
 
+import functools
+
+import eventlet
+from oslo_log import log as logging
 from oslo_service import periodic_task
+from oslo_utils import timeutils
 import six
 
 import nova.conf
@@ -61,6 +66,7 @@ from nova import rpc
 
 
 CONF = nova.conf.CONF
+LOG = logging.getLogger(__name__)
 
 
 class PeriodicTasks(periodic_task.PeriodicTasks):
@@ -100,11 +106,111 @@ class Manager(base.Base, PeriodicTasks):
         self.notifier = rpc.get_notifier(self.service_name, self.host)
         self.additional_endpoints = []
         super(Manager, self).__init__()
+        # Periodic tasks run inline in the periodic thread unless
+        # _init_periodic_task_pool() is called.
+        self._periodic_task_pool = None
+        self._periodic_tasks_running = set()
+        self.periodic_task_stats = {}
+        self._periodic_tasks = [
+            (name, self._instrument_periodic_task(name, task))
+            for name, task in self._periodic_tasks]
 
     def periodic_tasks(self, context, raise_on_error=False):
         """Tasks to be run at a periodic interval."""
         return self.run_periodic_tasks(context, raise_on_error=raise_on_error)
 
+    def add_periodic_task(self, task):
+        super(Manager, self).add_periodic_task(task)
+        name = task._periodic_name
+        if (name in self._periodic_last_run and
+                name not in dict(self._periodic_tasks)):
+            self._periodic_tasks.append(
+                (name, self._instrument_periodic_task(name, task)))
+
+    def _init_periodic_task_pool(self, pool_size):
+        """Run the periodic tasks on a pool of greenthreads.
+
+        When pool_size is greater than 1, the due periodic tasks are spawned
+        on a pool of that many greenthreads instead of being run one after
+        the other, so that a slow task does not delay the others. A task is
+        skipped if its previous run has not finished yet.
+        """
+        if pool_size > 1:
+            self._periodic_task_pool = eventlet.GreenPool(size=pool_size)
+
+    def _instrument_periodic_task(self, task_name, task):
+        """Wrap a periodic task to time it and to run it on the periodic task
+        pool, if any.
+        """
+        @functools.wraps(task)
+        def wrapper(manager, context):
+            if self._periodic_task_pool is None:
+                return self._run_periodic_task(task_name, task, context)
+
+            if task_name in self._periodic_tasks_running:
+                LOG.debug('Skipping periodic task %s because its previous '
+                          'run has not finished yet', task_name)
+                self._report_periodic_task(task_name, skipped=True)
+                return
+            self._periodic_tasks_running.add(task_name)
+            self._periodic_task_pool.spawn_n(
+                self._run_periodic_task_in_pool, task_name, task, context)
+
+        return wrapper
+
+    def _run_periodic_task_in_pool(self, task_name, task, context):
+        try:
+            self._run_periodic_task(task_name, task, context)
+        except Exception:
+            LOG.exception('Error during periodic task %s', task_name)
+        finally:
+            self._periodic_tasks_running.discard(task_name)
+
+    def _run_periodic_task(self, task_name, task, context):
+        with timeutils.StopWatch() as timer:
+            try:
+                return task(self, context)
+            finally:
+                self._report_periodic_task(task_name,
+                                           duration=timer.elapsed(),
+                                           spacing=task._periodic_spacing)
+
+    def _report_periodic_task(self, task_name, duration=None, spacing=None,
+                              skipped=False):
+        """Record a run, or a skipped run, of a periodic task.
+
+        This is the instrumentation hook for periodic tasks: the counters in
+        ``periodic_task_stats`` are updated here and subclasses can override
+        this method to export them elsewhere.
+
+        :param task_name: The name of the periodic task.
+        :param duration: How long the task ran, in seconds, or None if it was
+            skipped.
+        :param spacing: The interval of the task, in seconds; a run lasting
+            longer than that is counted as an overrun.
+        :param skipped: True if the task was not run because its previous
+            run had not finished yet.
+        """
+        stats = self.periodic_task_stats.setdefault(
+            task_name, {'runs': 0, 'skips': 0, 'overruns': 0,
+                        'last_duration': None, 'total_duration': 0.0})
+        if skipped:
+            stats['skips'] += 1
+            return
+
+        stats['runs'] += 1
+        stats['last_duration'] = duration
+        stats['total_duration'] += duration
+        if spacing is not None and duration > spacing:
+            stats['overruns'] += 1
+            LOG.warning('Periodic task %(task)s took %(duration).2f seconds '
+                        'to run, longer than its %(spacing)s seconds '
+                        'interval.', {'task': task_name, 'duration': duration,
+                                      'spacing': spacing})
+        else:
+            LOG.debug('Periodic task %(task)s ran in %(duration).2f seconds',
+                      {'task': task_name, 'duration': duration})
+
     def init_host(self):
         """Hook to do additional manager initialization when one requests
         the service be started.  This is called before any service record
@@ -222,6 +222,10 @@ class NetworkAPI(base.Base):
         """List ports."""
         raise NotImplementedError()
 
+    def get_instances_ports(self, context, instances):
+        """Returns the ports of several instances, keyed by instance uuid."""
+        raise NotImplementedError()
+
     def show_port(self, *args, **kwargs):
         """Show specific port."""
         raise NotImplementedError()
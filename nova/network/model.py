@@ -511,7 +511,9 @@ class NetworkInfo(list):
         pass
 
     def json(self):
-        return jsonutils.dumps(self)
+        # Sorting the keys makes the serialized form of an unchanged network
+        # info stable, so that the info cache is not rewritten for nothing.
+        return jsonutils.dumps(self, sort_keys=True, separators=(',', ':'))
 
 
 class NetworkInfoAsyncWrapper(NetworkInfo):
@@ -16,8 +16,11 @@
 #
 
 import copy
+import functools
+import sys
 import time
 
+import eventlet
 from keystoneauth1 import loading as ks_loading
 from neutronclient.common import exceptions as neutron_client_exc
 from neutronclient.v2_0 import client as clientv20
@@ -56,6 +59,9 @@ DEFAULT_SECGROUP = 'default'
 BINDING_PROFILE = 'binding:profile'
 BINDING_HOST_ID = 'binding:host_id'
 MIGRATING_ATTR = 'migrating_to'
+# The maximum number of ids searched for in a single request, since the
+# search criteria form part of the URL, which has a fixed max size
+MAX_SEARCH_IDS = 150
 
 
 def reset_state():
@@ -822,6 +828,57 @@ class API(base_api.NetworkAPI):
 
         return {net['id']: net for net in nets}
 
+    @staticmethod
+    def _check_security_groups_can_be_applied(instance, network,
+                                              security_group_ids):
+        """Raises SecurityGroupCannotBeApplied if the security groups can't
+        be applied to a port created on the given network.
+        """
+        port_security_enabled = network.get('port_security_enabled', True)
+        if port_security_enabled:
+            if not network.get('subnets'):
+                # Neutron can't apply security groups to a port
+                # for a network without L3 assignments.
+                LOG.debug('Network with port security enabled does '
+                          'not have subnets so security groups '
+                          'cannot be applied: %s',
+                          network, instance=instance)
+                raise exception.SecurityGroupCannotBeApplied()
+        else:
+            if security_group_ids:
+                # We don't want to apply security groups on port
+                # for a network defined with
+                # 'port_security_enabled=False'.
+                LOG.debug('Network has port security disabled so '
+                          'security groups cannot be applied: %s',
+                          network, instance=instance)
+                raise exception.SecurityGroupCannotBeApplied()
+
+    @staticmethod
+    def _run_port_operations(context, calls):
+        """Run the given callables on a pool of greenthreads.
+
+        Up to ``[neutron]port_operations_pool_size`` callables run at the
+        same time. Every callable is run, even if some of them fail, so that
+        the caller knows about everything it has to roll back.
+
+        :param context: The request context, stored in each greenthread so
+            that the logs keep the request ID.
+        :param calls: a list of callables taking no argument
+        :returns: a list of (result, exc_info) tuples in the order of
+            ``calls``; exc_info is None if the callable succeeded, and
+            result is None if it failed.
+        """
+        def _run(call):
+            context.update_store()
+            try:
+                return call(), None
+            except Exception:
+                return None, sys.exc_info()
+
+        pool = eventlet.GreenPool(CONF.neutron.port_operations_pool_size)
+        return list(pool.imap(_run, calls))
+
     def _create_ports_for_instance(self, context, instance, ordered_networks,
             nets, neutron, security_group_ids):
         """Create port for network_requests that don't have a port_id
@@ -837,6 +894,11 @@ class API(base_api.NetworkAPI):
             created_port_uuid will be None for the pair where a pre-existing
             port was part of the user request
         """
+        if CONF.neutron.port_operations_pool_size > 1:
+            return self._create_ports_for_instance_concurrently(
+                context, instance, ordered_networks, nets, neutron,
+                security_group_ids)
+
         created_port_ids = []
         requests_and_created_ports = []
         for request in ordered_networks:
@@ -847,26 +909,8 @@ class API(base_api.NetworkAPI):
                 continue
 
             try:
-                port_security_enabled = network.get(
-                    'port_security_enabled', True)
-                if port_security_enabled:
-                    if not network.get('subnets'):
-                        # Neutron can't apply security groups to a port
-                        # for a network without L3 assignments.
-                        LOG.debug('Network with port security enabled does '
-                                  'not have subnets so security groups '
-                                  'cannot be applied: %s',
-                                  network, instance=instance)
-                        raise exception.SecurityGroupCannotBeApplied()
-                else:
-                    if security_group_ids:
-                        # We don't want to apply security groups on port
-                        # for a network defined with
-                        # 'port_security_enabled=False'.
-                        LOG.debug('Network has port security disabled so '
-                                  'security groups cannot be applied: %s',
-                                  network, instance=instance)
-                        raise exception.SecurityGroupCannotBeApplied()
+                self._check_security_groups_can_be_applied(
+                    instance, network, security_group_ids)
 
                 created_port_id = None
                 if not request.port_id:
@@ -888,6 +932,47 @@ class API(base_api.NetworkAPI):
 
         return requests_and_created_ports
 
+    def _create_ports_for_instance_concurrently(self, context, instance,
+            ordered_networks, nets, neutron, security_group_ids):
+        """Same as ``_create_ports_for_instance`` but creates the ports
+        concurrently.
+
+        All the networks are checked before creating any port. If any port
+        fails to be created, the ports which were created are deleted and
+        the first error is raised.
+        """
+        requests = []
+        for request in ordered_networks:
+            network = nets.get(request.network_id)
+            # if network_id did not pass validate_networks() and not available
+            # here then skip it safely not continuing with a None Network
+            if not network:
+                continue
+            self._check_security_groups_can_be_applied(
+                instance, network, security_group_ids)
+            requests.append(request)
+
+        # create minimal ports, if ports not already created by user
+        results = self._run_port_operations(context, [
+            functools.partial(self._create_port_minimal, neutron, instance,
+                              request.network_id, request.address,
+                              security_group_ids)
+            for request in requests if not request.port_id])
+
+        created_port_ids = [port['id'] for port, exc_info in results
+                            if exc_info is None]
+        errors = [exc_info for port, exc_info in results
+                  if exc_info is not None]
+        if errors:
+            if created_port_ids:
+                self._delete_ports(neutron, instance, created_port_ids)
+            six.reraise(*errors[0])
+
+        created_port_ids = iter(created_port_ids)
+        return [(request,
+                 None if request.port_id else next(created_port_ids))
+                for request in requests]
+
     def allocate_for_instance(self, context, instance, vpn,
                               requested_networks, macs=None,
                               security_groups=None, bind_host_id=None):
@@ -1022,6 +1107,12 @@ class API(base_api.NetworkAPI):
             * list of created port IDs
         """
 
+        if CONF.neutron.port_operations_pool_size > 1:
+            return self._update_ports_for_instance_concurrently(
+                context, instance, neutron, admin_client,
+                requests_and_created_ports, nets, bind_host_id,
+                available_macs, requested_ports_dict)
+
         # We currently require admin creds to set port bindings.
         port_client = admin_client
 
@@ -1043,14 +1134,8 @@ class API(base_api.NetworkAPI):
 
             nets_in_requested_order.append(network)
 
-            zone = 'compute:%s' % instance.availability_zone
-            port_req_body = {'port': {'device_id': instance.uuid,
-                                      'device_owner': zone}}
-            if (requested_ports_dict and
-                request.port_id in requested_ports_dict and
-                requested_ports_dict[request.port_id].get(BINDING_PROFILE)):
-                port_req_body['port'][BINDING_PROFILE] = (
-                    requested_ports_dict[request.port_id][BINDING_PROFILE])
+            port_req_body = self._get_port_req_body(
+                instance, request, requested_ports_dict)
             try:
                 self._populate_neutron_extension_values(
                     context, instance, request.pci_request_id, port_req_body,
@@ -1105,6 +1190,110 @@ class API(base_api.NetworkAPI):
         return (nets_in_requested_order, ports_in_requested_order,
             preexisting_port_ids, created_port_ids)
 
+    def _update_ports_for_instance_concurrently(self, context, instance,
+            neutron, admin_client, requests_and_created_ports, nets,
+            bind_host_id, available_macs, requested_ports_dict):
+        """Same as ``_update_ports_for_instance`` but updates the ports
+        concurrently.
+
+        The request bodies are built first, in the requested order, so that
+        the MAC addresses are assigned as they are by
+        ``_update_ports_for_instance``. If any port fails to be updated, the
+        pre-existing ports which were updated are unbound, all the created
+        ports are deleted and the first error is raised.
+        """
+        # We currently require admin creds to set port bindings.
+        port_client = admin_client
+
+        created_port_ids = [port_id for request, port_id
+                            in requests_and_created_ports if port_id]
+        ports_in_requested_order = []
+        nets_in_requested_order = []
+        updates = []
+        try:
+            for request, created_port_id in requests_and_created_ports:
+                network = nets.get(request.network_id)
+                # if network_id did not pass validate_networks() and not
+                # available here then skip it safely not continuing with a
+                # None Network
+                if not network:
+                    continue
+
+                nets_in_requested_order.append(network)
+                port_id = created_port_id or request.port_id
+                ports_in_requested_order.append(port_id)
+
+                port_req_body = self._get_port_req_body(
+                    instance, request, requested_ports_dict)
+                self._populate_neutron_extension_values(
+                    context, instance, request.pci_request_id, port_req_body,
+                    network=network, neutron=neutron,
+                    bind_host_id=bind_host_id)
+                self._populate_pci_mac_address(instance,
+                    request.pci_request_id, port_req_body)
+                self._populate_mac_address(
+                    instance, port_req_body, available_macs)
+
+                vifobj = objects.VirtualInterface(context)
+                vifobj.instance_uuid = instance.uuid
+                vifobj.tag = request.tag if 'tag' in request else None
+                updates.append((network, port_id, port_req_body, vifobj))
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self._delete_ports(neutron, instance, created_port_ids)
+
+        updated_port_ids = []
+        created_vifs = []   # this list is for cleanups if we fail
+
+        def _update(network, port_id, port_req_body, vifobj):
+            updated_port = self._update_port(
+                port_client, instance, port_id, port_req_body)
+            updated_port_ids.append(port_id)
+
+            # The MAC address is namespaced with the port id, see
+            # _update_ports_for_instance.
+            vifobj.address = '%s/%s' % (updated_port['mac_address'],
+                                        updated_port['id'])
+            vifobj.uuid = port_id
+            vifobj.create()
+            created_vifs.append(vifobj)
+
+            self._update_port_dns_name(context, instance, network, port_id,
+                                       neutron)
+
+        results = self._run_port_operations(
+            context, [functools.partial(_update, *update)
+                      for update in updates])
+        errors = [exc_info for result, exc_info in results
+                  if exc_info is not None]
+        if errors:
+            self._unbind_ports(context,
+                               [port_id for port_id in updated_port_ids
+                                if port_id not in created_port_ids],
+                               neutron, port_client)
+            self._delete_ports(neutron, instance, created_port_ids)
+            for vif in created_vifs:
+                vif.destroy()
+            six.reraise(*errors[0])
+
+        preexisting_port_ids = [port_id for port_id in ports_in_requested_order
+                                if port_id not in created_port_ids]
+        return (nets_in_requested_order, ports_in_requested_order,
+            preexisting_port_ids, created_port_ids)
+
+    @staticmethod
+    def _get_port_req_body(instance, request, requested_ports_dict):
+        """Returns the body of the request binding a port to the instance."""
+        zone = 'compute:%s' % instance.availability_zone
+        port_req_body = {'port': {'device_id': instance.uuid,
+                                  'device_owner': zone}}
+        if (requested_ports_dict and
+            request.port_id in requested_ports_dict and
+            requested_ports_dict[request.port_id].get(BINDING_PROFILE)):
+            port_req_body['port'][BINDING_PROFILE] = (
+                requested_ports_dict[request.port_id][BINDING_PROFILE])
+        return port_req_body
+
     def _refresh_neutron_extensions_cache(self, context, neutron=None):
         """Refresh the neutron extensions cache when necessary."""
         if (not self.last_neutron_extension_sync or
@@ -1363,6 +1552,28 @@ class API(base_api.NetworkAPI):
         """List ports for the client based on search options."""
         return get_client(context).list_ports(**search_opts)
 
+    def get_instances_ports(self, context, instances):
+        """Returns the ports of several instances, keyed by instance uuid.
+
+        The ports are listed with one request to neutron per MAX_SEARCH_IDS
+        instances, and can be passed to get_instance_nw_info to refresh the
+        network info cache of each of the instances without listing its
+        ports again.
+        """
+        project_ids = {instance.uuid: instance.project_id
+                       for instance in instances}
+        device_ids = list(project_ids)
+        client = get_client(context, admin=True)
+        ports = {instance_uuid: [] for instance_uuid in project_ids}
+        for i in range(0, len(device_ids), MAX_SEARCH_IDS):
+            data = client.list_ports(
+                device_id=device_ids[i:i + MAX_SEARCH_IDS])
+            for port in data.get('ports', []):
+                # Apply the same filters as _build_network_info_model does
+                if project_ids.get(port['device_id']) == port['tenant_id']:
+                    ports[port['device_id']].append(port)
+        return ports
+
     def show_port(self, context, port_id):
         """Return the port for the client given the port id.
 
@@ -1406,7 +1617,8 @@ class API(base_api.NetworkAPI):
 
     def _get_instance_nw_info(self, context, instance, networks=None,
                               port_ids=None, admin_client=None,
-                              preexisting_port_ids=None, **kwargs):
+                              preexisting_port_ids=None, ports=None,
+                              **kwargs):
         # NOTE(danms): This is an inner method intended to be called
         # by other code that updates instance nwinfo. It *must* be
         # called with the refresh_cache-%(instance_uuid) lock held!
@@ -1417,7 +1629,7 @@ class API(base_api.NetworkAPI):
         compute_utils.refresh_info_cache_for_instance(context, instance)
         nw_info = self._build_network_info_model(context, instance, networks,
                                                  port_ids, admin_client,
-                                                 preexisting_port_ids)
+                                                 preexisting_port_ids, ports)
         return network_model.NetworkInfo.hydrate(nw_info)
 
     def _gather_port_ids_and_networks(self, context, instance, networks=None,
@@ -2268,12 +2480,56 @@ class API(base_api.NetworkAPI):
         """Force add a network to the project."""
         raise NotImplementedError()
 
-    def _nw_info_get_ips(self, client, port):
+    def _get_ports_resources(self, client, ports):
+        """Get the floating IPs, subnets and DHCP ports of several ports.
+
+        Each kind of resource is listed with a single request for all the
+        ports, rather than with one request per port, fixed IP or subnet.
+
+        :param client: Neutron client.
+        :param ports: List of ports.
+        :return: A dict of the floating IPs keyed by the port ID and fixed
+            IP address they are associated with, and the lists of the
+            subnets and the DHCP ports.
+        """
+        floating_ips = {}
+        for fip in self._safe_get_floating_ips(
+                client, port_id=[port['id'] for port in ports]):
+            key = (fip['port_id'], fip['fixed_ip_address'])
+            floating_ips.setdefault(key, []).append(fip)
+
+        subnet_ids = []
+        for port in ports:
+            for fixed_ip in port['fixed_ips']:
+                if fixed_ip['subnet_id'] not in subnet_ids:
+                    subnet_ids.append(fixed_ip['subnet_id'])
+        subnets = []
+        dhcp_ports = []
+        if subnet_ids:
+            subnets = client.list_subnets(id=subnet_ids).get('subnets', [])
+        network_ids = []
+        for subnet in subnets:
+            if subnet['network_id'] not in network_ids:
+                network_ids.append(subnet['network_id'])
+        if network_ids:
+            dhcp_ports = client.list_ports(
+                network_id=network_ids,
+                device_owner='network:dhcp').get('ports', [])
+
+        return {'floating_ips': floating_ips,
+                'subnets': subnets,
+                'dhcp_ports': dhcp_ports}
+
+    def _nw_info_get_ips(self, client, port, resources=None):
         network_IPs = []
         for fixed_ip in port['fixed_ips']:
             fixed = network_model.FixedIP(address=fixed_ip['ip_address'])
-            floats = self._get_floating_ips_by_fixed_and_port(
-                client, fixed_ip['ip_address'], port['id'])
+            if resources is None:
+                floats = self._get_floating_ips_by_fixed_and_port(
+                    client, fixed_ip['ip_address'], port['id'])
+            else:
+                floats = resources['floating_ips'].get(
+                    (port['id'], fixed_ip['ip_address']), [])
             for ip in floats:
                 fip = network_model.IP(address=ip['floating_ip_address'],
                                        type='floating')
@@ -2281,8 +2537,10 @@ class API(base_api.NetworkAPI):
             network_IPs.append(fixed)
         return network_IPs
 
-    def _nw_info_get_subnets(self, context, port, network_IPs, client=None):
-        subnets = self._get_subnets_from_port(context, port, client)
+    def _nw_info_get_subnets(self, context, port, network_IPs, client=None,
+                             resources=None):
+        subnets = self._get_subnets_from_port(context, port, client,
+                                              resources=resources)
         for subnet in subnets:
             subnet['ips'] = [fixed_ip for fixed_ip in network_IPs
                              if fixed_ip.is_in_subnet(subnet)]
@@ -2372,7 +2630,7 @@ class API(base_api.NetworkAPI):
                 if vif.get('preserve_on_delete')]
 
     def _build_vif_model(self, context, client, current_neutron_port,
-                         networks, preexisting_port_ids):
+                         networks, preexisting_port_ids, resources=None):
         """Builds a ``nova.network.model.VIF`` object based on the parameters
         and current state of the port in Neutron.
 
@@ -2386,6 +2644,9 @@ class API(base_api.NetworkAPI):
         :param preexisting_port_ids: List of IDs of ports attached to a
             given server instance which Nova did not create and therefore
             should not delete when the port is detached from the server.
+        :param resources: The floating IPs, subnets and DHCP ports of the
+            port, as returned by _get_ports_resources. If None they are
+            retrieved from Neutron.
         :return: nova.network.model.VIF object which represents a port in the
             instance network info cache.
         """
@@ -2395,10 +2656,12 @@ class API(base_api.NetworkAPI):
             vif_active = True
 
         network_IPs = self._nw_info_get_ips(client,
-                                            current_neutron_port)
+                                            current_neutron_port,
+                                            resources=resources)
         subnets = self._nw_info_get_subnets(context,
                                             current_neutron_port,
-                                            network_IPs, client)
+                                            network_IPs, client,
+                                            resources=resources)
 
         devname = "tap" + current_neutron_port['id']
         devname = devname[:network_model.NIC_NAME_LEN]
@@ -2425,7 +2688,7 @@ class API(base_api.NetworkAPI):
 
     def _build_network_info_model(self, context, instance, networks=None,
                                   port_ids=None, admin_client=None,
-                                  preexisting_port_ids=None):
+                                  preexisting_port_ids=None, ports=None):
         """Return list of ordered VIFs attached to instance.
 
         :param context: Request context.
@@ -2443,6 +2706,9 @@ class API(base_api.NetworkAPI):
                         an instance is de-allocated. Supplied list will
                         be added to the cached list of preexisting port
                         IDs for this instance.
+        :param ports: List of the ports of the instance, as returned by
+                      get_instances_ports. If value is None the ports are
+                      listed from neutron.
         """
 
         search_opts = {'tenant_id': instance.project_id,
@@ -2452,9 +2718,11 @@ class API(base_api.NetworkAPI):
         else:
             client = admin_client
 
-        data = client.list_ports(**search_opts)
-
-        current_neutron_ports = data.get('ports', [])
+        if ports is None:
+            data = client.list_ports(**search_opts)
+            current_neutron_ports = data.get('ports', [])
+        else:
+            current_neutron_ports = ports
         nw_info_refresh = networks is None and port_ids is None
         networks, port_ids = self._gather_port_ids_and_networks(
                 context, instance, networks, port_ids, client)
@@ -2470,12 +2738,31 @@ class API(base_api.NetworkAPI):
             current_neutron_port_map[current_neutron_port['id']] = (
                 current_neutron_port)
 
+        if (ports is not None and
+                any(port_id not in current_neutron_port_map
+                    for port_id in port_ids)):
+            # The given ports were listed before the refresh_cache lock
+            # was taken, so a port attached since then can be missing from
+            # them. List the ports again rather than dropping it from the
+            # info cache.
+            data = client.list_ports(**search_opts)
+            current_neutron_port_map = {
+                port['id']: port for port in data.get('ports', [])}
+
+        resources = None
+        ports = [current_neutron_port_map[port_id] for port_id in port_ids
+                 if port_id in current_neutron_port_map]
+        if len(ports) > 1:
+            # Get the resources of all the ports at once, rather than with
+            # a few requests per port.
+            resources = self._get_ports_resources(client, ports)
+
         for port_id in port_ids:
             current_neutron_port = current_neutron_port_map.get(port_id)
             if current_neutron_port:
                 vif = self._build_vif_model(
                     context, client, current_neutron_port, networks,
-                    preexisting_port_ids)
+                    preexisting_port_ids, resources=resources)
                 nw_info.append(vif)
             elif nw_info_refresh:
                 LOG.info('Port %s from network info_cache is no '
@@ -2485,8 +2772,14 @@ class API(base_api.NetworkAPI):
 
         return nw_info
 
-    def _get_subnets_from_port(self, context, port, client=None):
-        """Return the subnets for a given port."""
+    def _get_subnets_from_port(self, context, port, client=None,
+                               resources=None):
+        """Return the subnets for a given port.
+
+        The subnets and DHCP ports are taken from resources, as returned by
+        _get_ports_resources, if given. Otherwise they are listed from
+        Neutron.
+        """
 
         fixed_ips = port['fixed_ips']
         # No fixed_ips for the port means there is no subnet associated
@@ -2496,11 +2789,16 @@ class API(base_api.NetworkAPI):
         # related to the port. To avoid this, the method returns here.
         if not fixed_ips:
             return []
-        if not client:
-            client = get_client(context)
-        search_opts = {'id': [ip['subnet_id'] for ip in fixed_ips]}
-        data = client.list_subnets(**search_opts)
-        ipam_subnets = data.get('subnets', [])
+        subnet_ids = [ip['subnet_id'] for ip in fixed_ips]
+        if resources is not None:
+            ipam_subnets = [subnet for subnet in resources['subnets']
+                            if subnet['id'] in subnet_ids]
+        else:
+            if not client:
+                client = get_client(context)
+            search_opts = {'id': subnet_ids}
+            data = client.list_subnets(**search_opts)
+            ipam_subnets = data.get('subnets', [])
         subnets = []
 
         for subnet in ipam_subnets:
@@ -2513,10 +2811,13 @@ class API(base_api.NetworkAPI):
                 subnet_dict['ipv6_address_mode'] = subnet['ipv6_address_mode']
 
             # attempt to populate DHCP server field
-            search_opts = {'network_id': subnet['network_id'],
-                           'device_owner': 'network:dhcp'}
-            data = client.list_ports(**search_opts)
-            dhcp_ports = data.get('ports', [])
+            if resources is not None:
+                dhcp_ports = resources['dhcp_ports']
+            else:
+                search_opts = {'network_id': subnet['network_id'],
+                               'device_owner': 'network:dhcp'}
+                data = client.list_ports(**search_opts)
+                dhcp_ports = data.get('ports', [])
             for p in dhcp_ports:
                 for ip_pair in p['fixed_ips']:
                     if ip_pair['subnet_id'] == subnet['id']:
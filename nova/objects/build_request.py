@@ -13,11 +13,13 @@
 import functools
 import re
 
+from oslo_db.sqlalchemy import utils as sqlalchemyutils
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_utils import versionutils
 from oslo_versionedobjects import exception as ovoo_exc
 import six
+from sqlalchemy.sql import func
 from sqlalchemy.sql import null
 
 from nova.db.sqlalchemy import api as db
@@ -261,17 +263,80 @@ class BuildRequestList(base.ObjectListBase, base.NovaObject):
         'objects': fields.ListOfObjectsField('BuildRequest'),
     }
 
+    # The filters and sort keys which can be applied in the database, mapped
+    # to the build_requests column they apply to.
+    _FILTER_COLUMNS = {'project_id': 'project_id', 'uuid': 'instance_uuid'}
+    _SORT_COLUMNS = {'created_at': 'created_at', 'id': 'id',
+                     'project_id': 'project_id', 'uuid': 'instance_uuid'}
+
     @staticmethod
-    @db.api_context_manager.reader
-    def _get_all_from_db(context):
+    def _get_query(context, column_filters):
         query = context.session.query(api_models.BuildRequest)
 
         if not context.is_admin:
             query = query.filter_by(project_id=context.project_id)
 
+        for key, value in column_filters.items():
+            column = getattr(api_models.BuildRequest,
+                             BuildRequestList._FILTER_COLUMNS[key])
+            if isinstance(value, (list, tuple, set, frozenset)):
+                query = query.filter(column.in_(value))
+            else:
+                query = query.filter(column == value)
+        return query
+
+    @staticmethod
+    @db.api_context_manager.reader
+    def _get_all_from_db(context, column_filters=None):
+        query = BuildRequestList._get_query(context, column_filters or {})
+        db_reqs = query.all()
+        return db_reqs
+
+    @staticmethod
+    @db.api_context_manager.reader
+    def _get_page_from_db(context, column_filters, limit, marker, sort_keys,
+                          sort_dirs):
+        query = BuildRequestList._get_query(context, column_filters)
+
+        # Unlike for instances, the marker build request is part of the
+        # returned page.
+        marker_row = None
+        if marker:
+            marker_row = query.filter_by(instance_uuid=marker).first()
+            if not marker_row:
+                raise exception.MarkerNotFound(marker=marker)
+            if limit == 1:
+                return [marker_row]
+            if limit:
+                limit -= 1
+
+        sort_columns = [BuildRequestList._SORT_COLUMNS[key]
+                        for key in sort_keys]
+        query = sqlalchemyutils.paginate_query(query, api_models.BuildRequest,
+                                               limit, sort_columns,
+                                               marker=marker_row,
+                                               sort_dirs=sort_dirs)
         db_reqs = query.all()
+        if marker_row:
+            db_reqs.insert(0, marker_row)
         return db_reqs
 
+    @staticmethod
+    @db.api_context_manager.reader
+    def _get_changes_mark_from_db(context, project_id):
+        query = context.session.query(
+            func.count(api_models.BuildRequest.id),
+            func.max(api_models.BuildRequest.created_at))
+        query = query.filter(api_models.BuildRequest.project_id == project_id)
+        return tuple(query.one())
+
+    @classmethod
+    def get_changes_mark(cls, context, project_id):
+        """Return the number of build requests of a project and the time the
+        latest one was created.
+        """
+        return cls._get_changes_mark_from_db(context, project_id)
+
     @base.remotable_classmethod
     def get_all(cls, context):
         db_build_reqs = cls._get_all_from_db(context)
@@ -381,21 +446,43 @@ class BuildRequestList(base.ObjectListBase, base.NovaObject):
         if filters.get('cleaned', False):
             return cls(context, objects=[])
 
-        # Because the build_requests table stores an instance as a serialized
-        # versioned object it is not feasible to do the filtering and sorting
-        # in the database. Just get all potentially relevant records and
-        # process them here. It should be noted that build requests are short
-        # lived so there should not be a lot of results to deal with.
-        build_requests = cls.get_all(context)
+        sort_keys, sort_dirs = db.process_sort_params(sort_keys, sort_dirs,
+                                                      default_dir='desc')
+
+        column_filters = {}
+        for key in cls._FILTER_COLUMNS:
+            if key not in filters:
+                continue
+            value = filters[key]
+            if isinstance(value, (list, tuple, set, frozenset)) and not value:
+                # Special value to indicate that nothing will match.
+                return cls(context, objects=[])
+            column_filters[key] = value
 
         # Fortunately some filters do not apply here.
         # 'changes-since' works off of the updated_at field which has not yet
         # been set at the point in the boot process where build_request still
         # exists. So it can be ignored.
         # 'deleted' and 'cleaned' are handled above.
+        other_filters = set(filters) - set(column_filters) - set(
+            ['changes-since', 'deleted', 'cleaned'])
+        if (not other_filters and
+                all(key in cls._SORT_COLUMNS for key in sort_keys)):
+            # Everything can be done in the database, so only the build
+            # requests of the returned page are loaded.
+            db_build_reqs = cls._get_page_from_db(
+                context, column_filters, limit, marker, sort_keys, sort_dirs)
+            return base.obj_make_list(context, cls(context),
+                                      objects.BuildRequest, db_build_reqs)
 
-        sort_keys, sort_dirs = db.process_sort_params(sort_keys, sort_dirs,
-                                                      default_dir='desc')
+        # Because the build_requests table stores an instance as a serialized
+        # versioned object it is not feasible to do the other filtering and
+        # sorting in the database. Just get all potentially relevant records
+        # and process them here. It should be noted that build requests are
+        # short lived so there should not be a lot of results to deal with.
+        build_requests = base.obj_make_list(
+            context, cls(context), objects.BuildRequest,
+            cls._get_all_from_db(context, column_filters))
 
         # For other filters that don't match this, we will do regexp matching
         # Taken from db/sqlalchemy/api.py
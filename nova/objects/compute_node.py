@@ -452,6 +452,29 @@ class ComputeNodeList(base.ObjectListBase, base.NovaObject):
         return base.obj_make_list(context, cls(context), objects.ComputeNode,
                                   db_computes)
 
+    @staticmethod
+    @db.select_db_reader_mode
+    def _db_compute_node_get_all_changed_since(context, since):
+        # NOTE: Deleted records are returned on purpose so that callers
+        # caching compute nodes can evict them. Soft-deleting a compute node
+        # does not bump updated_at, hence the check on deleted_at.
+        cn = models.ComputeNode
+        db_computes = context.session.query(cn).filter(
+            sa.or_(cn.created_at >= since,
+                   cn.updated_at >= since,
+                   cn.deleted_at >= since)).all()
+        return db_computes
+
+    @classmethod
+    def get_all_changed_since(cls, context, since):
+        """Return ComputeNode records created, updated or deleted at or after
+        the given datetime, including the deleted ones.
+        """
+        db_computes = cls._db_compute_node_get_all_changed_since(context,
+                                                                 since)
+        return base.obj_make_list(context, cls(context), objects.ComputeNode,
+                                  db_computes)
+
     @staticmethod
     @db.select_db_reader_mode
     def _db_compute_node_get_by_hv_type(context, hv_type):
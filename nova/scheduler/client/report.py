@@ -1438,21 +1438,24 @@ class SchedulerReportClient(object):
             success = success and status.success
 
         # At this point the local cache should have all the same providers as
-        # new_tree.  Whether we added them or not, walk through and diff/flush
-        # inventories, traits, and aggregates as necessary (the helper methods
-        # are set up to check and short out when the relevant property does not
-        # differ from what's in the cache).
+        # new_tree.  Whether we added them or not, diff the trees once and only
+        # flush the providers whose inventories, traits, or aggregates differ
+        # from what's in the cache (the helper methods are also set up to
+        # short out when the relevant property does not differ).
         # If we encounter any error and remove a provider from the cache, all
         # its descendants are also removed, and set_*_for_provider methods on
         # it wouldn't be able to get started. Walking the tree in bottom-up
         # order ensures we at least try to process all of the providers.
-        for uuid in reversed(new_uuids):
-            pd = new_tree.data(uuid)
+        changed = new_tree.get_changed_providers(self._provider_tree)
+        for pd in reversed(changed):
             with catch_all(pd.uuid) as status:
                 self._set_inventory_for_provider(
                     context, pd.uuid, pd.inventory)
-                self.set_aggregates_for_provider(
-                    context, pd.uuid, pd.aggregates)
+                # set_aggregates_for_provider doesn't check the cache itself.
+                if self._provider_tree.have_aggregates_changed(
+                        pd.uuid, pd.aggregates):
+                    self.set_aggregates_for_provider(
+                        context, pd.uuid, pd.aggregates)
                 self.set_traits_for_provider(context, pd.uuid, pd.traits)
             success = success and status.success
 
@@ -1595,6 +1598,69 @@ class SchedulerReportClient(object):
                      'text': r.text})
         return r.status_code == 204
 
+    @safe_connect
+    @retries
+    def claim_resources_for_consumers(self, context, alloc_requests,
+                                      project_id, user_id,
+                                      allocation_request_version=None):
+        """Creates allocation records for several new consumers at once,
+        using a single POST /allocations request.
+
+        The claim is atomic: either the allocations of all of the consumers
+        are created, or none of them is. Unlike claim_resources(), this does
+        not handle "doubled-up" allocations of move operations, so the
+        consumers must not have any allocations yet.
+
+        :param context: The security context
+        :param alloc_requests: Dict, keyed by consumer UUID, of the JSON body
+                               of the allocation_request to claim for each
+                               consumer
+        :param project_id: The project_id associated with the allocations.
+        :param user_id: The user_id associated with the allocations.
+        :param allocation_request_version: The microversion used to request the
+                                           allocations.
+        :returns: True if the allocations were created, False otherwise.
+        """
+        allocation_request_version = allocation_request_version or '1.10'
+        version = versionutils.convert_version_to_tuple(
+            allocation_request_version)
+        payload = {}
+        for consumer_uuid, alloc_request in alloc_requests.items():
+            allocs = alloc_request['allocations']
+            # The allocation array format was replaced by the dict format in
+            # 1.12, which is the only one POST /allocations accepts.
+            if version < (1, 12):
+                allocs = {
+                    alloc['resource_provider']['uuid']: {
+                        'resources': alloc['resources']
+                    } for alloc in allocs
+                }
+            payload[consumer_uuid] = {
+                'allocations': copy.deepcopy(allocs),
+                'project_id': project_id,
+                'user_id': user_id,
+            }
+        if version < (1, 13):
+            allocation_request_version = POST_ALLOCATIONS_API_VERSION
+
+        r = self.post('/allocations', payload,
+                      version=allocation_request_version,
+                      global_request_id=context.global_id)
+        if r.status_code != 204:
+            if 'concurrently updated' in r.text:
+                reason = ('another process changed the resource providers '
+                          'involved in our attempt to post allocations for '
+                          'consumers %s' % ', '.join(alloc_requests))
+                raise Retry('claim_resources_for_consumers', reason)
+            else:
+                LOG.warning(
+                    'Unable to submit allocations for instances '
+                    '%(uuids)s (%(code)i %(text)s)',
+                    {'uuids': ', '.join(alloc_requests),
+                     'code': r.status_code,
+                     'text': r.text})
+        return r.status_code == 204
+
     @safe_connect
     def remove_provider_from_instance_allocation(self, context, consumer_uuid,
                                                  rp_uuid, user_id, project_id,
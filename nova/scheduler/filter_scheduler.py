@@ -19,6 +19,8 @@ You can customize this scheduler by specifying your own Host Filters and
 Weighing Functions.
 """
 
+import collections
+import itertools
 import random
 
 from oslo_log import log as logging
@@ -176,6 +178,28 @@ class FilterScheduler(driver.Scheduler):
             return self._legacy_find_hosts(context, num_instances, spec_obj,
                                            hosts, num_alts)
 
+        if num_instances > 1 and CONF.filter_scheduler.batch_claims:
+            # Multi-create requests are initial boots, so we can try to claim
+            # the resources of all the instances in a single request first.
+            batch = self._claim_batch(elevated, spec_obj, hosts,
+                instance_uuids, alloc_reqs_by_rp_uuid, provider_summaries,
+                allocation_request_version)
+            if batch is not None:
+                claimed_hosts, claimed_alloc_reqs, hosts = batch
+                num = num_instances - 1
+                # If hosts could not be selected for all the instances, this
+                # call will raise a NoValidHost exception.
+                self._ensure_sufficient_hosts(context, claimed_hosts,
+                                              num_instances)
+                return self._get_alternate_hosts(
+                    claimed_hosts, spec_obj, hosts, num, num_alts,
+                    alloc_reqs_by_rp_uuid, allocation_request_version,
+                    provider_summaries, claimed_alloc_reqs)
+            # The batch claim failed, so start over with fresh host states
+            # and claim for one instance at a time.
+            hosts = self._get_all_host_states(elevated, spec_obj,
+                provider_summaries)
+
         # A list of the instance UUIDs that were successfully claimed against
         # in the placement API. If we are not able to successfully claim for
         # all involved instances, we use this list to remove those allocations
@@ -185,6 +209,10 @@ class FilterScheduler(driver.Scheduler):
         # The list of hosts that have been selected (and claimed).
         claimed_hosts = []
 
+        # The list of the allocation_requests claimed for each of the above
+        # hosts.
+        claimed_alloc_reqs = []
+
         for num in range(num_instances):
             hosts = self._get_sorted_hosts(spec_obj, hosts, num)
             if not hosts:
@@ -209,17 +237,20 @@ class FilterScheduler(driver.Scheduler):
                     LOG.debug(msg, cn_uuid)
                     continue
 
-                alloc_reqs = alloc_reqs_by_rp_uuid[cn_uuid]
-                # TODO(jaypipes): Loop through all allocation_requests instead
-                # of just trying the first one. For now, since we'll likely
-                # want to order the allocation_requests in the future based on
-                # information in the provider summaries, we'll just try to
-                # claim resources using the first allocation_request
-                alloc_req = alloc_reqs[0]
-                if utils.claim_resources(elevated, self.placement_client,
-                        spec_obj, instance_uuid, alloc_req,
-                        allocation_request_version=allocation_request_version):
-                    claimed_host = host
+                # Try the allocation_requests involving this host from the one
+                # leaving the most room on its providers to the one leaving
+                # the least, before moving on to the next host.
+                alloc_reqs = self._rank_alloc_reqs(
+                    alloc_reqs_by_rp_uuid[cn_uuid], provider_summaries,
+                    claimed_alloc_reqs)
+                for alloc_req in alloc_reqs:
+                    if utils.claim_resources(elevated, self.placement_client,
+                            spec_obj, instance_uuid, alloc_req,
+                            allocation_request_version=(
+                                allocation_request_version)):
+                        claimed_host = host
+                        break
+                if claimed_host is not None:
                     break
 
             if claimed_host is None:
@@ -233,6 +264,7 @@ class FilterScheduler(driver.Scheduler):
 
             claimed_instance_uuids.append(instance_uuid)
             claimed_hosts.append(claimed_host)
+            claimed_alloc_reqs.append(alloc_req)
 
             # Now consume the resources so the filter/weights will change for
             # the next instance.
@@ -247,9 +279,71 @@ class FilterScheduler(driver.Scheduler):
         # find alternates for each host.
         selections_to_return = self._get_alternate_hosts(
             claimed_hosts, spec_obj, hosts, num, num_alts,
-            alloc_reqs_by_rp_uuid, allocation_request_version)
+            alloc_reqs_by_rp_uuid, allocation_request_version,
+            provider_summaries, claimed_alloc_reqs)
         return selections_to_return
 
+    def _claim_batch(self, context, spec_obj, hosts, instance_uuids,
+                     alloc_reqs_by_rp_uuid, provider_summaries,
+                     allocation_request_version):
+        """Selects a host for each instance and claims the resources of all
+        of the instances with a single request to the placement API.
+
+        Returns a tuple of the list of the selected hosts, in the same order
+        as instance_uuids, of the list of the allocation_requests claimed for
+        them and of the last sorted list of hosts. The lists of selected hosts
+        and allocation_requests are shorter than instance_uuids if no host was
+        left for some of the instances, in which case nothing was claimed.
+
+        Returns None if the claim failed, for example because another
+        scheduler consumed the resources of one of the selected hosts. The
+        selected HostState objects are then refreshed from their compute node
+        the next time the host states are retrieved.
+        """
+        instance_group = spec_obj.instance_group
+        if instance_group is not None:
+            group_hosts = list(instance_group.hosts)
+
+        selected_hosts = []
+        selected_alloc_reqs = []
+        alloc_reqs = {}
+        for num, instance_uuid in enumerate(instance_uuids):
+            hosts = self._get_sorted_hosts(spec_obj, hosts, num)
+            selected_host = None
+            for host in hosts:
+                if host.uuid in alloc_reqs_by_rp_uuid:
+                    selected_host = host
+                    break
+                msg = ("A host state with uuid = '%s' that did not have a "
+                      "matching allocation_request was encountered while "
+                      "scheduling. This host was skipped.")
+                LOG.debug(msg, host.uuid)
+            if selected_host is None:
+                return selected_hosts, selected_alloc_reqs, hosts
+            alloc_req = self._rank_alloc_reqs(
+                alloc_reqs_by_rp_uuid[selected_host.uuid],
+                provider_summaries, selected_alloc_reqs)[0]
+            selected_hosts.append(selected_host)
+            selected_alloc_reqs.append(alloc_req)
+            alloc_reqs[instance_uuid] = alloc_req
+            self._consume_selected_host(selected_host, spec_obj)
+
+        if utils.claim_resources_for_instances(context,
+                self.placement_client, spec_obj, alloc_reqs,
+                allocation_request_version=allocation_request_version):
+            return selected_hosts, selected_alloc_reqs, hosts
+
+        LOG.debug("Unable to claim resources for all instances at once.")
+        # Like when not enough hosts are selected, reset the updated time of
+        # the consumed HostStates so that the resources consumed for the
+        # instances are released when they are refreshed from the database.
+        for host in selected_hosts:
+            host.updated = None
+        if instance_group is not None:
+            instance_group.hosts = group_hosts
+            instance_group.obj_reset_changes(['hosts'])
+        return None
+
     def _ensure_sufficient_hosts(self, context, hosts, required_count,
             claimed_uuids=None):
         """Checks that we have selected a host for each requested instance. If
@@ -329,9 +423,59 @@ class FilterScheduler(driver.Scheduler):
             # hosts has to be not part of the updates when saving
             spec_obj.instance_group.obj_reset_changes(['hosts'])
 
+    @staticmethod
+    def _rank_alloc_reqs(alloc_reqs, provider_summaries,
+                         claimed_alloc_reqs=None):
+        """Returns the allocation_requests sorted from the one leaving the
+        most room on its resource providers once claimed to the one leaving
+        the least.
+
+        The room left by an allocation_request is the lowest ratio of
+        capacity left on any of the resources it consumes. With sharing
+        providers this favors the shared storage pool with the most headroom,
+        and with nested providers this spreads the instances across child
+        providers like NUMA nodes or physical functions. allocation_requests
+        leaving the same room keep the order returned by placement.
+
+        :param alloc_reqs: The allocation_requests involving a host
+        :param provider_summaries: Dict, keyed by resource provider UUID, of
+                                   the capacity and usage of the providers
+        :param claimed_alloc_reqs: The allocation_requests already claimed for
+                                   the previous instances of the request,
+                                   which are not accounted for in the provider
+                                   summaries
+        """
+        if len(alloc_reqs) < 2 or not provider_summaries:
+            return alloc_reqs
+
+        claimed = collections.Counter()
+        for alloc_req in claimed_alloc_reqs or []:
+            for rp_uuid, alloc in alloc_req['allocations'].items():
+                for rc, amount in alloc['resources'].items():
+                    claimed[rp_uuid, rc] += amount
+
+        def headroom(alloc_req):
+            ratio = 1.0
+            for rp_uuid, alloc in alloc_req['allocations'].items():
+                summary = provider_summaries.get(rp_uuid)
+                if not summary:
+                    continue
+                for rc, amount in alloc['resources'].items():
+                    resource = summary['resources'].get(rc)
+                    if not resource or not resource['capacity']:
+                        continue
+                    free = (resource['capacity'] - resource['used'] -
+                            claimed[rp_uuid, rc] - amount)
+                    ratio = min(ratio, float(free) / resource['capacity'])
+            return ratio
+
+        return sorted(alloc_reqs, key=headroom, reverse=True)
+
     def _get_alternate_hosts(self, selected_hosts, spec_obj, hosts, index,
                              num_alts, alloc_reqs_by_rp_uuid=None,
-                             allocation_request_version=None):
+                             allocation_request_version=None,
+                             provider_summaries=None,
+                             selected_alloc_reqs=None):
         # We only need to filter/weigh the hosts again if we're dealing with
         # more than one instance and are going to be picking alternates.
         if index > 0 and num_alts > 0:
@@ -344,9 +488,11 @@ class FilterScheduler(driver.Scheduler):
         # representing the selected host along with alternates from the same
         # cell.
         selections_to_return = []
-        for selected_host in selected_hosts:
+        for i, selected_host in enumerate(selected_hosts):
             # This is the list of hosts for one particular instance.
-            if alloc_reqs_by_rp_uuid:
+            if selected_alloc_reqs:
+                selected_alloc_req = selected_alloc_reqs[i]
+            elif alloc_reqs_by_rp_uuid:
                 selected_alloc_req = alloc_reqs_by_rp_uuid.get(
                         selected_host.uuid)[0]
             else:
@@ -377,13 +523,9 @@ class FilterScheduler(driver.Scheduler):
                             LOG.debug(msg, alt_uuid)
                             continue
 
-                        # TODO(jaypipes): Loop through all allocation_requests
-                        # instead of just trying the first one. For now, since
-                        # we'll likely want to order the allocation_requests in
-                        # the future based on information in the provider
-                        # summaries, we'll just try to claim resources using
-                        # the first allocation_request
-                        alloc_req = alloc_reqs_by_rp_uuid[alt_uuid][0]
+                        alloc_req = self._rank_alloc_reqs(
+                            alloc_reqs_by_rp_uuid[alt_uuid],
+                            provider_summaries, selected_alloc_reqs)[0]
                         alt_selection = (
                             objects.Selection.from_host_state(host, alloc_req,
                                     allocation_request_version))
@@ -406,16 +548,24 @@ class FilterScheduler(driver.Scheduler):
         if not filtered_hosts:
             return []
 
-        weighed_hosts = self.host_manager.get_weighed_hosts(filtered_hosts,
-            spec_obj)
+        if CONF.filter_scheduler.sort_best_hosts_only:
+            # Only the first hosts are picked from, the others are only used
+            # as alternates or when claiming resources fails.
+            limit = (CONF.filter_scheduler.host_subset_size +
+                     CONF.scheduler.max_attempts)
+            weighed_hosts = self.host_manager.get_weighed_hosts(
+                filtered_hosts, spec_obj, limit=limit)
+        else:
+            weighed_hosts = self.host_manager.get_weighed_hosts(
+                filtered_hosts, spec_obj)
         if CONF.filter_scheduler.shuffle_best_same_weighed_hosts:
             # NOTE(pas-ha) Randomize best hosts, relying on weighed_hosts
             # being already sorted by weight in descending order.
             # This decreases possible contention and rescheduling attempts
             # when there is a large number of hosts having the same best
             # weight, especially so when host_subset_size is 1 (default)
-            best_hosts = [w for w in weighed_hosts
-                          if w.weight == weighed_hosts[0].weight]
+            best_hosts = list(itertools.takewhile(
+                lambda w: w.weight == weighed_hosts[0].weight, weighed_hosts))
             random.shuffle(best_hosts)
             weighed_hosts = best_hosts + weighed_hosts[len(best_hosts):]
         # Strip off the WeighedHost wrapper class...
@@ -16,8 +16,14 @@
 """
 Scheduler host filters
 """
+import itertools
+import time
+
+import nova.conf
 from nova import filters
 
+CONF = nova.conf.CONF
+
 
 class BaseHostFilter(filters.BaseFilter):
     """Base class for host filters."""
@@ -43,6 +49,54 @@ class BaseHostFilter(filters.BaseFilter):
             # should run.
             return self.host_passes(obj, spec)
 
+    def filter_all(self, filter_obj_list, spec_obj):
+        """Yield the HostStates that pass the filter.
+
+        Filters implementing filter_vector() evaluate all of the hosts in a
+        single pass, the others fall back to calling host_passes() for each
+        HostState.
+        """
+        # Do this here so we don't get scheduler.filters.utils
+        from nova.scheduler import utils
+        host_states = list(filter_obj_list)
+        if not self.RUN_ON_REBUILD and utils.request_is_rebuild(spec_obj):
+            # If we don't filter, default to passing the hosts.
+            return iter(host_states)
+        mask = self.filter_vector(host_states, spec_obj)
+        if mask is None:
+            batch_size = CONF.filter_scheduler.host_filter_batch_size
+            if batch_size and len(host_states) > batch_size:
+                return self._filter_batches(host_states, spec_obj,
+                                            batch_size)
+            return super(BaseHostFilter, self).filter_all(host_states,
+                                                          spec_obj)
+        return itertools.compress(host_states, mask)
+
+    def _filter_batches(self, host_states, spec_obj, batch_size):
+        """Yield the HostStates that pass the filter, yielding to the other
+        greenthreads after each batch of batch_size hosts.
+        """
+        for start in range(0, len(host_states), batch_size):
+            if start:
+                # Call sleep() to cooperatively yield
+                time.sleep(0)
+            for host_state in host_states[start:start + batch_size]:
+                if self._filter_one(host_state, spec_obj):
+                    yield host_state
+
+    def filter_vector(self, host_states, spec_obj):
+        """Return a list of booleans, one per HostState in host_states, which
+        is True for each host passing the filter.
+
+        Override this in a subclass when the per-request values can be
+        computed once and compared against every host in a single pass,
+        which is much cheaper than calling host_passes() for each of the
+        hosts on large deployments. Implementations must have the same
+        side effects (like setting HostState.limits) as host_passes().
+        Returning None means the filter is evaluated host by host.
+        """
+        return None
+
     def host_passes(self, host_state, filter_properties):
         """Return True if the HostState passes the filter, otherwise False.
         Override this in a subclass.
@@ -48,9 +48,38 @@ class AggregateInstanceExtraSpecsFilter(filters.BaseHostFilter):
                 or not instance_type.extra_specs):
             return True
 
+        return self._host_passes(host_state, instance_type.extra_specs)
+
+    def filter_vector(self, host_states, spec_obj):
+        """Evaluate all hosts at once, matching the extra specs only once
+        for each distinct set of aggregates the hosts belong to.
+        """
+        instance_type = spec_obj.flavor
+        if (not instance_type.obj_attr_is_set('extra_specs')
+                or not instance_type.extra_specs):
+            return [True] * len(host_states)
+
+        results = {}
+        mask = []
+        for host_state in host_states:
+            aggregate_ids = frozenset(aggr.id
+                                      for aggr in host_state.aggregates)
+            # When debug logging is enabled, a host sharing the aggregates of
+            # a rejected host is matched again only to log why it is rejected.
+            if aggregate_ids not in results or (
+                    not results[aggregate_ids] and
+                    LOG.isEnabledFor(logging.DEBUG)):
+                results[aggregate_ids] = self._host_passes(
+                    host_state, instance_type.extra_specs)
+            mask.append(results[aggregate_ids])
+        return mask
+
+    def _host_passes(self, host_state, extra_specs):
         metadata = utils.aggregate_metadata_get_by_host(host_state)
+        return self._extra_specs_match(host_state, extra_specs, metadata)
 
-        for key, req in instance_type.extra_specs.items():
+    def _extra_specs_match(self, host_state, extra_specs, metadata):
+        for key, req in extra_specs.items():
             # Either not scope format, or aggregate_instance_extra_specs scope
             scope = key.split(':', 1)
             if len(scope) > 1:
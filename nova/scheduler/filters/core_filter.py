@@ -37,12 +37,20 @@ class BaseCoreFilter(filters.BaseHostFilter):
         :param spec_obj: filter options
         :return: boolean
         """
+        return self._host_passes(host_state, spec_obj, spec_obj.vcpus)
+
+    def filter_vector(self, host_states, spec_obj):
+        """Evaluate all hosts at once for sufficient CPU cores."""
+        instance_vcpus = spec_obj.vcpus
+        return [self._host_passes(host_state, spec_obj, instance_vcpus)
+                for host_state in host_states]
+
+    def _host_passes(self, host_state, spec_obj, instance_vcpus):
         if not host_state.vcpus_total:
             # Fail safe
             LOG.warning("VCPUs not set; assuming CPU collection broken")
             return True
 
-        instance_vcpus = spec_obj.vcpus
         cpu_allocation_ratio = self._get_cpu_allocation_ratio(host_state,
                                                               spec_obj)
         vcpus_total = host_state.vcpus_total * cpu_allocation_ratio
@@ -31,10 +31,22 @@ class DiskFilter(filters.BaseHostFilter):
 
     def host_passes(self, host_state, spec_obj):
         """Filter based on disk usage."""
-        requested_disk = (1024 * (spec_obj.root_gb +
-                                  spec_obj.ephemeral_gb) +
-                          spec_obj.swap)
-
+        return self._host_passes(host_state, spec_obj,
+                                 self._get_requested_disk(spec_obj))
+
+    def filter_vector(self, host_states, spec_obj):
+        """Evaluate all hosts at once for sufficient disk space."""
+        requested_disk = self._get_requested_disk(spec_obj)
+        return [self._host_passes(host_state, spec_obj, requested_disk)
+                for host_state in host_states]
+
+    @staticmethod
+    def _get_requested_disk(spec_obj):
+        return (1024 * (spec_obj.root_gb +
+                        spec_obj.ephemeral_gb) +
+                spec_obj.swap)
+
+    def _host_passes(self, host_state, spec_obj, requested_disk):
         free_disk_mb = host_state.free_disk_mb
         total_usable_disk_mb = host_state.total_usable_disk_gb * 1024
 
@@ -36,9 +36,17 @@ class IoOpsFilter(filters.BaseHostFilter):
         """Use information about current vm and task states collected from
         compute node statistics to decide whether to filter.
         """
-        num_io_ops = host_state.num_io_ops
         max_io_ops = self._get_max_io_ops_per_host(
             host_state, spec_obj)
+        return self._host_passes(host_state, max_io_ops)
+
+    def filter_vector(self, host_states, spec_obj):
+        max_io_ops = CONF.filter_scheduler.max_io_ops_per_host
+        return [self._host_passes(host_state, max_io_ops)
+                for host_state in host_states]
+
+    def _host_passes(self, host_state, max_io_ops):
+        num_io_ops = host_state.num_io_ops
         passes = num_io_ops < max_io_ops
         if not passes:
             LOG.debug("%(host_state)s fails I/O ops check: Max IOs per host "
@@ -68,3 +76,8 @@ class AggregateIoOpsFilter(IoOpsFilter):
             value = max_io_ops_per_host
 
         return value
+
+    def filter_vector(self, host_states, spec_obj):
+        # The limit depends on the aggregates of each host so there is
+        # nothing to compute once per request.
+        return None
@@ -33,9 +33,17 @@ class NumInstancesFilter(filters.BaseHostFilter):
         return CONF.filter_scheduler.max_instances_per_host
 
     def host_passes(self, host_state, spec_obj):
-        num_instances = host_state.num_instances
         max_instances = self._get_max_instances_per_host(
             host_state, spec_obj)
+        return self._host_passes(host_state, max_instances)
+
+    def filter_vector(self, host_states, spec_obj):
+        max_instances = CONF.filter_scheduler.max_instances_per_host
+        return [self._host_passes(host_state, max_instances)
+                for host_state in host_states]
+
+    def _host_passes(self, host_state, max_instances):
+        num_instances = host_state.num_instances
         passes = num_instances < max_instances
         if not passes:
             LOG.debug("%(host_state)s fails num_instances check: Max "
@@ -66,3 +74,8 @@ class AggregateNumInstancesFilter(NumInstancesFilter):
             value = max_instances_per_host
 
         return value
+
+    def filter_vector(self, host_states, spec_obj):
+        # The limit depends on the aggregates of each host so there is
+        # nothing to compute once per request.
+        return None
@@ -31,7 +31,15 @@ class BaseRamFilter(filters.BaseHostFilter):
 
     def host_passes(self, host_state, spec_obj):
         """Only return hosts with sufficient available RAM."""
+        return self._host_passes(host_state, spec_obj, spec_obj.memory_mb)
+
+    def filter_vector(self, host_states, spec_obj):
+        """Evaluate all hosts at once for sufficient available RAM."""
         requested_ram = spec_obj.memory_mb
+        return [self._host_passes(host_state, spec_obj, requested_ram)
+                for host_state in host_states]
+
+    def _host_passes(self, host_state, spec_obj, requested_ram):
         free_ram_mb = host_state.free_ram_mb
         total_usable_ram_mb = host_state.total_usable_ram_mb
 
@@ -18,6 +18,7 @@ Manage hosts in the current zone.
 """
 
 import collections
+import datetime
 import functools
 import time
 try:
@@ -363,6 +364,14 @@ class HostManager(object):
                 CONF.filter_scheduler.track_instance_changes)
         # Dict of instances and status, keyed by host
         self._instance_info = {}
+        # Dict of ComputeNode objects keyed by cell UUID and then by compute
+        # node UUID, only used if [filter_scheduler]/host_state_resync_interval
+        # is set.
+        self._compute_node_cache = {}
+        # Dicts of the times the above cache was last refreshed and last
+        # fully reloaded, keyed by cell UUID.
+        self._compute_node_cache_refreshed = {}
+        self._compute_node_cache_resynced = {}
         if self.track_instance_changes:
             self._init_instance_info()
 
@@ -593,10 +602,14 @@ class HostManager(object):
         return self.filter_handler.get_filtered_objects(self.enabled_filters,
                 hosts, spec_obj, index)
 
-    def get_weighed_hosts(self, hosts, spec_obj):
-        """Weigh the hosts."""
+    def get_weighed_hosts(self, hosts, spec_obj, limit=None):
+        """Weigh the hosts.
+
+        If limit is set, only the limit best weighed hosts are sorted and
+        returned first, followed by the other hosts in their original order.
+        """
         return self.weight_handler.get_weighed_objects(self.weighers,
-                hosts, spec_obj)
+                hosts, spec_obj, limit=limit)
 
     def _get_computes_for_cells(self, context, cells, compute_uuids=None):
         """Get a tuple of compute node and service information.
@@ -613,6 +626,9 @@ class HostManager(object):
          - compute_nodes is cell-uuid keyed dict of compute node lists
          - services is a dict of services indexed by hostname
         """
+        if CONF.filter_scheduler.host_state_resync_interval:
+            return self._get_cached_computes_for_cells(context, cells,
+                                                       compute_uuids)
 
         def targeted_operation(cctxt):
             services = objects.ServiceList.get_by_binary(
@@ -639,6 +655,78 @@ class HostManager(object):
                                  for service in _services})
         return compute_nodes, services
 
+    def _get_cached_computes_for_cells(self, context, cells, compute_uuids):
+        """Get a tuple of compute node and service information, reading only
+        the compute nodes changed since the previous call from the cells.
+
+        The ComputeNode objects are cached per cell and all of them are
+        reloaded once [filter_scheduler]/host_state_resync_interval seconds
+        have passed since the last full reload of any of the cells.
+
+        Parameters and return value are the same as _get_computes_for_cells().
+        """
+        now = timeutils.utcnow()
+        interval = CONF.filter_scheduler.host_state_resync_interval
+        since = None
+        for cell in cells:
+            resynced = self._compute_node_cache_resynced.get(cell.uuid)
+            if (resynced is None or
+                    timeutils.is_older_than(resynced, interval)):
+                since = None
+                break
+            refreshed = self._compute_node_cache_refreshed[cell.uuid]
+            if since is None or refreshed < since:
+                since = refreshed
+        if since is not None:
+            # NOTE: Some databases store timestamps with a precision of a
+            # second, so go back a bit further to be sure we don't miss a
+            # change done during the second the last refresh started.
+            since -= datetime.timedelta(seconds=1)
+
+        def targeted_operation(cctxt):
+            services = objects.ServiceList.get_by_binary(
+                cctxt, 'nova-compute', include_disabled=True)
+            if since is None:
+                return services, objects.ComputeNodeList.get_all(cctxt)
+            else:
+                return services, objects.ComputeNodeList.get_all_changed_since(
+                    cctxt, since)
+
+        results = context_module.scatter_gather_cells(context, cells, 60,
+                                                      targeted_operation)
+        compute_nodes = collections.defaultdict(list)
+        services = {}
+        for cell_uuid, result in results.items():
+            if result is context_module.raised_exception_sentinel:
+                LOG.warning('Failed to get computes for cell %s', cell_uuid)
+            elif result is context_module.did_not_respond_sentinel:
+                LOG.warning('Timeout getting computes for cell %s', cell_uuid)
+            else:
+                _services, _compute_nodes = result
+                if since is None:
+                    cache = self._compute_node_cache[cell_uuid] = {}
+                    self._compute_node_cache_resynced[cell_uuid] = now
+                else:
+                    cache = self._compute_node_cache[cell_uuid]
+                for compute in _compute_nodes:
+                    if compute.deleted:
+                        cache.pop(compute.uuid, None)
+                    else:
+                        cache[compute.uuid] = compute
+                # NOTE: The refresh time is taken before reading from the
+                # cell so that any change done while reading is read again
+                # on the next call.
+                self._compute_node_cache_refreshed[cell_uuid] = now
+                if compute_uuids is None:
+                    compute_nodes[cell_uuid].extend(cache.values())
+                else:
+                    compute_nodes[cell_uuid].extend(
+                        cache[compute_uuid] for compute_uuid in compute_uuids
+                        if compute_uuid in cache)
+                services.update({service.host: service
+                                 for service in _services})
+        return compute_nodes, services
+
     def refresh_cells_caches(self):
         # NOTE(tssurya): This function is called from the scheduler manager's
         # reset signal handler and also upon startup of the scheduler.
@@ -911,6 +911,33 @@ def claim_resources(ctx, client, spec_obj, instance_uuid, alloc_req,
             user_id, allocation_request_version=allocation_request_version)
 
 
+def claim_resources_for_instances(ctx, client, spec_obj, alloc_reqs,
+        allocation_request_version=None):
+    """Given a dict, keyed by instance UUID, of allocation_request JSON
+    objects returned from Placement, attempt to claim resources for all of the
+    new instances at once in the placement API. Returns True if the claim
+    process was successful for all of the instances, False otherwise, in which
+    case no resources were claimed.
+
+    :param ctx: The RequestContext object
+    :param client: The scheduler client to use for making the claim call
+    :param spec_obj: The RequestSpec object - needed to get the project_id
+    :param alloc_reqs: Dict, keyed by instance UUID, of the
+                       allocation_request received from placement for the
+                       resources we want to claim against the host chosen for
+                       each instance
+    :param allocation_request_version: The microversion used to request the
+                                       allocations.
+    """
+    LOG.debug("Attempting to claim resources in the placement API for "
+              "instances %s", ', '.join(alloc_reqs))
+
+    # The RequestSpec doesn't store the user_id, see claim_resources().
+    return client.claim_resources_for_consumers(ctx, alloc_reqs,
+            spec_obj.project_id, ctx.user_id,
+            allocation_request_version=allocation_request_version)
+
+
 def remove_allocation_from_compute(context, instance, compute_node_uuid,
                                    reportclient, flavor=None):
     """Removes the instance allocation from the compute host.
@@ -9,6 +9,7 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import mock
 import os_traits
 import six
 import sqlalchemy as sa
@@ -242,6 +243,45 @@ class ProviderDBHelperTestCase(tb.PlacementDbBaseTestCase):
         rp_obj.Trait(self.ctx, name='CUSTOM_BAR').create()
         run(['CUSTOM_BAR'], [])
 
+    def test_cached_provider_ids(self):
+        self.flags(allocation_candidates_cache_ttl=60, group='placement')
+        self.addCleanup(rp_obj._PROVIDER_IDS_CACHE.clear)
+        cn1 = self._create_provider('cn1', uuids.agg1)
+        tb.set_traits(cn1, 'HW_CPU_X86_TBM')
+        cn2 = self._create_provider('cn2')
+        tmap = rp_obj._trait_ids_from_names(self.ctx, ['HW_CPU_X86_TBM'])
+
+        self.assertEqual(
+            [cn1.id],
+            rp_obj._cached_provider_ids_having_all_traits(self.ctx, tmap))
+        self.assertEqual(
+            [cn1.id],
+            rp_obj._cached_provider_ids_matching_aggregates(
+                self.ctx, [[uuids.agg1]]))
+
+        # Associations changed by other processes are not seen until the
+        # cached lookups expire.
+        with mock.patch.object(rp_obj._PROVIDER_IDS_CACHE, 'clear'):
+            tb.set_traits(cn2, 'HW_CPU_X86_TBM')
+        self.assertEqual(
+            [cn1.id],
+            rp_obj._cached_provider_ids_having_all_traits(self.ctx, tmap))
+
+        # Changes made through this process clear the cache.
+        cn2.set_aggregates([uuids.agg1])
+        self.assertEqual(
+            sorted([cn1.id, cn2.id]),
+            sorted(rp_obj._cached_provider_ids_having_all_traits(
+                self.ctx, tmap)))
+        self.assertEqual(
+            sorted([cn1.id, cn2.id]),
+            sorted(rp_obj._cached_provider_ids_matching_aggregates(
+                self.ctx, [[uuids.agg1]])))
+        self.assertEqual(
+            [cn2.id],
+            rp_obj._cached_provider_ids_matching_aggregates(
+                self.ctx, [[uuids.agg1]], rp_ids=set([cn2.id])))
+
 
 class AllocationCandidatesTestCase(tb.PlacementDbBaseTestCase):
     """Tests a variety of scenarios with both shared and non-shared resource
@@ -576,6 +616,36 @@ class AllocationCandidatesTestCase(tb.PlacementDbBaseTestCase):
         # provider summaries should have two rps
         self.assertEqual(expected_length, len(alloc_cands.provider_summaries))
 
+    def test_all_local_limit_only_builds_limited_trees(self):
+        """Verify that when a single request group is limited, the usages and
+        provider summaries are only gathered for as many provider trees as
+        needed.
+        """
+        cns = []
+        for name in ('cn1', 'cn2', 'cn3'):
+            cn = self._create_provider(name)
+            tb.add_inventory(cn, fields.ResourceClass.VCPU, 24)
+            tb.add_inventory(cn, fields.ResourceClass.MEMORY_MB, 32768)
+            tb.add_inventory(cn, fields.ResourceClass.DISK_GB, 2000)
+            cns.append(cn)
+
+        with mock.patch.object(
+                rp_obj, '_get_usages_by_provider_tree',
+                wraps=rp_obj._get_usages_by_provider_tree) as mock_usages:
+            alloc_cands = self._get_allocation_candidates(limit=2)
+
+        self.assertEqual(2, len(alloc_cands.allocation_requests))
+        self.assertEqual(2, len(alloc_cands.provider_summaries))
+        mock_usages.assert_called_once_with(self.ctx, mock.ANY)
+        root_ids = mock_usages.call_args[0][1]
+        self.assertEqual(2, len(root_ids))
+        self.assertTrue(root_ids < set(cn.id for cn in cns))
+
+        # Without a limit all of the trees are considered
+        alloc_cands = self._get_allocation_candidates()
+        self.assertEqual(3, len(alloc_cands.allocation_requests))
+        self.assertEqual(3, len(alloc_cands.provider_summaries))
+
     def test_local_with_shared_disk(self):
         """Create some resource providers that can satisfy the request for
         resources with local VCPU and MEMORY_MB but rely on a shared storage
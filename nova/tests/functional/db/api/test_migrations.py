@@ -713,6 +713,10 @@ class NovaAPIMigrationsWalk(test_migrations.WalkVersionsMixin):
         self.assertEqual(1, len(result))
         self.assertEqual(0, result[0]['generation'])
 
+    def _check_060(self, engine, data):
+        self.assertIndexExists(engine, 'build_requests',
+            'build_requests_created_at_idx')
+
 
 class TestNovaAPIMigrationsWalkSQLite(NovaAPIMigrationsWalk,
                                       test_base.DbTestCase,
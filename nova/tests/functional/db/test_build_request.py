@@ -12,6 +12,7 @@
 
 import datetime
 
+import mock
 from oslo_serialization import jsonutils
 from oslo_utils import uuidutils
 import six
@@ -203,7 +204,8 @@ class BuildRequestListTestCase(test.NoDBTestCase):
             kwargs['instance'] = jsonutils.dumps(instance.obj_to_primitive())
         args = fake_build_request.fake_db_req(**kwargs)
         args.pop('id', None)
-        args['instance_uuid'] = uuidutils.generate_uuid()
+        if instance:
+            args['instance_uuid'] = instance.uuid
         args['project_id'] = self.project_id if not project_id else project_id
         return build_request.BuildRequest._from_db_object(self.context,
                 build_request.BuildRequest(),
@@ -224,6 +226,19 @@ class BuildRequestListTestCase(test.NoDBTestCase):
             objects.base.obj_equal_prims(reqs[i].instance,
                                          req_list[i].instance)
 
+    def test_get_changes_mark(self):
+        self.assertEqual(
+            (0, None), build_request.BuildRequestList.get_changes_mark(
+                self.context, self.project_id))
+
+        req = self._create_req()
+        self._create_req(project_id='other')
+
+        self.assertEqual(
+            (1, req.created_at.replace(tzinfo=None)),
+            build_request.BuildRequestList.get_changes_mark(
+                self.context, self.project_id))
+
     def test_get_all_filter_by_project_id(self):
         reqs = [self._create_req(), self._create_req(project_id='filter')]
 
@@ -591,6 +606,48 @@ class BuildRequestListTestCase(test.NoDBTestCase):
             objects.base.obj_equal_prims(req.instance,
                                          req_list[i].instance)
 
+    def test_get_by_filters_in_db(self):
+        ctxt = self.context.elevated()
+        reqs = [self._create_req(),
+                self._create_req(project_id='other'),
+                self._create_req(),
+                self._create_req()]
+
+        with mock.patch.object(build_request.BuildRequestList,
+                               '_get_all_from_db') as get_all:
+            req_list = build_request.BuildRequestList.get_by_filters(
+                ctxt, {'project_id': self.project_id, 'deleted': False},
+                marker=reqs[2].instance_uuid, limit=2,
+                sort_keys=['created_at', 'id'], sort_dirs=['asc', 'asc'])
+
+        self.assertFalse(get_all.called)
+        self.assertEqual([reqs[2].instance_uuid, reqs[3].instance_uuid],
+                         [req.instance_uuid for req in req_list])
+
+    def test_get_by_filters_in_db_only_loads_page(self):
+        reqs = [self._create_req() for i in range(4)]
+
+        with mock.patch.object(build_request.BuildRequest, '_load_instance',
+                side_effect=build_request.BuildRequest._load_instance,
+                autospec=True) as load_instance:
+            req_list = build_request.BuildRequestList.get_by_filters(
+                self.context, {'uuid': [req.instance_uuid for req in reqs]},
+                limit=2, sort_keys=['id'], sort_dirs=['desc'])
+
+        self.assertEqual([reqs[3].instance_uuid, reqs[2].instance_uuid],
+                         [req.instance_uuid for req in req_list])
+        self.assertEqual(2, load_instance.call_count)
+
+    def test_get_by_filters_in_db_marker_not_found(self):
+        req = self._create_req(project_id='other')
+
+        # the marker is not in the filtered build requests
+        self.assertRaises(exception.MarkerNotFound,
+                          build_request.BuildRequestList.get_by_filters,
+                          self.context.elevated(),
+                          {'project_id': self.project_id},
+                          marker=req.instance_uuid)
+
     def test_get_by_filters_bails_on_empty_list_check(self):
         instance1 = fake_instance.fake_instance_obj(
             self.context, objects.Instance, uuid=uuidutils.generate_uuid(),
@@ -10,6 +10,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+
+from oslo_utils import fixture as utils_fixture
+from oslo_utils import timeutils
+
 from nova import context
 from nova import objects
 from nova.objects import fields as obj_fields
@@ -107,6 +112,36 @@ class ComputeNodeTestCase(test.TestCase):
                                                         uuidsentinel.noexists])
         self.assertEqual(2, len(cns))
 
+    def test_get_all_changed_since(self):
+        now = timeutils.utcnow()
+        cn1 = fake_compute_obj.obj_clone()
+        cn1._context = self.context
+        cn1.create()
+        cn2 = fake_compute_obj.obj_clone()
+        cn2._context = self.context
+        cn2.host = _HOSTNAME + '2'
+        cn2.create()
+
+        cns = objects.ComputeNodeList.get_all_changed_since(
+            self.context, now - datetime.timedelta(minutes=1))
+        self.assertEqual(set([cn1.uuid, cn2.uuid]),
+                         set(cn.uuid for cn in cns))
+
+        later = now + datetime.timedelta(minutes=1)
+        cns = objects.ComputeNodeList.get_all_changed_since(self.context,
+                                                            later)
+        self.assertEqual(0, len(cns))
+
+        # Both updated and deleted compute nodes are returned.
+        self.useFixture(utils_fixture.TimeFixture(later))
+        cn1.vcpus_used = 1
+        cn1.save()
+        cn2.destroy()
+        cns = objects.ComputeNodeList.get_all_changed_since(self.context,
+                                                            later)
+        self.assertEqual({cn1.uuid: False, cn2.uuid: True},
+                         {cn.uuid: cn.deleted for cn in cns})
+
     def test_get_by_hypervisor_type(self):
         cn1 = fake_compute_obj.obj_clone()
         cn1._context = self.context
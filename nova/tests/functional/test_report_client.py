@@ -940,6 +940,37 @@ class SchedulerReportClientTests(SchedulerReportClientTestBase):
                 resp = self.client.get('/resource_providers/%s' % uuid)
                 self.assertEqual(404, resp.status_code)
 
+    def test_update_from_provider_tree_only_changed(self):
+        """Only the providers which differ from the cache are flushed."""
+        new_tree = provider_tree.ProviderTree()
+        new_tree.new_root('root', uuids.root)
+        new_tree.update_aggregates('root', [uuids.agg1])
+        new_tree.update_traits('root', ['HW_CPU_X86_AVX'])
+        new_tree.new_child('child1', uuids.root, uuid=uuids.child1)
+        new_tree.new_child('child2', uuids.root, uuid=uuids.child2)
+        new_tree.update_aggregates('child2', [uuids.agg1])
+
+        with self._interceptor():
+            self.client.update_from_provider_tree(self.context, new_tree)
+
+            # Nothing changed, so nothing is written to placement
+            with mock.patch.object(self.client, 'put') as mock_put:
+                self.client.update_from_provider_tree(self.context, new_tree)
+            mock_put.assert_not_called()
+
+            new_tree.update_traits('child1', ['CUSTOM_PHYSNET_1'])
+            with mock.patch.object(
+                    self.client, 'put', wraps=self.client.put) as mock_put:
+                self.client.update_from_provider_tree(self.context, new_tree)
+            # One call to create the trait and one to set it on the provider
+            self.assertEqual(
+                ['/traits/CUSTOM_PHYSNET_1',
+                 '/resource_providers/%s/traits' % uuids.child1],
+                [call[0][0] for call in mock_put.call_args_list])
+            self.assertEqual(
+                set(['CUSTOM_PHYSNET_1']),
+                self.client._get_provider_traits(self.context, uuids.child1))
+
     @mock.patch('nova.compute.provider_tree.ProviderTree.update_aggregates')
     def test_non_tree_aggregate_membership(self, upd_aggs_mock):
         """There are some methods of the reportclient that do NOT interact with
@@ -1713,6 +1713,75 @@ class ServerControllerTestV247(ControllerTest):
             self.assertEqual(s['flavor'], expected_flavor)
 
 
+class ServersControllerListCacheTest(ControllerTest):
+
+    def setUp(self):
+        super(ServersControllerListCacheTest, self).setUp()
+        self.flags(server_list_cache_ttl=60, group='api')
+        self.flags(enabled=True, backend='oslo_cache.dict', group='cache')
+        self.controller = servers.ServersController()
+        self.mock_get_changes_mark = self.useFixture(
+            fixtures.MockPatchObject(compute_api.API, 'get_changes_mark',
+                                     return_value=['mark'])).mock
+
+    def _detail(self, url='/fake/servers/detail', use_admin_context=False):
+        req = fakes.HTTPRequest.blank(url,
+                                      use_admin_context=use_admin_context)
+        res = self.controller.detail(req)
+        # Extensions run, and the callback is called, by wsgi.Resource.
+        callback = req.get_extended_response_callback()
+        if callback:
+            callback(res)
+        return req, res
+
+    def test_detail_cached_until_changed(self):
+        req, res_dict = self._detail()
+        self.assertEqual(5, len(res_dict['servers']))
+        self.mock_get_changes_mark.assert_called_once_with(
+            req.environ['nova.context'], 'fake')
+
+        req, res = self._detail()
+        self.assertIsInstance(res, os_wsgi.ResponseObject)
+        self.assertTrue(res.extended)
+        self.assertEqual(res_dict, res.obj)
+        self.assertIsNone(req.get_extended_response_callback())
+        self.assertEqual(1, self.mock_get_all.call_count)
+
+        self.mock_get_changes_mark.return_value = ['other mark']
+        req, res = self._detail()
+        self.assertEqual(res_dict, res)
+        self.assertEqual(2, self.mock_get_all.call_count)
+
+    def test_detail_cached_per_query(self):
+        self._detail()
+        self._detail('/fake/servers/detail?limit=3')
+        self.assertEqual(2, self.mock_get_all.call_count)
+
+    def test_detail_not_cached_without_mark(self):
+        self.mock_get_changes_mark.return_value = None
+        for i in range(2):
+            req, res = self._detail()
+            self.assertIsNone(req.get_extended_response_callback())
+        self.assertEqual(2, self.mock_get_all.call_count)
+
+    def test_detail_all_tenants_not_cached(self):
+        req, res = self._detail('/fake/servers/detail?all_tenants=1',
+                                use_admin_context=True)
+        self.assertIsNone(req.get_extended_response_callback())
+        self.mock_get_changes_mark.assert_not_called()
+
+    @mock.patch.object(servers.LOG, 'warning')
+    def test_detail_not_cached_without_cache_enabled(self, mock_warning):
+        self.flags(enabled=False, group='cache')
+        self.controller = servers.ServersController()
+        self.assertTrue(mock_warning.called)
+        for i in range(2):
+            req, res = self._detail()
+            self.assertIsNone(req.get_extended_response_callback())
+        self.assertEqual(2, self.mock_get_all.call_count)
+        self.mock_get_changes_mark.assert_not_called()
+
+
 class ServersControllerDeleteTest(ControllerTest):
 
     def setUp(self):
@@ -355,3 +355,32 @@ class TestTraits(_TestCase):
         rp.set_traits(traits)
         mock_set_traits.assert_called_once_with(self.context, rp, traits)
         mock_reset.assert_called_once_with()
+
+    @mock.patch('nova.api.openstack.placement.objects.resource_provider.'
+                '_PROVIDER_IDS_CACHE')
+    @mock.patch('nova.api.openstack.placement.objects.resource_provider.'
+                '_set_aggregates')
+    @mock.patch('nova.api.openstack.placement.objects.resource_provider.'
+                '_set_traits')
+    def test_set_associations_clears_cache_after_commit(
+            self, mock_set_traits, mock_set_aggs, mock_cache):
+        # The cache must be cleared after the writer transactions setting
+        # the associations have been committed, not while they are open.
+        calls = mock.Mock()
+        calls.attach_mock(mock_set_traits, 'set_traits')
+        calls.attach_mock(mock_set_aggs, 'set_aggregates')
+        calls.attach_mock(mock_cache.clear, 'clear')
+        traits = resource_provider.TraitList(objects=[])
+        rp = resource_provider.ResourceProvider(self.context, name='cn1',
+            uuid=uuids.cn1)
+
+        rp.set_traits(traits)
+        rp.set_aggregates([uuids.agg1])
+
+        self.assertEqual(
+            [mock.call.set_traits(self.context, rp, traits),
+             mock.call.clear(),
+             mock.call.set_aggregates(self.context, rp, [uuids.agg1],
+                                      increment_generation=False),
+             mock.call.clear()],
+            calls.mock_calls)
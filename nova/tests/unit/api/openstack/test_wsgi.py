@@ -814,6 +814,47 @@ class ResourceTest(MicroversionedTest):
         self.assertEqual(called, [2])
         self.assertEqual(response, 'foo')
 
+    def test_process_stack_extended_response_callback(self):
+        callback = mock.Mock()
+
+        class Controller(object):
+            def index(self, req):
+                req.set_extended_response_callback(callback)
+                return {'foo': 'bar'}
+
+        class ControllerExtended(wsgi.Controller):
+            @wsgi.extends
+            def index(self, req, resp_obj):
+                resp_obj.obj['extended'] = True
+
+        resource = wsgi.Resource(Controller())
+        resource.register_extensions(ControllerExtended())
+        req = wsgi.Request.blank('/tests')
+        response = resource._process_stack(req, 'index', {}, None, None,
+                                           'application/json')
+
+        callback.assert_called_once_with({'foo': 'bar', 'extended': True})
+        self.assertEqual({'foo': 'bar', 'extended': True},
+                         jsonutils.loads(response.body))
+
+    def test_process_stack_already_extended(self):
+        class Controller(object):
+            def index(self, req):
+                return wsgi.ResponseObject({'foo': 'bar'}, extended=True)
+
+        class ControllerExtended(wsgi.Controller):
+            @wsgi.extends
+            def index(self, req, resp_obj):
+                resp_obj.obj['extended'] = True
+
+        resource = wsgi.Resource(Controller())
+        resource.register_extensions(ControllerExtended())
+        req = wsgi.Request.blank('/tests')
+        response = resource._process_stack(req, 'index', {}, None, None,
+                                           'application/json')
+
+        self.assertEqual({'foo': 'bar'}, jsonutils.loads(response.body))
+
     def test_resource_exception_handler_type_error(self):
         # A TypeError should be translated to a Fault/HTTP 400.
         def foo(a,):
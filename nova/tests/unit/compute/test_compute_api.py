@@ -6197,6 +6197,75 @@ class ComputeAPIUnitTestCase(_ComputeAPIUnitTestMixIn, test.NoDBTestCase):
             fields=['device_id'])
         self.assertEqual([], instances.objects)
 
+    @mock.patch.object(neutron_api.API, 'has_substr_port_filtering_extension',
+                       return_value=False)
+    @mock.patch.object(neutron_api.API, 'list_ports')
+    @mock.patch.object(objects.BuildRequestList, 'get_by_filters',
+                       new_callable=mock.NonCallableMock)
+    def test_get_all_ip_filter_using_ports(self, mock_buildreq_get,
+                                           mock_list_port, mock_check_ext):
+        self.flags(use_neutron=True)
+        self.flags(instance_list_ip_filter_using_ports=True, group='api')
+        cell_instances = self._list_of_instances(1)
+        mock_list_port.return_value = {'ports': [
+            {'device_id': uuids.match4,
+             'fixed_ips': [{'ip_address': '10.0.0.5'}]},
+            {'device_id': uuids.match6,
+             'fixed_ips': [{'ip_address': '10.0.0.6'},
+                           {'ip_address': 'fe80::5'}]},
+            {'device_id': uuids.nomatch,
+             'fixed_ips': [{'ip_address': '10.0.1.5'}]},
+            {'device_id': '',
+             'fixed_ips': [{'ip_address': '10.0.0.7'}]}]}
+        with mock.patch('nova.compute.instance_list.'
+                        'get_instance_objects_sorted') as mock_inst_get:
+            mock_inst_get.return_value = objects.InstanceList(
+                self.context, objects=cell_instances)
+
+            instances = self.compute_api.get_all(
+                self.context,
+                search_opts={'ip': r'10\.0\.0\.5', 'ip6': 'fe80::5',
+                             'project_id': 'fake-project'},
+                limit=10, marker='fake-marker', sort_keys=['baz'],
+                sort_dirs=['desc'])
+
+            mock_list_port.assert_called_once_with(
+                self.context, tenant_id='fake-project',
+                fields=['device_id', 'fixed_ips'])
+            # the limit is kept and the IP filter is not applied again
+            fields = ['metadata', 'info_cache', 'security_groups']
+            mock_inst_get.assert_called_once_with(
+                self.context, {'ip': r'10\.0\.0\.5', 'ip6': 'fe80::5',
+                               'project_id': 'fake-project',
+                               'uuid': [uuids.match4, uuids.match6]},
+                10, 'fake-marker', fields, ['baz'], ['desc'])
+            self.assertEqual(cell_instances, instances.objects)
+
+    @mock.patch.object(neutron_api.API, 'has_substr_port_filtering_extension',
+                       return_value=False)
+    @mock.patch.object(neutron_api.API, 'list_ports',
+                       side_effect=exception.InternalError('fake'))
+    @mock.patch.object(objects.BuildRequestList, 'get_by_filters',
+                       new_callable=mock.NonCallableMock)
+    def test_get_all_ip_filter_using_ports_exc(self, mock_buildreq_get,
+                                               mock_list_port,
+                                               mock_check_ext):
+        self.flags(use_neutron=True)
+        self.flags(instance_list_ip_filter_using_ports=True, group='api')
+        with test.nested(
+            mock.patch('nova.compute.instance_list.'
+                       'get_instance_objects_sorted',
+                       return_value=objects.InstanceList(objects=[])),
+            mock.patch.object(self.compute_api, '_ip_filter',
+                              return_value=objects.InstanceList(objects=[]))
+        ) as (mock_inst_get, mock_ip_filter):
+            self.compute_api.get_all(
+                self.context, search_opts={'ip': 'fake'}, limit=10)
+
+        # the instances are filtered in memory, without a DB limit
+        self.assertIsNone(mock_inst_get.call_args[0][2])
+        mock_ip_filter.assert_called_once_with(mock.ANY, {'ip': 'fake'}, 10)
+
     @mock.patch('nova.compute.api.API._delete_while_booting',
                 return_value=False)
     @mock.patch('nova.compute.api.API._lookup_instance')
@@ -251,6 +251,28 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             else:
                 self.assertFalse(db_node.destroy.called)
 
+    @mock.patch.object(manager.ComputeManager,
+                       '_update_available_resource_for_node')
+    @mock.patch.object(fake_driver.FakeDriver, 'get_available_nodes')
+    @mock.patch.object(manager.ComputeManager, '_get_compute_nodes_in_db')
+    def test_update_available_resource_concurrent(self, get_db_nodes,
+                                                  get_avail_nodes,
+                                                  update_mock):
+        self.flags(update_resources_pool_size=2)
+        avail_nodes = set(['node1', 'node2', 'node3'])
+        get_db_nodes.return_value = [self._make_compute_node(node, i)
+                                     for i, node in enumerate(avail_nodes)]
+        get_avail_nodes.return_value = avail_nodes
+        with mock.patch.object(self.compute, '_update_resources_pool') as pool:
+            self.compute.update_available_resource(self.context)
+
+        pool.spawn_n.assert_has_calls(
+            [mock.call(update_mock, self.context, node)
+             for node in avail_nodes], any_order=True)
+        self.assertEqual(3, pool.spawn_n.call_count)
+        pool.waitall.assert_called_once_with()
+        update_mock.assert_not_called()
+
     @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
                 'delete_resource_provider')
     @mock.patch.object(manager.ComputeManager,
@@ -1609,13 +1631,88 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
     def test_sync_power_states(self, mock_get):
         instance = mock.Mock()
         mock_get.return_value = [instance]
-        with mock.patch.object(self.compute._sync_power_pool,
-                               'spawn_n') as mock_spawn:
+        with test.nested(
+            mock.patch.object(self.compute._sync_power_pool, 'spawn_n'),
+            mock.patch.object(self.compute.driver, 'get_power_states',
+                              side_effect=NotImplementedError),
+        ) as (mock_spawn, mock_power_states):
             self.compute._sync_power_states(mock.sentinel.context)
             mock_get.assert_called_with(mock.sentinel.context,
                                         self.compute.host, expected_attrs=[],
                                         use_slave=True)
-            mock_spawn.assert_called_once_with(mock.ANY, instance)
+            mock_spawn.assert_called_once_with(mock.ANY, instance, None)
+
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_sync_power_states_bulk(self, mock_get):
+        instances = [objects.Instance(uuid=uuids.running),
+                     objects.Instance(uuid=uuids.missing)]
+        mock_get.return_value = instances
+        with test.nested(
+            mock.patch.object(self.compute._sync_power_pool, 'spawn_n'),
+            mock.patch.object(self.compute.driver, 'get_power_states',
+                              return_value={
+                                  uuids.running: power_state.RUNNING}),
+            mock.patch.object(self.compute.driver, 'get_num_instances'),
+        ) as (mock_spawn, mock_power_states, mock_num_instances):
+            self.compute._sync_power_states(mock.sentinel.context)
+            mock_power_states.assert_called_once_with()
+            self.assertFalse(mock_num_instances.called)
+            mock_spawn.assert_has_calls([
+                mock.call(mock.ANY, instances[0], power_state.RUNNING),
+                mock.call(mock.ANY, instances[1], power_state.NOSTATE)])
+
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_sync_power_states_bulk_error(self, mock_get):
+        instance = objects.Instance(uuid=uuids.instance)
+        mock_get.return_value = [instance]
+        with test.nested(
+            mock.patch.object(self.compute._sync_power_pool, 'spawn_n'),
+            mock.patch.object(self.compute.driver, 'get_power_states',
+                              side_effect=test.TestingException),
+            mock.patch.object(self.compute.driver, 'get_num_instances',
+                              return_value=1),
+        ) as (mock_spawn, mock_power_states, mock_num_instances):
+            self.compute._sync_power_states(mock.sentinel.context)
+            # The power state of each instance is queried from the driver.
+            mock_num_instances.assert_called_once_with()
+            mock_spawn.assert_called_once_with(mock.ANY, instance, None)
+
+    def _test_heal_instance_info_cache_batch(self, get_ports):
+        self.flags(heal_instance_info_cache_batch_size=2)
+        instances = [objects.Instance(uuid=getattr(uuids, 'instance%d' % i),
+                                      vm_state=vm_states.ACTIVE,
+                                      task_state=None)
+                     for i in range(3)]
+        with test.nested(
+            mock.patch.object(objects.InstanceList, 'get_by_host',
+                              return_value=instances),
+            mock.patch.object(self.compute.network_api,
+                              'get_instances_ports', get_ports),
+            mock.patch.object(self.compute.network_api,
+                              'get_instance_nw_info'),
+        ) as (mock_get_by_host, mock_get_ports, mock_get_nw_info):
+            self.compute._heal_instance_info_cache(self.context)
+            mock_get_ports.assert_called_once_with(self.context,
+                                                   instances[:2])
+        self.assertEqual([uuids.instance2],
+                         self.compute._instance_uuids_to_heal)
+        return instances, mock_get_nw_info
+
+    def test_heal_instance_info_cache_batch(self):
+        get_ports = mock.Mock(return_value={uuids.instance0: [{'id': 'p'}]})
+        instances, mock_get_nw_info = (
+            self._test_heal_instance_info_cache_batch(get_ports))
+        mock_get_nw_info.assert_has_calls([
+            mock.call(self.context, instances[0], ports=[{'id': 'p'}]),
+            mock.call(self.context, instances[1], ports=[])])
+
+    def test_heal_instance_info_cache_batch_not_implemented(self):
+        get_ports = mock.Mock(side_effect=NotImplementedError)
+        instances, mock_get_nw_info = (
+            self._test_heal_instance_info_cache_batch(get_ports))
+        mock_get_nw_info.assert_has_calls([
+            mock.call(self.context, instances[0]),
+            mock.call(self.context, instances[1])])
 
     def _get_sync_instance(self, power_state, vm_state, task_state=None,
                            shutdown_terminate=False):
@@ -1636,6 +1733,41 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
                                                 power_state.RUNNING)
         mock_refresh.assert_called_once_with(use_slave=False)
 
+    @mock.patch.object(objects.Instance, 'refresh')
+    def test_sync_instance_power_state_confirm_match(self, mock_refresh):
+        instance = self._get_sync_instance(power_state.RUNNING,
+                                           vm_states.ACTIVE)
+        with mock.patch.object(self.compute.driver,
+                               'get_info') as mock_get_info:
+            self.compute._sync_instance_power_state(
+                self.context, instance, power_state.RUNNING,
+                confirm_power_state=True)
+            self.assertFalse(mock_get_info.called)
+        mock_refresh.assert_called_once_with(use_slave=False)
+
+    @mock.patch.object(objects.Instance, 'refresh')
+    @mock.patch.object(objects.Instance, 'save')
+    def test_sync_instance_power_state_confirm_mismatch(self, mock_save,
+                                                        mock_refresh):
+        # A power state which does not match the database is confirmed
+        # with the driver before being acted on.
+        instance = self._get_sync_instance(power_state.RUNNING,
+                                           vm_states.ACTIVE)
+        info = hardware.InstanceInfo(state=power_state.RUNNING)
+        with test.nested(
+            mock.patch.object(self.compute.driver, 'get_info',
+                              return_value=info),
+            mock.patch.object(self.compute.compute_api, 'stop'),
+        ) as (mock_get_info, mock_stop):
+            self.compute._sync_instance_power_state(
+                self.context, instance, power_state.SHUTDOWN,
+                confirm_power_state=True)
+            mock_get_info.assert_called_once_with(instance)
+            self.assertFalse(mock_stop.called)
+        self.assertEqual(power_state.RUNNING, instance.power_state)
+        mock_refresh.assert_called_once_with(use_slave=False)
+        self.assertFalse(mock_save.called)
+
     @mock.patch.object(objects.Instance, 'refresh')
     @mock.patch.object(objects.Instance, 'save')
     def test_sync_instance_power_state_running_stopped(self, mock_save,
@@ -1723,10 +1855,26 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             self.compute._query_driver_power_state_and_sync(self.context,
                                                             db_instance)
             mock_get_info.assert_called_once_with(db_instance)
-            mock_sync_power_state.assert_called_once_with(self.context,
-                                                          db_instance,
-                                                          power_state.NOSTATE,
-                                                          use_slave=True)
+            mock_sync_power_state.assert_called_once_with(
+                self.context, db_instance, power_state.NOSTATE,
+                use_slave=True, confirm_power_state=False)
+
+    @mock.patch('nova.compute.manager.ComputeManager.'
+                '_sync_instance_power_state')
+    def test_query_driver_power_state_and_sync_bulk(
+            self, mock_sync_power_state):
+        with mock.patch.object(self.compute.driver,
+                               'get_info') as mock_get_info:
+            db_instance = objects.Instance(uuid=uuids.db_instance,
+                                           task_state=None)
+            self.compute._query_driver_power_state_and_sync(
+                self.context, db_instance, vm_power_state=power_state.RUNNING)
+            self.assertFalse(mock_get_info.called)
+            # The power state is confirmed by _sync_instance_power_state
+            # against the instance it refreshes.
+            mock_sync_power_state.assert_called_once_with(
+                self.context, db_instance, power_state.RUNNING,
+                use_slave=True, confirm_power_state=True)
 
     @mock.patch.object(virt_driver.ComputeDriver, 'delete_instance_files')
     @mock.patch.object(objects.InstanceList, 'get_by_filters')
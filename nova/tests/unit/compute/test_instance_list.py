@@ -10,7 +10,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
+
 import mock
+from oslo_utils import timeutils
 
 from nova.compute import instance_list
 from nova.compute import multi_cell_list
@@ -80,6 +83,61 @@ class TestInstanceList(test.NoDBTestCase):
 
         self.assertEqual(insts_one, insts_two)
 
+    def test_get_instance_list_cells_batch_size(self):
+        get_batch_size = instance_list.get_instance_list_cells_batch_size
+        cells = self.cells * 4
+        self.assertEqual(1000, get_batch_size(1000, self.cells[:1]))
+        # 10% over an even distribution, but never less than 100.
+        self.assertEqual(110, get_batch_size(1200, cells))
+        self.assertEqual(100, get_batch_size(500, cells))
+
+        self.flags(instance_list_cells_batch_strategy='fixed',
+                   instance_list_cells_batch_fixed_size=200, group='api')
+        self.assertEqual(200, get_batch_size(1200, cells))
+        # Never more than the limit.
+        self.assertEqual(150, get_batch_size(150, cells))
+
+    @mock.patch('nova.compute.instance_list.InstanceLister')
+    def test_get_instances_sorted_batch_size(self, mock_lister):
+        self.flags(instance_list_cells_batch_strategy='fixed',
+                   instance_list_cells_batch_fixed_size=200, group='api')
+        instance_list.get_instances_sorted(self.context, {}, 1000, None, [],
+                                           None, None,
+                                           cell_mappings=self.cells)
+        mock_lister.assert_called_once_with(None, None, cells=self.cells,
+                                            batch_size=200)
+
+    @mock.patch.object(instance_list, 'MARKER_CACHE', new=None)
+    @mock.patch('nova.cache_utils.get_client')
+    def test_instance_lister_marker_cache(self, mock_get_client):
+        lister = instance_list.InstanceLister(None, None)
+        self.assertIsNone(lister.marker_cache)
+        mock_get_client.assert_not_called()
+
+        self.flags(enabled=True, group='cache')
+        self.flags(instance_list_marker_cache_expiration=300, group='api')
+        lister = instance_list.InstanceLister(None, None)
+        self.assertEqual(mock_get_client.return_value, lister.marker_cache)
+        # The cache client is shared by the listers.
+        instance_list.InstanceLister(None, None)
+        mock_get_client.assert_called_once_with(expiration_time=300)
+
+    @mock.patch.object(instance_list, 'MARKER_CACHE', new=None)
+    @mock.patch.object(instance_list, '_MARKER_CACHE_DISABLED_WARNED',
+                       new=False)
+    @mock.patch.object(instance_list.LOG, 'warning')
+    @mock.patch('nova.cache_utils.get_client')
+    def test_instance_lister_marker_cache_not_enabled(self, mock_get_client,
+                                                      mock_warning):
+        self.flags(enabled=False, group='cache')
+        self.flags(instance_list_marker_cache_expiration=300, group='api')
+        for i in range(2):
+            lister = instance_list.InstanceLister(None, None)
+            self.assertIsNone(lister.marker_cache)
+        mock_get_client.assert_not_called()
+        # The warning is only logged once.
+        self.assertEqual(1, mock_warning.call_count)
+
     @mock.patch('nova.objects.BuildRequestList.get_by_filters')
     @mock.patch('nova.compute.instance_list.get_instances_sorted')
     @mock.patch('nova.objects.CellMappingList.get_by_project_id')
@@ -162,3 +220,45 @@ class TestInstanceList(test.NoDBTestCase):
 
         # return the results from the up cell, ignoring the down cell.
         self.assertEqual(uuid_initial, uuid_final)
+
+    @mock.patch('nova.objects.BuildRequestList.get_changes_mark')
+    @mock.patch('nova.context.scatter_gather_cells')
+    @mock.patch('nova.objects.CellMappingList.get_by_project_id')
+    def _test_get_changes_mark(self, results, mock_cm, mock_sg, mock_br):
+        self.flags(instance_list_per_project_cells=True, group='api')
+        mock_br.return_value = (1, None)
+        mock_sg.return_value = results
+        user_context = nova_context.RequestContext('fake', 'fake')
+
+        mark = instance_list.get_changes_mark(user_context, 'fake')
+
+        mock_cm.assert_called_once_with(user_context, 'fake')
+        mock_br.assert_called_once_with(user_context, 'fake')
+        mock_sg.assert_called_once_with(
+            user_context, mock_cm.return_value, 60,
+            instance_list.db.instance_get_changes_mark, 'fake')
+        return mark
+
+    def test_get_changes_mark(self):
+        then = timeutils.utcnow() - datetime.timedelta(minutes=1)
+        results = {uuids.cell0: (1, then, then, None, None),
+                   uuids.cell1: (2, then, None, None, then)}
+        mark = self._test_get_changes_mark(results)
+        # The cells marks are ordered by cell uuid.
+        self.assertEqual([(1, None)] + [results[cell_uuid]
+                                        for cell_uuid in sorted(results)],
+                         mark)
+
+    def test_get_changes_mark_down_cell(self):
+        then = timeutils.utcnow() - datetime.timedelta(minutes=1)
+        mark = self._test_get_changes_mark(
+            {uuids.cell0: (1, then, then, None, None),
+             uuids.cell1: nova_context.did_not_respond_sentinel})
+        self.assertIsNone(mark)
+
+    def test_get_changes_mark_recent_change(self):
+        then = timeutils.utcnow() - datetime.timedelta(minutes=1)
+        mark = self._test_get_changes_mark(
+            {uuids.cell0: (1, then, then, None, None),
+             uuids.cell1: (1, then, None, None, timeutils.utcnow())})
+        self.assertIsNone(mark)
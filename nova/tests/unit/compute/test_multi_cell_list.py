@@ -12,7 +12,11 @@
 
 import datetime
 
+import fixtures
+import mock
+
 from nova.compute import multi_cell_list
+from nova import exception
 from nova import test
 
 
@@ -95,3 +99,165 @@ class TestUtils(test.NoDBTestCase):
         # and not just nonzero return from cmp()
         self.assertTrue(iw1 > iw2)
         self.assertFalse(iw2 > iw1)
+
+
+class FakeLister(multi_cell_list.CrossCellLister):
+    """Lists records from a dict of sorted lists, keyed by fake cell."""
+
+    def __init__(self, records, batch_size=None, marker_cache=None):
+        super(FakeLister, self).__init__(
+            multi_cell_list.RecordSortContext(['id'], ['asc']),
+            batch_size=batch_size, marker_cache=marker_cache)
+        self.records = records
+        self.queries = []
+        self.marker_lookups = []
+
+    @property
+    def marker_identifier(self):
+        return 'id'
+
+    def get_marker_record(self, ctx, marker):
+        self.marker_lookups.append(marker)
+        for records in self.records.values():
+            for record in records:
+                if record['id'] == marker:
+                    return record
+        raise exception.MarkerNotFound(marker=marker)
+
+    def get_marker_by_values(self, ctx, values):
+        self.marker_lookups.append(ctx.cell_uuid)
+        for record in self.records[ctx.cell_uuid]:
+            if record['id'] >= values[0]:
+                return record['id']
+
+    def get_by_filters(self, ctx, filters, limit, marker, **kwargs):
+        self.queries.append((ctx.cell_uuid, limit, marker))
+        records = self.records[ctx.cell_uuid]
+        if 'id' in filters:
+            records = [r for r in records if r['id'] in filters['id']]
+        if marker is not None:
+            if marker not in [r['id'] for r in records]:
+                raise exception.MarkerNotFound(marker=marker)
+            records = [r for r in records if r['id'] > marker]
+        return records[:limit] if limit else records
+
+
+class FakeCache(dict):
+    def set(self, key, value):
+        self[key] = value
+
+
+class TestCrossCellLister(test.NoDBTestCase):
+    def setUp(self):
+        super(TestCrossCellLister, self).setUp()
+        # Records 0 to 29 are spread across three cells.
+        self.records = {cell: [{'id': i} for i in range(n, 30, 3)]
+                        for n, cell in enumerate(('cell0', 'cell1',
+                                                  'cell2'))}
+        self.useFixture(fixtures.MockPatch(
+            'nova.context.scatter_gather_all_cells',
+            side_effect=lambda ctx, fn: {
+                cell: fn(mock.Mock(cell_uuid=cell))
+                for cell in self.records}))
+
+    def _get_ids(self, lister, limit, marker=None):
+        return [r['id'] for r in lister.get_records_sorted(
+            mock.sentinel.context, {}, limit, marker)]
+
+    def test_get_records_sorted_batches(self):
+        lister = FakeLister(self.records, batch_size=2)
+
+        self.assertEqual(list(range(7)), self._get_ids(lister, 7))
+
+        # Each cell was queried for a first batch, and for a second one
+        # once the first was consumed, instead of for the whole limit.
+        self.assertEqual(6, len(lister.queries))
+        self.assertEqual([2] * 6, [limit for _, limit, _ in lister.queries])
+        self.assertEqual([3, 4, 5], [marker for _, _, marker
+                                     in lister.queries[3:]])
+
+    def test_get_records_sorted_batches_same_results(self):
+        for marker in (None, 4, 11):
+            for limit in (None, 1, 5, 10, 40):
+                expected = self._get_ids(FakeLister(self.records), limit,
+                                         marker)
+                for batch_size in (1, 2, 3, 7):
+                    lister = FakeLister(self.records, batch_size=batch_size)
+                    self.assertEqual(expected,
+                                     self._get_ids(lister, limit, marker))
+
+    def test_get_records_sorted_batch_failure(self):
+        lister = FakeLister(self.records, batch_size=2)
+        get_by_filters = lister.get_by_filters
+
+        def fake_get_by_filters(ctx, filters, limit, marker, **kwargs):
+            if ctx.cell_uuid == 'cell1' and marker is not None:
+                raise test.TestingException()
+            return get_by_filters(ctx, filters, limit, marker, **kwargs)
+
+        lister.get_by_filters = fake_get_by_filters
+
+        # The records of cell1 after its first batch are skipped.
+        self.assertEqual([0, 1, 2, 3, 4, 5, 6, 8, 9],
+                         self._get_ids(lister, 9))
+
+    def test_get_records_sorted_marker_cache(self):
+        cache = FakeCache()
+        lister = FakeLister(self.records, marker_cache=cache)
+
+        self.assertEqual([0, 1, 2, 3], self._get_ids(lister, 4))
+        self.assertEqual(
+            [{'values': [3], 'cells': {'cell0': 3, 'cell1': 1,
+                                       'cell2': 2}}],
+            list(cache.values()))
+
+        lister.queries = []
+        self.assertEqual([4, 5, 6, 7], self._get_ids(lister, 4, marker=3))
+        # Each cell resumed after its last record, without any lookup.
+        self.assertEqual([], lister.marker_lookups)
+        self.assertEqual([('cell0', 4, 3), ('cell1', 4, 1),
+                          ('cell2', 4, 2)], sorted(lister.queries))
+
+    def test_get_records_sorted_marker_cache_pages(self):
+        for batch_size in (None, 2):
+            for limit in (2, 4, 7):
+                lister = FakeLister(self.records, batch_size=batch_size,
+                                    marker_cache=FakeCache())
+                ids = self._get_ids(lister, limit)
+                while ids[-1] != 29:
+                    ids.extend(self._get_ids(lister, limit, marker=ids[-1]))
+                self.assertEqual(list(range(30)), ids)
+                self.assertEqual([], lister.marker_lookups)
+
+    def test_get_records_sorted_marker_cache_miss(self):
+        lister = FakeLister(self.records, marker_cache=FakeCache())
+
+        self.assertEqual([0, 1, 2, 3], self._get_ids(lister, 4))
+        # The marker was not the last record of a cached page.
+        self.assertEqual([3, 4, 5, 6], self._get_ids(lister, 4, marker=2))
+        self.assertEqual([2, 'cell0', 'cell1', 'cell2'],
+                         sorted(lister.marker_lookups, key=str))
+
+    def test_get_records_sorted_marker_cache_deleted_record(self):
+        lister = FakeLister(self.records, marker_cache=FakeCache())
+
+        self.assertEqual([0, 1, 2, 3], self._get_ids(lister, 4))
+        del self.records['cell1'][0]
+        # Only cell1 looks its local marker up by value.
+        self.assertEqual([4, 5, 6, 7], self._get_ids(lister, 4, marker=3))
+        self.assertEqual(['cell1'], lister.marker_lookups)
+
+    def test_get_records_sorted_marker_cache_failed_cell(self):
+        cache = FakeCache()
+        lister = FakeLister(self.records, batch_size=1, marker_cache=cache)
+        get_by_filters = lister.get_by_filters
+
+        def fake_get_by_filters(ctx, filters, limit, marker, **kwargs):
+            if ctx.cell_uuid == 'cell1' and marker is not None:
+                raise test.TestingException()
+            return get_by_filters(ctx, filters, limit, marker, **kwargs)
+
+        lister.get_by_filters = fake_get_by_filters
+
+        self.assertEqual([0, 1, 2, 3], self._get_ids(lister, 4))
+        self.assertEqual({}, cache)
@@ -668,3 +668,90 @@ class TestProviderTree(test.NoDBTestCase):
         # Remove the last aggregate, and an unrelated one
         pt.remove_aggregates(cn.uuid, uuids.agg4, uuids.agg1)
         self.assertEqual(set([]), pt.data(cn.uuid).aggregates)
+
+    def test_get_changed_providers(self):
+        cn1 = self.compute_node1
+        cn2 = self.compute_node2
+        cache = self._pt_with_cns()
+        cache.new_child('numa1', cn1.uuid, uuid=uuids.numa1)
+        cache.update_inventory(uuids.numa1, {'VCPU': {'total': 8}})
+        pt = self._pt_with_cns()
+        pt.new_child('numa1', cn1.uuid, uuid=uuids.numa1)
+        pt.update_inventory(uuids.numa1, {'VCPU': {'total': 8}})
+
+        # Identical trees have no changes
+        self.assertEqual([], pt.get_changed_providers(cache))
+
+        pt.update_inventory(uuids.numa1, {'VCPU': {'total': 16}})
+        pt.update_traits(cn2.uuid, ['HW_CPU_X86_AVX'])
+        pt.update_aggregates(cn1.uuid, [uuids.agg1])
+        pt.new_child('pf1', uuids.numa1, uuid=uuids.pf1)
+        # A provider missing from the other tree is changed, and providers
+        # are returned in top-down order
+        self.assertEqual(
+            [cn1.uuid, uuids.numa1, uuids.pf1, cn2.uuid],
+            [pd.uuid for pd in pt.get_changed_providers(cache)])
+
+        # The returned data are copies
+        pd = pt.get_changed_providers(cache)[1]
+        pd.inventory['VCPU']['total'] = 32
+        self.assertEqual(16, pt.data(uuids.numa1).inventory['VCPU']['total'])
+
+    def test_indexes(self):
+        cn1 = self.compute_node1
+        cn2 = self.compute_node2
+        pt = self._pt_with_cns()
+        pt.new_child('numa1', cn1.uuid, uuid=uuids.numa1)
+        pt.new_child('pf1', 'numa1', uuid=uuids.pf1)
+        self.assertEqual([cn1.uuid, uuids.numa1, uuids.pf1, cn2.uuid],
+                         pt.get_provider_uuids())
+        self.assertEqual(uuids.pf1, pt.data('pf1').uuid)
+
+        # The cached ordering is a copy
+        pt.get_provider_uuids().append(uuids.bogus)
+        self.assertEqual(4, len(pt.get_provider_uuids()))
+
+        # Removing a provider drops its descendants from the indexes
+        pt.remove('numa1')
+        self.assertEqual([cn1.uuid, cn2.uuid], pt.get_provider_uuids())
+        self.assertFalse(pt.exists(uuids.pf1))
+        self.assertFalse(pt.exists('pf1'))
+
+        # Replacing a provider drops its previous descendants as well
+        pt.new_child('numa1', cn1.uuid, uuid=uuids.numa1)
+        pt.new_child('pf1', 'numa1', uuid=uuids.pf1)
+        pt.populate_from_iterable([{
+            'uuid': uuids.numa1,
+            'name': 'numa1-renamed',
+            'parent_provider_uuid': cn1.uuid,
+        }])
+        self.assertEqual([cn1.uuid, uuids.numa1, cn2.uuid],
+                         pt.get_provider_uuids())
+        self.assertFalse(pt.exists('numa1'))
+        self.assertFalse(pt.exists('pf1'))
+        self.assertEqual(uuids.numa1, pt.data('numa1-renamed').uuid)
+
+        # A name can be reused once its provider is gone
+        pt.new_child('pf1', uuids.numa1, uuid=uuids.pf2)
+        self.assertEqual(uuids.pf2, pt.data('pf1').uuid)
+
+    def test_has_sharing_provider(self):
+        cn1 = self.compute_node1
+        pt = self._pt_with_cns()
+        pt.new_root('ssp', uuids.ssp)
+        pt.update_inventory('ssp', {'DISK_GB': {'total': 100}})
+        pt.update_inventory(cn1.uuid, {'IPV4_ADDRESS': {'total': 16}})
+        self.assertFalse(pt.has_sharing_provider('DISK_GB'))
+
+        pt.update_traits('ssp', ['MISC_SHARES_VIA_AGGREGATE'])
+        pt.update_traits(cn1.uuid, ['MISC_SHARES_VIA_AGGREGATE'])
+        self.assertTrue(pt.has_sharing_provider('DISK_GB'))
+        self.assertTrue(pt.has_sharing_provider('IPV4_ADDRESS'))
+        self.assertFalse(pt.has_sharing_provider('VCPU'))
+
+        # The resource class index follows inventory changes and removals
+        pt.update_inventory('ssp', {'VCPU': {'total': 8}})
+        self.assertFalse(pt.has_sharing_provider('DISK_GB'))
+        self.assertTrue(pt.has_sharing_provider('VCPU'))
+        pt.remove('ssp')
+        self.assertFalse(pt.has_sharing_provider('VCPU'))
@@ -2616,6 +2616,19 @@ class TestUpdateUsageFromInstance(BaseTestCase):
         mock_update_usage.assert_called_once_with(
             self.rt._get_usage_dict(self.instance), _NODENAME, sign=1)
 
+    @mock.patch('nova.compute.resource_tracker.ResourceTracker.'
+                '_update_usage')
+    def test_building_reports_failed_builds(self, mock_update_usage):
+        self.instance.vm_state = vm_states.BUILDING
+        self.rt.stats.build_failed()
+        self.rt.stats.build_failed()
+        self.rt._update_usage_from_instance(mock.sentinel.ctx, self.instance,
+                                            _NODENAME)
+
+        # The failed builds are reported without waiting for an audit.
+        self.assertEqual(2, self.rt.compute_nodes[_NODENAME].stats[
+            'failed_builds'])
+
     @mock.patch('nova.compute.resource_tracker.ResourceTracker.'
                 '_update_usage')
     def test_shelve_offloading(self, mock_update_usage):
@@ -2901,6 +2914,42 @@ class TestUpdateUsageFromInstance(BaseTestCase):
 
         test()
 
+    def test_update_usage_from_instances_keeps_other_nodes(self):
+        self.rt.compute_nodes['other-node'] = (
+            _COMPUTE_NODE_FIXTURES[0].obj_clone())
+        other = _INSTANCE_FIXTURES[1].obj_clone()
+        other.node = 'other-node'
+        self.rt.tracked_instances = {
+            self.instance.uuid: obj_base.obj_to_primitive(self.instance),
+            other.uuid: obj_base.obj_to_primitive(other),
+        }
+
+        @mock.patch.object(self.rt,
+                           '_remove_deleted_instances_allocations')
+        @mock.patch('nova.objects.Service.get_minimum_version',
+                    return_value=22)
+        def test(version_mock, rdia):
+            self.rt._update_usage_from_instances('ctxt', [], _NODENAME)
+
+        test()
+
+        # Only the instances of the audited node are no longer tracked.
+        self.assertEqual([other.uuid], list(self.rt.tracked_instances))
+
+    @mock.patch('nova.compute.resource_tracker.ResourceTracker.'
+                '_update_usage')
+    def test_stats_per_node(self, mock_update_usage):
+        self.rt.compute_nodes['other-node'] = (
+            _COMPUTE_NODE_FIXTURES[0].obj_clone())
+        self.instance.vm_state = vm_states.BUILDING
+        self.rt._update_usage_from_instance(mock.sentinel.ctx, self.instance,
+                                            _NODENAME)
+
+        self.assertEqual(1, self.rt.node_stats[_NODENAME].num_instances)
+        self.assertEqual(0, self.rt.node_stats['other-node'].num_instances)
+        self.assertEqual(
+            '1', self.rt.compute_nodes[_NODENAME].stats['num_instances'])
+
     @mock.patch('nova.scheduler.utils.resources_from_flavor')
     def test_delete_allocation_for_evacuated_instance(
             self, mock_resource_from_flavor):
@@ -2968,6 +3017,33 @@ class TestSetInstanceHostAndNode(BaseTestCase):
         self.assertEqual(self.rt.host, inst.launched_on)
 
 
+class TestNodeLocking(BaseTestCase):
+
+    def setUp(self):
+        super(TestNodeLocking, self).setUp()
+        self._setup_rt()
+
+    @mock.patch('nova.utils.synchronized')
+    def test_lock_per_node(self, mock_sync):
+        mock_sync.side_effect = lambda name: lambda f: f
+
+        self.rt.update_usage(mock.sentinel.ctx, mock.sentinel.instance,
+                             'node1')
+        self.rt.update_usage(mock.sentinel.ctx, mock.sentinel.instance,
+                             nodename='node2')
+        with mock.patch.object(self.rt, '_init_compute_node'):
+            self.rt._update_available_resource(
+                mock.sentinel.ctx, {'hypervisor_hostname': 'node3'})
+            self.rt._update_available_resource(
+                mock.sentinel.ctx, resources={'hypervisor_hostname': 'node4'})
+
+        mock_sync.assert_has_calls([
+            mock.call('compute_resources-node1'),
+            mock.call('compute_resources-node2'),
+            mock.call('compute_resources-node3'),
+            mock.call('compute_resources-node4')])
+
+
 def _update_compute_node(node, **kwargs):
     for key, value in kwargs.items():
         setattr(node, key, value)
@@ -1947,6 +1947,30 @@ class InstanceTestCase(test.TestCase, ModelsObjectComparatorMixin):
             sys_meta = utils.metadata_to_dict(inst['system_metadata'])
             self.assertEqual(sys_meta, self.sample_data['system_metadata'])
 
+    def test_instance_get_changes_mark(self):
+        self.assertEqual((0, None, None, None, None),
+                         db.instance_get_changes_mark(self.ctxt, 'project1'))
+
+        instance = self.create_instance_with_args()
+        self.create_instance_with_args(project_id='project2')
+        mark = db.instance_get_changes_mark(self.ctxt, 'project1')
+        self.assertEqual((1, instance['created_at'], None, None, None), mark)
+
+        db.instance_update(self.ctxt, instance['uuid'], {'host': 'h2'})
+        updated_mark = db.instance_get_changes_mark(self.ctxt, 'project1')
+        self.assertEqual(1, updated_mark[0])
+        self.assertIsNotNone(updated_mark[2])
+
+        db.instance_info_cache_update(self.ctxt, instance['uuid'],
+                                      {'network_info': '[]'})
+        cache_mark = db.instance_get_changes_mark(self.ctxt, 'project1')
+        self.assertIsNotNone(cache_mark[4])
+
+        db.instance_destroy(self.ctxt, instance['uuid'])
+        deleted_mark = db.instance_get_changes_mark(self.ctxt, 'project1')
+        self.assertEqual(1, deleted_mark[0])
+        self.assertIsNotNone(deleted_mark[3])
+
     def test_instance_update(self):
         instance = self.create_instance_with_args()
         metadata = {'host': 'bar', 'key2': 'wuff'}
@@ -9332,6 +9356,18 @@ class TestInstanceInfoCache(test.TestCase):
         info_cache = db.instance_info_cache_get(self.context, instance.uuid)
         self.assertEqual(network_info2, info_cache.network_info)
 
+    def test_instance_info_cache_update_unchanged(self):
+        instance = db.instance_create(self.context, {})
+        network_info = 'net'
+        db.instance_info_cache_update(self.context, instance.uuid,
+                                      {'network_info': network_info})
+
+        with mock.patch.object(models.InstanceInfoCache, 'update') as update:
+            info_cache = db.instance_info_cache_update(
+                self.context, instance.uuid, {'network_info': network_info})
+        self.assertFalse(update.called)
+        self.assertEqual(network_info, info_cache.network_info)
+
     def test_instance_info_cache_delete(self):
         instance = db.instance_create(self.context, {})
         network_info = 'net'
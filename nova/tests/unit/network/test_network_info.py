@@ -527,6 +527,18 @@ class NetworkInfoTests(test.NoDBTestCase):
                  fake_network_cache_model.new_fixed_ip(
                         {'address': '10.10.0.3'})] * 4, ninfo.fixed_ips())
 
+    def test_json(self):
+        ninfo = model.NetworkInfo([fake_network_cache_model.new_vif(),
+                fake_network_cache_model.new_vif(
+                        {'address': 'bb:bb:bb:bb:bb:bb'})])
+        nw_info_json = ninfo.json()
+        self.assertNotIn(', ', nw_info_json)
+        self.assertNotIn(': ', nw_info_json)
+        self.assertEqual(ninfo, model.NetworkInfo.hydrate(nw_info_json))
+        # the same content is always serialized the same way
+        self.assertEqual(nw_info_json,
+                         model.NetworkInfo.hydrate(nw_info_json).json())
+
     def _setup_injected_network_scenario(self, should_inject=True,
                                         use_ipv4=True, use_ipv6=False,
                                         gateway=True, dns=True,
@@ -764,21 +764,30 @@ class TestNeutronv2Base(test.TestCase):
         nets = number == 1 and self.nets1 or self.nets2
         self.moxed_client.list_networks(
             id=net_ids).AndReturn({'networks': nets})
-        for i in range(1, number + 1):
-            float_data = number == 1 and self.float_data1 or self.float_data2
-            for ip in port_data[i - 1]['fixed_ips']:
-                float_data = [x for x in float_data
-                              if x['fixed_ip_address'] == ip['ip_address']]
+        if number > 1:
+            # The resources of several ports are listed at once
+            self.moxed_client.list_floatingips(
+                port_id=[port['id'] for port in port_data]).AndReturn(
+                    {'floatingips': self.float_data2})
+            subnet_data = self.subnet_data1 + self.subnet_data2
+            self.moxed_client.list_subnets(
+                id=['my_subid1', 'my_subid2']).AndReturn(
+                    {'subnets': subnet_data})
+            self.moxed_client.list_ports(
+                network_id=[subnet['network_id'] for subnet in subnet_data],
+                device_owner='network:dhcp').AndReturn(
+                    {'ports': []})
+        else:
+            for ip in port_data[0]['fixed_ips']:
                 self.moxed_client.list_floatingips(
                     fixed_ip_address=ip['ip_address'],
-                    port_id=port_data[i - 1]['id']).AndReturn(
-                        {'floatingips': float_data})
-            subnet_data = i == 1 and self.subnet_data1 or self.subnet_data2
+                    port_id=port_data[0]['id']).AndReturn(
+                        {'floatingips': self.float_data1})
             self.moxed_client.list_subnets(
-                id=mox.SameElementsAs(['my_subid%s' % i])).AndReturn(
-                    {'subnets': subnet_data})
+                id=mox.SameElementsAs(['my_subid1'])).AndReturn(
+                    {'subnets': self.subnet_data1})
             self.moxed_client.list_ports(
-                network_id=subnet_data[0]['network_id'],
+                network_id=self.subnet_data1[0]['network_id'],
                 device_owner='network:dhcp').AndReturn(
                     {'ports': []})
         self.instance['info_cache'] = self._fake_instance_info_cache(
@@ -990,9 +999,25 @@ class TestNeutronv2(TestNeutronv2Base):
         for current_neutron_port in current_neutron_ports:
             current_neutron_port_map[current_neutron_port['id']] = (
                 current_neutron_port)
-        for port_id in port_ids:
-            current_neutron_port = current_neutron_port_map.get(port_id)
-            if current_neutron_port:
+        ports = [current_neutron_port_map[port_id] for port_id in port_ids
+                 if port_id in current_neutron_port_map]
+        if len(ports) > 1:
+            # The resources of several ports are listed at once
+            fixed_ips = [ip for port in ports for ip in port['fixed_ips']]
+            index = len(fixed_ips)
+            self.moxed_client.list_floatingips(
+                port_id=[port['id'] for port in ports]).AndReturn(
+                    {'floatingips': self.float_data2[:index]})
+            self.moxed_client.list_subnets(
+                id=[ip['subnet_id'] for ip in fixed_ips]).AndReturn(
+                    {'subnets': self.subnet_data_n[:index]})
+            self.moxed_client.list_ports(
+                network_id=[subnet['network_id']
+                            for subnet in self.subnet_data_n[:index]],
+                device_owner='network:dhcp').AndReturn(
+                    {'ports': self.dhcp_port_data1})
+        else:
+            for current_neutron_port in ports:
                 for ip in current_neutron_port['fixed_ips']:
                     self.moxed_client.list_floatingips(
                         fixed_ip_address=ip['ip_address'],
@@ -2687,7 +2712,7 @@ class TestNeutronv2(TestNeutronv2Base):
         api = neutronapi.API()
         self.mox.StubOutWithMock(api, '_get_subnets_from_port')
         api._get_subnets_from_port(
-            self.context, fake_port, None).AndReturn(
+            self.context, fake_port, None, resources=None).AndReturn(
             [fake_subnet])
         self.mox.ReplayAll()
         subnets = api._nw_info_get_subnets(self.context, fake_port, fake_ips)
@@ -2960,17 +2985,23 @@ class TestNeutronv2(TestNeutronv2Base):
             tenant_id=uuids.fake, device_id=uuids.instance).AndReturn(
                 {'ports': fake_ports})
 
-        self.mox.StubOutWithMock(api, '_get_floating_ips_by_fixed_and_port')
+        self.mox.StubOutWithMock(api, '_get_ports_resources')
         self.mox.StubOutWithMock(api, '_get_subnets_from_port')
         requested_ports = [fake_ports[2], fake_ports[0], fake_ports[1],
                            fake_ports[3], fake_ports[4], fake_ports[5]]
-        for requested_port in requested_ports:
-            api._get_floating_ips_by_fixed_and_port(
-                self.moxed_client, '1.1.1.1', requested_port['id']).AndReturn(
-                    [{'floating_ip_address': '10.0.0.1'}])
+        resources = {
+            'floating_ips': {
+                (requested_port['id'], '1.1.1.1'): [
+                    {'floating_ip_address': '10.0.0.1'}]
+                for requested_port in requested_ports},
+            'subnets': [],
+            'dhcp_ports': []}
+        api._get_ports_resources(
+            self.moxed_client, requested_ports).AndReturn(resources)
         for requested_port in requested_ports:
             api._get_subnets_from_port(self.context, requested_port,
-                                       self.moxed_client).AndReturn(
+                                       self.moxed_client,
+                                       resources=resources).AndReturn(
                 fake_subnets)
 
         self.mox.StubOutWithMock(api, '_get_preexisting_port_ids')
@@ -4993,6 +5024,125 @@ class TestNeutronv2WithMock(test.TestCase):
                               self.context, instance,
                               '172.24.5.15', '10.1.0.9')
 
+    @mock.patch.object(neutronapi, 'get_client')
+    def test_get_instances_ports(self, mock_get_client):
+        instances = [objects.Instance(uuid=uuids.instance1,
+                                      project_id=uuids.project),
+                     objects.Instance(uuid=uuids.instance2,
+                                      project_id=uuids.project)]
+        ports = [{'id': uuids.port1, 'device_id': uuids.instance1,
+                  'tenant_id': uuids.project},
+                 {'id': uuids.port2, 'device_id': uuids.instance1,
+                  'tenant_id': uuids.other_project}]
+        mock_client = mock_get_client.return_value
+        mock_client.list_ports.return_value = {'ports': ports}
+
+        result = self.api.get_instances_ports(self.context, instances)
+
+        mock_get_client.assert_called_once_with(self.context, admin=True)
+        mock_client.list_ports.assert_called_once_with(device_id=mock.ANY)
+        self.assertEqual(
+            {uuids.instance1, uuids.instance2},
+            set(mock_client.list_ports.call_args[1]['device_id']))
+        self.assertEqual({uuids.instance1: [ports[0]], uuids.instance2: []},
+                         result)
+
+    @mock.patch.object(neutronapi, 'get_client')
+    def test_get_instances_ports_many_instances(self, mock_get_client):
+        instances = [objects.Instance(uuid=uuidutils.generate_uuid(),
+                                      project_id=uuids.project)
+                     for i in range(neutronapi.MAX_SEARCH_IDS * 2 + 1)]
+        ports = [{'id': uuidutils.generate_uuid(),
+                  'device_id': instance.uuid, 'tenant_id': uuids.project}
+                 for instance in instances]
+
+        def fake_list_ports(device_id):
+            return {'ports': [port for port in ports
+                              if port['device_id'] in device_id]}
+
+        mock_client = mock_get_client.return_value
+        mock_client.list_ports.side_effect = fake_list_ports
+
+        result = self.api.get_instances_ports(self.context, instances)
+
+        # The instances are split in several requests, which are small
+        # enough for the URL of each of them not to be too long.
+        self.assertEqual([neutronapi.MAX_SEARCH_IDS,
+                          neutronapi.MAX_SEARCH_IDS, 1],
+                         [len(call[1]['device_id']) for call
+                          in mock_client.list_ports.call_args_list])
+        self.assertEqual({port['device_id']: [port] for port in ports},
+                         result)
+
+    def test_get_ports_resources(self):
+        ports = [{'id': uuids.port1,
+                  'fixed_ips': [{'ip_address': '10.0.1.2',
+                                 'subnet_id': uuids.subnet1},
+                                {'ip_address': '10.0.2.2',
+                                 'subnet_id': uuids.subnet2}]},
+                 {'id': uuids.port2,
+                  'fixed_ips': [{'ip_address': '10.0.1.3',
+                                 'subnet_id': uuids.subnet1}]}]
+        fip = {'port_id': uuids.port2, 'fixed_ip_address': '10.0.1.3',
+               'floating_ip_address': '172.24.4.3'}
+        subnets = [{'id': uuids.subnet1, 'network_id': uuids.net},
+                   {'id': uuids.subnet2, 'network_id': uuids.net}]
+        dhcp_ports = [{'id': uuids.dhcp_port}]
+        client = mock.Mock()
+        client.list_floatingips.return_value = {'floatingips': [fip]}
+        client.list_subnets.return_value = {'subnets': subnets}
+        client.list_ports.return_value = {'ports': dhcp_ports}
+
+        resources = self.api._get_ports_resources(client, ports)
+
+        client.list_floatingips.assert_called_once_with(
+            port_id=[uuids.port1, uuids.port2])
+        client.list_subnets.assert_called_once_with(
+            id=[uuids.subnet1, uuids.subnet2])
+        client.list_ports.assert_called_once_with(
+            network_id=[uuids.net], device_owner='network:dhcp')
+        self.assertEqual({'floating_ips': {(uuids.port2, '10.0.1.3'): [fip]},
+                          'subnets': subnets,
+                          'dhcp_ports': dhcp_ports},
+                         resources)
+
+    def _test_build_network_info_model_with_ports(self, port_ids, ports):
+        instance = objects.Instance(uuid=uuids.instance,
+                                    project_id=uuids.project)
+        listed_ports = [{'id': port_id} for port_id in port_ids]
+        client = mock.Mock()
+        client.list_ports.return_value = {'ports': listed_ports}
+
+        def fake_build_vif_model(context, client, port, *args, **kwargs):
+            return model.VIF(id=port['id'])
+
+        with test.nested(
+            mock.patch.object(self.api, '_gather_port_ids_and_networks',
+                              return_value=([], port_ids)),
+            mock.patch.object(self.api, '_get_preexisting_port_ids',
+                              return_value=[]),
+            mock.patch.object(self.api, '_get_ports_resources'),
+            mock.patch.object(self.api, '_build_vif_model',
+                              side_effect=fake_build_vif_model),
+        ):
+            nw_info = self.api._build_network_info_model(
+                self.context, instance, admin_client=client, ports=ports)
+        self.assertEqual(port_ids, [vif['id'] for vif in nw_info])
+        return client
+
+    def test_build_network_info_model_with_ports(self):
+        client = self._test_build_network_info_model_with_ports(
+            [uuids.port1, uuids.port2],
+            [{'id': uuids.port1}, {'id': uuids.port2}])
+        self.assertFalse(client.list_ports.called)
+
+    def test_build_network_info_model_with_ports_missing(self):
+        # A port attached since the ports were listed is not dropped
+        client = self._test_build_network_info_model_with_ports(
+            [uuids.port1, uuids.port2], [{'id': uuids.port1}])
+        client.list_ports.assert_called_once_with(
+            tenant_id=uuids.project, device_id=uuids.instance)
+
 
 class TestNeutronv2ModuleMethods(test.NoDBTestCase):
 
@@ -5706,6 +5856,90 @@ class TestAllocateForInstance(test.NoDBTestCase):
 
         self.assertFalse(mock_client.create_port.called)
 
+    def test_create_ports_for_instance_concurrently(self):
+        self.flags(port_operations_pool_size=3, group='neutron')
+        api = neutronapi.API()
+        ordered_networks = [
+            objects.NetworkRequest(network_id=uuids.net1),
+            objects.NetworkRequest(network_id=uuids.net2,
+                                   port_id=uuids.port2),
+            objects.NetworkRequest(network_id=uuids.net3)
+        ]
+        nets = {
+            uuids.net1: {"id": uuids.net1, "port_security_enabled": False},
+            uuids.net2: {"id": uuids.net2, "port_security_enabled": False},
+            uuids.net3: {"id": uuids.net3, "port_security_enabled": False}
+        }
+        ports = {uuids.net1: uuids.port1, uuids.net3: uuids.port3}
+        mock_client = mock.Mock()
+        mock_client.create_port.side_effect = lambda body: {
+            "port": {"id": ports[body['port']['network_id']]}}
+
+        result = api._create_ports_for_instance(self.context, self.instance,
+            ordered_networks, nets, mock_client, None)
+
+        self.assertEqual([(ordered_networks[0], uuids.port1),
+                          (ordered_networks[1], None),
+                          (ordered_networks[2], uuids.port3)], result)
+        self.assertEqual(2, mock_client.create_port.call_count)
+        self.assertFalse(mock_client.delete_port.called)
+
+    def test_create_ports_for_instance_concurrently_with_cleanup(self):
+        self.flags(port_operations_pool_size=3, group='neutron')
+        api = neutronapi.API()
+        ordered_networks = [
+            objects.NetworkRequest(network_id=uuids.net1),
+            objects.NetworkRequest(network_id=uuids.net2),
+            objects.NetworkRequest(network_id=uuids.net3)
+        ]
+        nets = {
+            uuids.net1: {"id": uuids.net1, "port_security_enabled": False},
+            uuids.net2: {"id": uuids.net2, "port_security_enabled": False},
+            uuids.net3: {"id": uuids.net3, "port_security_enabled": False}
+        }
+
+        def fake_create_port(body):
+            network_id = body['port']['network_id']
+            if network_id == uuids.net2:
+                raise exception.PortLimitExceeded()
+            return {"port": {"id": {uuids.net1: uuids.port1,
+                                    uuids.net3: uuids.port3}[network_id]}}
+
+        mock_client = mock.Mock()
+        mock_client.create_port.side_effect = fake_create_port
+
+        self.assertRaises(exception.PortLimitExceeded,
+            api._create_ports_for_instance,
+            self.context, self.instance, ordered_networks, nets,
+            mock_client, None)
+
+        # every port is attempted and the ones created are all deleted
+        self.assertEqual(3, mock_client.create_port.call_count)
+        self.assertEqual([mock.call(uuids.port1), mock.call(uuids.port3)],
+            mock_client.delete_port.call_args_list)
+
+    def test_create_ports_for_instance_concurrently_sg_failure(self):
+        self.flags(port_operations_pool_size=3, group='neutron')
+        api = neutronapi.API()
+        ordered_networks = [
+            objects.NetworkRequest(network_id=uuids.net1),
+            objects.NetworkRequest(network_id=uuids.net2)
+        ]
+        nets = {
+            uuids.net1: {"id": uuids.net1, "port_security_enabled": False},
+            uuids.net2: {"id": uuids.net2, "port_security_enabled": True}
+        }
+        mock_client = mock.Mock()
+
+        self.assertRaises(exception.SecurityGroupCannotBeApplied,
+            api._create_ports_for_instance,
+            self.context, self.instance, ordered_networks, nets,
+            mock_client, None)
+
+        # the networks are all checked before creating any port
+        self.assertFalse(mock_client.create_port.called)
+        self.assertFalse(mock_client.delete_port.called)
+
     @mock.patch.object(objects.VirtualInterface, "create")
     def test_update_ports_for_instance_with_portbinding(self, mock_create):
         api = neutronapi.API()
@@ -5750,6 +5984,103 @@ class TestAllocateForInstance(test.NoDBTestCase):
                 neutronapi.BINDING_HOST_ID: bind_host_id,
                 'device_id': self.instance.uuid}})
 
+    @mock.patch.object(objects.VirtualInterface, "create")
+    def test_update_ports_for_instance_concurrently(self, mock_create):
+        self.flags(port_operations_pool_size=2, group='neutron')
+        api = neutronapi.API()
+        self.instance.availability_zone = "test_az"
+        mock_neutron = mock.Mock()
+        mock_admin = mock.Mock()
+        requests_and_created_ports = [
+            (objects.NetworkRequest(
+                network_id=uuids.net1), uuids.port1),
+            (objects.NetworkRequest(
+                network_id=uuids.net2, port_id=uuids.port2), None)]
+        net1 = {"id": uuids.net1}
+        net2 = {"id": uuids.net2}
+        nets = {uuids.net1: net1, uuids.net2: net2}
+        bind_host_id = "bind_host_id"
+        available_macs = ["mac1", "mac2"]
+        requested_ports_dict = {uuids.port1: {}, uuids.port2: {}}
+
+        mock_neutron.list_extensions.return_value = {"extensions": [
+            {"name": "asdf"}]}
+        mock_admin.update_port.side_effect = lambda port_id, body: {
+            "port": {"id": port_id,
+                     "mac_address": body['port']['mac_address']}}
+
+        ordered_nets, ordered_ports, preexisting_port_ids, \
+            created_port_ids = api._update_ports_for_instance(
+                self.context, self.instance,
+                mock_neutron, mock_admin, requests_and_created_ports, nets,
+                bind_host_id, available_macs, requested_ports_dict)
+
+        self.assertEqual([net1, net2], ordered_nets, "ordered_nets")
+        self.assertEqual([uuids.port1, uuids.port2], ordered_ports,
+            "ordered_ports")
+        self.assertEqual([uuids.port2], preexisting_port_ids, "preexisting")
+        self.assertEqual([uuids.port1], created_port_ids, "created")
+        # the MAC addresses are assigned in the requested order
+        mock_admin.update_port.assert_has_calls([
+            mock.call(uuids.port1, {'port': {
+                'device_owner': 'compute:test_az',
+                'mac_address': 'mac2',
+                neutronapi.BINDING_HOST_ID: bind_host_id,
+                'device_id': self.instance.uuid}}),
+            mock.call(uuids.port2, {'port': {
+                'device_owner': 'compute:test_az',
+                'mac_address': 'mac1',
+                neutronapi.BINDING_HOST_ID: bind_host_id,
+                'device_id': self.instance.uuid}})], any_order=True)
+        self.assertEqual(2, mock_create.call_count)
+
+    @mock.patch('nova.network.neutronv2.api.API.'
+                '_populate_neutron_extension_values')
+    @mock.patch.object(objects.VirtualInterface, 'create')
+    @mock.patch.object(objects.VirtualInterface, 'destroy')
+    @mock.patch('nova.network.neutronv2.api.API._unbind_ports')
+    @mock.patch('nova.network.neutronv2.api.API._delete_ports')
+    def test_update_ports_for_instance_concurrently_rollback(self,
+            mock_delete_ports, mock_unbind_ports, mock_vif_destroy,
+            mock_vif_create, mock_populate_ext_values):
+        self.flags(port_operations_pool_size=3, group='neutron')
+        api = neutronapi.API()
+        mock_client = mock.Mock()
+        requests_and_created_ports = [
+            (objects.NetworkRequest(network_id=uuids.net,
+                                    port_id=uuids.preexisting_port_id),
+             None),
+            (objects.NetworkRequest(network_id=uuids.net),
+             uuids.created_port_id),
+            (objects.NetworkRequest(network_id=uuids.net),
+             uuids.failed_port_id),
+        ]
+        nets = {uuids.net: {'id': uuids.net}}
+
+        def fake_update_port(port_client, instance, port_id, body):
+            if port_id == uuids.failed_port_id:
+                raise exception.PortInUse(port_id=port_id)
+            return {'id': port_id, 'mac_address': 'fake-mac'}
+
+        with mock.patch.object(api, '_update_port',
+                               side_effect=fake_update_port):
+            self.assertRaises(exception.PortInUse,
+                              api._update_ports_for_instance,
+                              self.context, self.instance, mock_client,
+                              mock_client, requests_and_created_ports, nets,
+                              bind_host_id=None, available_macs=None,
+                              requested_ports_dict=None)
+
+        # the other ports are updated and then rolled back
+        self.assertEqual(2, mock_vif_create.call_count)
+        self.assertEqual(2, mock_vif_destroy.call_count)
+        mock_unbind_ports.assert_called_once_with(
+            self.context, [uuids.preexisting_port_id], mock_client,
+            mock_client)
+        mock_delete_ports.assert_called_once_with(
+            mock_client, self.instance,
+            [uuids.created_port_id, uuids.failed_port_id])
+
 
 class TestNeutronv2NeutronHostnameDNS(TestNeutronv2Base):
     def setUp(self):
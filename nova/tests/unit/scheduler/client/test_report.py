@@ -1167,6 +1167,105 @@ class TestSetAndClearAllocations(SchedulerReportClientTestCase):
         self.assertEqual(error_message, log_args['text'])
 
 
+class TestClaimResourcesForConsumers(SchedulerReportClientTestCase):
+
+    def setUp(self):
+        super(TestClaimResourcesForConsumers, self).setUp()
+        self.mock_post = mock.patch(
+            'nova.scheduler.client.report.SchedulerReportClient.post').start()
+        self.addCleanup(self.mock_post.stop)
+        self.mock_post.return_value.status_code = 204
+        self.alloc_reqs = {
+            uuids.instance1: {
+                'allocations': {
+                    uuids.cn1: {'resources': {'VCPU': 1, 'MEMORY_MB': 1024}},
+                },
+            },
+            uuids.instance2: {
+                'allocations': {
+                    uuids.cn2: {'resources': {'VCPU': 1, 'MEMORY_MB': 1024}},
+                    uuids.shared: {'resources': {'DISK_GB': 10}},
+                },
+            },
+        }
+        self.expected_payload = {
+            uuids.instance1: {
+                'allocations': {
+                    uuids.cn1: {'resources': {'VCPU': 1, 'MEMORY_MB': 1024}},
+                },
+                'project_id': uuids.project_id,
+                'user_id': uuids.user_id,
+            },
+            uuids.instance2: {
+                'allocations': {
+                    uuids.cn2: {'resources': {'VCPU': 1, 'MEMORY_MB': 1024}},
+                    uuids.shared: {'resources': {'DISK_GB': 10}},
+                },
+                'project_id': uuids.project_id,
+                'user_id': uuids.user_id,
+            },
+        }
+
+    def test_claim(self):
+        resp = self.client.claim_resources_for_consumers(
+            self.context, self.alloc_reqs, uuids.project_id, uuids.user_id,
+            allocation_request_version='1.25')
+
+        self.assertTrue(resp)
+        self.mock_post.assert_called_once_with(
+            '/allocations', self.expected_payload, version='1.25',
+            global_request_id=self.context.global_id)
+
+    def test_claim_old_version(self):
+        alloc_reqs = {
+            uuids.instance1: {
+                'allocations': [
+                    {'resource_provider': {'uuid': uuids.cn1},
+                     'resources': {'VCPU': 1, 'MEMORY_MB': 1024}},
+                ],
+            },
+        }
+
+        resp = self.client.claim_resources_for_consumers(
+            self.context, alloc_reqs, uuids.project_id, uuids.user_id,
+            allocation_request_version='1.10')
+
+        self.assertTrue(resp)
+        expected_payload = {
+            uuids.instance1: self.expected_payload[uuids.instance1]
+        }
+        self.mock_post.assert_called_once_with(
+            '/allocations', expected_payload, version='1.13',
+            global_request_id=self.context.global_id)
+
+    @mock.patch('time.sleep')
+    def test_409_concurrent_update(self, mock_sleep):
+        self.mock_post.return_value.status_code = 409
+        self.mock_post.return_value.text = 'concurrently updated'
+
+        resp = self.client.claim_resources_for_consumers(
+            self.context, self.alloc_reqs, uuids.project_id, uuids.user_id,
+            allocation_request_version='1.25')
+
+        self.assertFalse(resp)
+        # Post was attempted four times.
+        self.assertEqual(4, self.mock_post.call_count)
+
+    @mock.patch('nova.scheduler.client.report.LOG.warning')
+    def test_not_409_failure(self, mock_log):
+        self.mock_post.return_value.status_code = 409
+        self.mock_post.return_value.text = 'Unable to allocate inventory'
+
+        resp = self.client.claim_resources_for_consumers(
+            self.context, self.alloc_reqs, uuids.project_id, uuids.user_id,
+            allocation_request_version='1.25')
+
+        self.assertFalse(resp)
+        self.assertEqual(1, self.mock_post.call_count)
+        args, kwargs = mock_log.call_args
+        self.assertIn('Unable to submit allocations', args[0])
+
+
 class TestProviderOperations(SchedulerReportClientTestCase):
     @mock.patch('nova.scheduler.client.report.SchedulerReportClient.'
                 '_create_resource_provider')
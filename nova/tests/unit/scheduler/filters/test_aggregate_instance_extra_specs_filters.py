@@ -90,3 +90,51 @@ class TestAggregateInstanceExtraSpecsFilter(test.NoDBTestCase):
             'opt2': '222'
         }
         self._do_test_aggregate_filter_extra_specs(especs, passes=False)
+
+    def test_aggregate_filter_vector_matches_once_per_aggregates(self,
+                                                                 agg_mock):
+        spec_obj = objects.RequestSpec(
+            context=mock.sentinel.ctx,
+            flavor=objects.Flavor(memory_mb=1024,
+                                  extra_specs={'opt1': '1'}))
+        agg1 = objects.Aggregate(id=1, metadata={'opt1': '1'})
+        agg2 = objects.Aggregate(id=2, metadata={'opt1': '2'})
+        hosts = [fakes.FakeHostState('host%d' % i, 'node%d' % i,
+                                     {'aggregates': [agg1]})
+                 for i in range(3)]
+        hosts.append(fakes.FakeHostState('host3', 'node3',
+                                         {'aggregates': [agg2]}))
+        agg_mock.side_effect = [{'opt1': set(['1'])}, {'opt1': set(['2'])}]
+        self.assertEqual([True, True, True, False],
+                         self.filt_cls.filter_vector(hosts, spec_obj))
+        self.assertEqual(2, agg_mock.call_count)
+
+    @mock.patch.object(agg_specs.LOG, 'debug')
+    def test_aggregate_filter_vector_logs_rejected_hosts(self, mock_debug,
+                                                         agg_mock):
+        spec_obj = objects.RequestSpec(
+            context=mock.sentinel.ctx,
+            flavor=objects.Flavor(memory_mb=1024,
+                                  extra_specs={'opt1': '1'}))
+        agg = objects.Aggregate(id=1, metadata={'opt1': '2'})
+        hosts = [fakes.FakeHostState('host%d' % i, 'node%d' % i,
+                                     {'aggregates': [agg]})
+                 for i in range(2)]
+        agg_mock.return_value = {'opt1': set(['2'])}
+        with mock.patch.object(agg_specs.LOG, 'isEnabledFor',
+                               return_value=True):
+            self.assertEqual([False, False],
+                             self.filt_cls.filter_vector(hosts, spec_obj))
+        # The host sharing the aggregates of a rejected host logs why it
+        # is rejected too.
+        self.assertEqual(hosts, [call[0][1]['host_state']
+                                 for call in mock_debug.call_args_list])
+
+    def test_aggregate_filter_vector_no_extra_specs(self, agg_mock):
+        spec_obj = objects.RequestSpec(
+            context=mock.sentinel.ctx,
+            flavor=objects.Flavor(memory_mb=1024))
+        hosts = [fakes.FakeHostState('host1', 'node1', {})]
+        self.assertEqual([True],
+                         self.filt_cls.filter_vector(hosts, spec_obj))
+        self.assertFalse(agg_mock.called)
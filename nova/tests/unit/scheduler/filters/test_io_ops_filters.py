@@ -37,6 +37,16 @@ class TestIoOpsFilter(test.NoDBTestCase):
         spec_obj = objects.RequestSpec()
         self.assertFalse(self.filt_cls.host_passes(host, spec_obj))
 
+    def test_filter_num_iops_vector(self):
+        self.flags(max_io_ops_per_host=8, group='filter_scheduler')
+        self.filt_cls = io_ops_filter.IoOpsFilter()
+        hosts = [fakes.FakeHostState('host%d' % i, 'node%d' % i,
+                                     {'num_io_ops': i})
+                 for i in (7, 8, 9)]
+        spec_obj = objects.RequestSpec()
+        self.assertEqual([True, False, False],
+                         self.filt_cls.filter_vector(hosts, spec_obj))
+
     @mock.patch('nova.scheduler.filters.utils.aggregate_values_from_key')
     def test_aggregate_filter_num_iops_value(self, agg_mock):
         self.flags(max_io_ops_per_host=7, group='filter_scheduler')
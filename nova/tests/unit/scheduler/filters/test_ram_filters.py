@@ -57,6 +57,48 @@ class TestRamFilter(test.NoDBTestCase):
                  'ram_allocation_ratio': 2.0})
         self.assertFalse(self.filt_cls.host_passes(host, spec_obj))
 
+    def test_ram_filter_vector(self):
+        spec_obj = objects.RequestSpec(
+            flavor=objects.Flavor(memory_mb=1024))
+        host1 = fakes.FakeHostState('host1', 'node1',
+                {'free_ram_mb': 1023, 'total_usable_ram_mb': 1024,
+                 'ram_allocation_ratio': 1.0})
+        host2 = fakes.FakeHostState('host2', 'node2',
+                {'free_ram_mb': -1024, 'total_usable_ram_mb': 2048,
+                 'ram_allocation_ratio': 2.0})
+        host3 = fakes.FakeHostState('host3', 'node3',
+                {'free_ram_mb': 512, 'total_usable_ram_mb': 512,
+                 'ram_allocation_ratio': 2.0})
+        hosts = [host1, host2, host3]
+        self.assertEqual([False, True, False],
+                         self.filt_cls.filter_vector(hosts, spec_obj))
+        self.assertEqual({'memory_mb': 2048 * 2.0}, host2.limits)
+        self.assertEqual({}, host1.limits)
+        self.assertEqual([host2],
+                         list(self.filt_cls.filter_all(hosts, spec_obj)))
+
+    @mock.patch.object(ram_filter.LOG, 'debug')
+    def test_ram_filter_vector_logs_rejected_hosts(self, mock_debug):
+        spec_obj = objects.RequestSpec(
+            flavor=objects.Flavor(memory_mb=1024))
+        host1 = fakes.FakeHostState('host1', 'node1',
+                {'free_ram_mb': 1023, 'total_usable_ram_mb': 1024,
+                 'ram_allocation_ratio': 1.0})
+        host2 = fakes.FakeHostState('host2', 'node2',
+                {'free_ram_mb': 512, 'total_usable_ram_mb': 512,
+                 'ram_allocation_ratio': 2.0})
+        self.assertEqual([False, False],
+                         self.filt_cls.filter_vector([host1, host2],
+                                                     spec_obj))
+        # The same reasons as host_passes() are logged for each host.
+        self.assertEqual(2, mock_debug.call_count)
+        self.assertEqual(host1, mock_debug.call_args_list[0][0][1][
+            'host_state'])
+        self.assertEqual(1023, mock_debug.call_args_list[0][0][1][
+            'usable_ram'])
+        self.assertEqual(host2, mock_debug.call_args_list[1][0][1][
+            'host_state'])
+
 
 @mock.patch('nova.scheduler.filters.utils.aggregate_values_from_key')
 class TestAggregateRamFilter(test.NoDBTestCase):
@@ -28,6 +28,7 @@ from nova.scheduler import host_manager
 from nova.scheduler import utils as scheduler_utils
 from nova.scheduler import weights
 from nova import test  # noqa
+from nova.tests.unit.scheduler import fakes
 from nova.tests.unit.scheduler import test_scheduler
 from nova.tests import uuidsentinel as uuids
 
@@ -539,6 +540,318 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         self.assertEqual(['host2', 'host1'], ig.hosts)
         self.assertEqual({}, ig.obj_get_changes())
 
+    @mock.patch('nova.scheduler.utils.claim_resources')
+    @mock.patch('nova.scheduler.filter_scheduler.FilterScheduler.'
+                '_get_all_host_states')
+    @mock.patch('nova.scheduler.filter_scheduler.FilterScheduler.'
+                '_get_sorted_hosts')
+    def test_schedule_tries_all_alloc_reqs(self, mock_get_hosts,
+            mock_get_all_states, mock_claim):
+        """Tests that all the allocation requests of a host are tried in
+        ranked order before moving on to the next host.
+        """
+        spec_obj = objects.RequestSpec(
+            num_instances=1,
+            flavor=objects.Flavor(memory_mb=512,
+                                  root_gb=512,
+                                  ephemeral_gb=0,
+                                  swap=0,
+                                  vcpus=1),
+            project_id=uuids.project_id,
+            instance_group=None)
+
+        host_state = mock.Mock(spec=host_manager.HostState,
+                host="fake_host", nodename="fake_node", uuid=uuids.cn1,
+                cell_uuid=uuids.cell1, limits={})
+        all_host_states = [host_state]
+        mock_get_all_states.return_value = all_host_states
+        mock_get_hosts.return_value = all_host_states
+        # The first claim fails, the second one succeeds.
+        mock_claim.side_effect = [False, True]
+
+        ar_busy_pool = {"allocations": {
+            uuids.cn1: {"resources": {"VCPU": 1}},
+            uuids.pool1: {"resources": {"DISK_GB": 100}}}}
+        ar_idle_pool = {"allocations": {
+            uuids.cn1: {"resources": {"VCPU": 1}},
+            uuids.pool2: {"resources": {"DISK_GB": 100}}}}
+        ar_no_room_pool = {"allocations": {
+            uuids.cn1: {"resources": {"VCPU": 1}},
+            uuids.pool3: {"resources": {"DISK_GB": 100}}}}
+        provider_summaries = {
+            uuids.cn1: {"resources": {
+                "VCPU": {"capacity": 16, "used": 0}}},
+            uuids.pool1: {"resources": {
+                "DISK_GB": {"capacity": 1000, "used": 500}}},
+            uuids.pool2: {"resources": {
+                "DISK_GB": {"capacity": 1000, "used": 100}}},
+            uuids.pool3: {"resources": {
+                "DISK_GB": {"capacity": 1000, "used": 900}}},
+        }
+        alloc_reqs_by_rp_uuid = {
+            uuids.cn1: [ar_no_room_pool, ar_busy_pool, ar_idle_pool],
+        }
+        ctx = mock.Mock()
+        selected_hosts = self.driver._schedule(ctx, spec_obj,
+                [uuids.instance], alloc_reqs_by_rp_uuid, provider_summaries)
+
+        mock_claim.assert_has_calls([
+            mock.call(ctx.elevated.return_value, self.placement_client,
+                      spec_obj, uuids.instance, ar_idle_pool,
+                      allocation_request_version=None),
+            mock.call(ctx.elevated.return_value, self.placement_client,
+                      spec_obj, uuids.instance, ar_busy_pool,
+                      allocation_request_version=None)])
+        self.assertEqual(2, mock_claim.call_count)
+        # The selection holds the allocation request which was claimed.
+        self.assertEqual(ar_busy_pool, jsonutils.loads(
+            selected_hosts[0][0].allocation_request))
+
+    def test_rank_alloc_reqs(self):
+        ar_numa0 = {"allocations": {
+            uuids.numa0: {"resources": {"VCPU": 2, "MEMORY_MB": 1024}}}}
+        ar_numa1 = {"allocations": {
+            uuids.numa1: {"resources": {"VCPU": 2, "MEMORY_MB": 1024}}}}
+        provider_summaries = {
+            uuids.numa0: {"resources": {
+                "VCPU": {"capacity": 8, "used": 2},
+                "MEMORY_MB": {"capacity": 8192, "used": 0}}},
+            uuids.numa1: {"resources": {
+                "VCPU": {"capacity": 8, "used": 4},
+                "MEMORY_MB": {"capacity": 8192, "used": 0}}},
+        }
+        self.assertEqual(
+            [ar_numa0, ar_numa1],
+            self.driver._rank_alloc_reqs([ar_numa1, ar_numa0],
+                                         provider_summaries))
+        # Resources claimed for previous instances of the request are
+        # accounted for.
+        self.assertEqual(
+            [ar_numa1, ar_numa0],
+            self.driver._rank_alloc_reqs([ar_numa0, ar_numa1],
+                                         provider_summaries,
+                                         [ar_numa0, ar_numa0]))
+        # Without provider summaries the order of placement is kept.
+        self.assertEqual(
+            [ar_numa1, ar_numa0],
+            self.driver._rank_alloc_reqs([ar_numa1, ar_numa0], {}))
+
+    @mock.patch('nova.scheduler.utils.claim_resources')
+    @mock.patch('nova.scheduler.utils.claim_resources_for_instances')
+    @mock.patch('nova.scheduler.filter_scheduler.FilterScheduler.'
+                '_get_all_host_states')
+    @mock.patch('nova.scheduler.filter_scheduler.FilterScheduler.'
+                '_get_sorted_hosts')
+    def test_schedule_batch_claims(self, mock_get_hosts, mock_get_all_states,
+            mock_batch_claim, mock_claim):
+        self.flags(batch_claims=True, group='filter_scheduler')
+        ig = objects.InstanceGroup(hosts=[])
+        spec_obj = objects.RequestSpec(
+            num_instances=2,
+            flavor=objects.Flavor(memory_mb=512,
+                                  root_gb=512,
+                                  ephemeral_gb=0,
+                                  swap=0,
+                                  vcpus=1),
+            project_id=uuids.project_id,
+            instance_group=ig)
+
+        hs1 = mock.Mock(spec=host_manager.HostState, host='host1',
+                nodename="node1", limits={}, uuid=uuids.cn1,
+                cell_uuid=uuids.cell1)
+        hs2 = mock.Mock(spec=host_manager.HostState, host='host2',
+                nodename="node2", limits={}, uuid=uuids.cn2,
+                cell_uuid=uuids.cell1)
+        hs3 = mock.Mock(spec=host_manager.HostState, host='host3',
+                nodename="node3", limits={}, uuid=uuids.cn3,
+                cell_uuid=uuids.cell1)
+        all_host_states = [hs1, hs2, hs3]
+        mock_get_all_states.return_value = all_host_states
+        mock_batch_claim.return_value = True
+
+        alloc_reqs_by_rp_uuid = {
+            uuids.cn1: [{"allocations": "fake_cn1_alloc"}],
+            uuids.cn2: [{"allocations": "fake_cn2_alloc"}],
+        }
+        # The host without allocation request is skipped.
+        mock_get_hosts.side_effect = ([hs3, hs2, hs1], [hs1, hs2, hs3],
+                                      [hs1, hs2, hs3])
+        instance_uuids = [uuids.instance0, uuids.instance1]
+        ctx = mock.Mock()
+        selections = self.driver._schedule(ctx, spec_obj, instance_uuids,
+            alloc_reqs_by_rp_uuid, mock.sentinel.provider_summaries,
+            allocation_request_version='1.25', return_alternates=True)
+
+        mock_batch_claim.assert_called_once_with(
+            ctx.elevated.return_value, self.placement_client, spec_obj,
+            {uuids.instance0: alloc_reqs_by_rp_uuid[uuids.cn2][0],
+             uuids.instance1: alloc_reqs_by_rp_uuid[uuids.cn1][0]},
+            allocation_request_version='1.25')
+        mock_claim.assert_not_called()
+        mock_get_all_states.assert_called_once_with(
+            ctx.elevated.return_value, spec_obj,
+            mock.sentinel.provider_summaries)
+        self.assertEqual([uuids.cn2, uuids.cn1],
+                         [sel[0].compute_node_uuid for sel in selections])
+        self.assertEqual(['host2', 'host1'], ig.hosts)
+        self.assertEqual({}, ig.obj_get_changes())
+
+    @mock.patch('nova.scheduler.utils.claim_resources')
+    @mock.patch('nova.scheduler.utils.claim_resources_for_instances')
+    @mock.patch('nova.scheduler.filter_scheduler.FilterScheduler.'
+                '_get_all_host_states')
+    @mock.patch('nova.scheduler.filter_scheduler.FilterScheduler.'
+                '_get_sorted_hosts')
+    def test_schedule_batch_claims_fails(self, mock_get_hosts,
+            mock_get_all_states, mock_batch_claim, mock_claim):
+        """Tests that we claim for one instance at a time with fresh host
+        states if the batch claim fails.
+        """
+        self.flags(batch_claims=True, group='filter_scheduler')
+        ig = objects.InstanceGroup(hosts=['host0'])
+        spec_obj = objects.RequestSpec(
+            num_instances=2,
+            flavor=objects.Flavor(memory_mb=512,
+                                  root_gb=512,
+                                  ephemeral_gb=0,
+                                  swap=0,
+                                  vcpus=1),
+            project_id=uuids.project_id,
+            instance_group=ig)
+
+        hs1 = mock.Mock(spec=host_manager.HostState, host='host1',
+                nodename="node1", limits={}, uuid=uuids.cn1,
+                cell_uuid=uuids.cell1)
+        hs2 = mock.Mock(spec=host_manager.HostState, host='host2',
+                nodename="node2", limits={}, uuid=uuids.cn2,
+                cell_uuid=uuids.cell1)
+        fresh_hs1 = mock.Mock(spec=host_manager.HostState, host='host1',
+                nodename="node1", limits={}, uuid=uuids.cn1,
+                cell_uuid=uuids.cell1)
+        fresh_hs2 = mock.Mock(spec=host_manager.HostState, host='host2',
+                nodename="node2", limits={}, uuid=uuids.cn2,
+                cell_uuid=uuids.cell1)
+        mock_get_all_states.side_effect = ([hs1, hs2],
+                                           [fresh_hs1, fresh_hs2])
+        mock_batch_claim.return_value = False
+        mock_claim.return_value = True
+
+        alloc_reqs_by_rp_uuid = {
+            uuids.cn1: [{"allocations": "fake_cn1_alloc"}],
+            uuids.cn2: [{"allocations": "fake_cn2_alloc"}],
+        }
+        mock_get_hosts.side_effect = (
+            # The batch selection.
+            [hs1, hs2], [hs2, hs1],
+            # The selection claiming for one instance at a time.
+            [fresh_hs1, fresh_hs2], [fresh_hs2, fresh_hs1])
+        instance_uuids = [uuids.instance0, uuids.instance1]
+        ctx = mock.Mock()
+        selections = self.driver._schedule(ctx, spec_obj, instance_uuids,
+            alloc_reqs_by_rp_uuid, mock.sentinel.provider_summaries)
+
+        self.assertEqual(1, mock_batch_claim.call_count)
+        self.assertEqual(2, mock_claim.call_count)
+        self.assertEqual(2, mock_get_all_states.call_count)
+        self.assertEqual([uuids.cn1, uuids.cn2],
+                         [sel[0].compute_node_uuid for sel in selections])
+        fresh_hs1.consume_from_request.assert_called_once_with(spec_obj)
+        fresh_hs2.consume_from_request.assert_called_once_with(spec_obj)
+        # The hosts added to the group by the batch selection were removed.
+        self.assertEqual(['host0', 'host1', 'host2'], ig.hosts)
+        # The consumed host states are refreshed from their compute node.
+        self.assertIsNone(hs1.updated)
+        self.assertIsNone(hs2.updated)
+
+    @mock.patch('nova.scheduler.utils.claim_resources')
+    @mock.patch('nova.scheduler.utils.claim_resources_for_instances',
+                return_value=False)
+    @mock.patch('nova.scheduler.filter_scheduler.FilterScheduler.'
+                '_get_all_host_states')
+    @mock.patch('nova.scheduler.filter_scheduler.FilterScheduler.'
+                '_get_sorted_hosts')
+    def test_schedule_batch_claims_fails_releases_resources(self,
+            mock_get_hosts, mock_get_all_states, mock_batch_claim,
+            mock_claim):
+        """Tests that the resources consumed on the host states by a failed
+        batch claim are not counted again when claiming for one instance at
+        a time.
+        """
+        self.flags(batch_claims=True, group='filter_scheduler')
+        spec_obj = objects.RequestSpec(
+            num_instances=2,
+            flavor=objects.Flavor(memory_mb=512,
+                                  root_gb=1,
+                                  ephemeral_gb=0,
+                                  swap=0,
+                                  vcpus=1),
+            project_id=uuids.project_id,
+            instance_group=None)
+        compute = fakes.COMPUTE_NODES[2]
+        hs = host_manager.HostState(compute.host, compute.hypervisor_hostname,
+                                    uuids.cell1)
+
+        def fake_get_all_host_states(context, spec_obj, provider_summaries):
+            # Like the host manager, update the cached host state from the
+            # compute node on every call.
+            hs.update(compute=compute)
+            return [hs]
+
+        mock_get_all_states.side_effect = fake_get_all_host_states
+        mock_get_hosts.side_effect = lambda spec_obj, hosts, num: list(hosts)
+        mock_claim.return_value = True
+        alloc_reqs_by_rp_uuid = {compute.uuid: [{"allocations": "fake"}]}
+
+        selections = self.driver._schedule(mock.Mock(), spec_obj,
+            [uuids.instance0, uuids.instance1], alloc_reqs_by_rp_uuid,
+            mock.sentinel.provider_summaries)
+
+        self.assertEqual(2, len(selections))
+        self.assertEqual(2, mock_claim.call_count)
+        # Only the resources of the two instances claimed one at a time are
+        # consumed.
+        self.assertEqual(compute.free_ram_mb - 1024, hs.free_ram_mb)
+        self.assertEqual(compute.free_disk_gb * 1024 - 2048, hs.free_disk_mb)
+        self.assertEqual(compute.vcpus_used + 2, hs.vcpus_used)
+        self.assertEqual(2, hs.num_instances)
+
+    @mock.patch('nova.scheduler.utils.claim_resources_for_instances')
+    @mock.patch('nova.scheduler.filter_scheduler.FilterScheduler.'
+                '_get_all_host_states')
+    @mock.patch('nova.scheduler.filter_scheduler.FilterScheduler.'
+                '_get_sorted_hosts')
+    def test_schedule_batch_claims_not_enough_hosts(self, mock_get_hosts,
+            mock_get_all_states, mock_batch_claim):
+        self.flags(batch_claims=True, group='filter_scheduler')
+        spec_obj = objects.RequestSpec(
+            num_instances=2,
+            flavor=objects.Flavor(memory_mb=512,
+                                  root_gb=512,
+                                  ephemeral_gb=0,
+                                  swap=0,
+                                  vcpus=1),
+            project_id=uuids.project_id,
+            instance_group=None)
+
+        hs1 = mock.Mock(spec=host_manager.HostState, host='host1',
+                nodename="node1", limits={}, uuid=uuids.cn1,
+                cell_uuid=uuids.cell1)
+        mock_get_all_states.return_value = [hs1]
+        mock_get_hosts.side_effect = ([hs1], [])
+        alloc_reqs_by_rp_uuid = {
+            uuids.cn1: [{"allocations": "fake_cn1_alloc"}],
+        }
+        ctx = mock.Mock()
+        self.assertRaises(exception.NoValidHost, self.driver._schedule, ctx,
+                spec_obj, [uuids.instance0, uuids.instance1],
+                alloc_reqs_by_rp_uuid, mock.sentinel.provider_summaries)
+
+        # Nothing was claimed since a host was not found for every instance.
+        mock_batch_claim.assert_not_called()
+        mock_get_all_states.assert_called_once_with(
+            ctx.elevated.return_value, spec_obj,
+            mock.sentinel.provider_summaries)
+
     @mock.patch('random.choice', side_effect=lambda x: x[1])
     @mock.patch('nova.scheduler.host_manager.HostManager.get_weighed_hosts')
     @mock.patch('nova.scheduler.host_manager.HostManager.get_filtered_hosts')
@@ -675,6 +988,59 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         # (as the host_subset_size is 1) and the tail should stay the same.
         self.assertEqual([hs2, hs1, hs3, hs4], results)
 
+    @mock.patch('random.choice', side_effect=lambda x: x[0])
+    @mock.patch('nova.scheduler.host_manager.HostManager.get_weighed_hosts')
+    @mock.patch('nova.scheduler.host_manager.HostManager.get_filtered_hosts')
+    def test_get_sorted_hosts_sort_best_hosts_only(self, mock_filt,
+            mock_weighed, mock_rand):
+        """Tests that only the best weighed hosts are sorted when enabled."""
+        self.flags(host_subset_size=2, sort_best_hosts_only=True,
+                   group='filter_scheduler')
+        self.flags(max_attempts=3, group='scheduler')
+        hs1 = mock.Mock(spec=host_manager.HostState, host='host1')
+        hs2 = mock.Mock(spec=host_manager.HostState, host='host2')
+        all_host_states = [hs1, hs2]
+
+        mock_weighed.return_value = [
+            weights.WeighedHost(hs2, 1.0), weights.WeighedHost(hs1, 0.5),
+        ]
+
+        results = self.driver._get_sorted_hosts(mock.sentinel.spec,
+            all_host_states, mock.sentinel.index)
+
+        mock_weighed.assert_called_once_with(mock_filt.return_value,
+            mock.sentinel.spec, limit=5)
+        self.assertEqual([hs2, hs1], results)
+
+    @mock.patch('random.shuffle', side_effect=lambda x: x.reverse())
+    @mock.patch('nova.scheduler.host_manager.HostManager.get_weighed_hosts')
+    @mock.patch('nova.scheduler.host_manager.HostManager.get_filtered_hosts')
+    def test_get_sorted_hosts_shuffle_top_equal_partially_sorted(self,
+            mock_filt, mock_weighed, mock_shuffle):
+        """Tests that only the leading best weighed hosts are shuffled when
+        the hosts after the best ones are not sorted.
+        """
+        self.flags(host_subset_size=1, sort_best_hosts_only=True,
+                   shuffle_best_same_weighed_hosts=True,
+                   group='filter_scheduler')
+        hs1 = mock.Mock(spec=host_manager.HostState, host='host1')
+        hs2 = mock.Mock(spec=host_manager.HostState, host='host2')
+        hs3 = mock.Mock(spec=host_manager.HostState, host='host3')
+        hs4 = mock.Mock(spec=host_manager.HostState, host='host4')
+        all_host_states = [hs1, hs2, hs3, hs4]
+
+        mock_weighed.return_value = [
+            weights.WeighedHost(hs1, 1.0),
+            weights.WeighedHost(hs2, 1.0),
+            weights.WeighedHost(hs3, 0.5),
+            weights.WeighedHost(hs4, 1.0),
+        ]
+
+        results = self.driver._get_sorted_hosts(mock.sentinel.spec,
+            all_host_states, mock.sentinel.index)
+
+        self.assertEqual([hs2, hs1, hs3, hs4], results)
+
     def test_cleanup_allocations(self):
         instance_uuids = []
         # Check we don't do anything if there's no instance UUIDs to cleanup
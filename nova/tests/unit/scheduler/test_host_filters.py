@@ -14,6 +14,9 @@
 """
 Tests For Scheduler Host Filters.
 """
+import mock
+
+from nova import objects
 from nova.scheduler import filters
 from nova.scheduler.filters import all_hosts_filter
 from nova.scheduler.filters import compute_filter
@@ -35,3 +38,51 @@ class HostFiltersTestCase(test.NoDBTestCase):
         filt_cls = all_hosts_filter.AllHostsFilter()
         host = fakes.FakeHostState('host1', 'node1', {})
         self.assertTrue(filt_cls.host_passes(host, {}))
+
+    def test_filter_all_uses_filter_vector(self):
+        class VectorFilter(filters.BaseHostFilter):
+            def filter_vector(self, host_states, spec_obj):
+                return [False, True]
+
+            def host_passes(self, host_state, spec_obj):
+                raise AssertionError('host_passes() should not be called')
+
+        host1 = fakes.FakeHostState('host1', 'node1', {})
+        host2 = fakes.FakeHostState('host2', 'node2', {})
+        filt_cls = VectorFilter()
+        self.assertEqual([host2], list(filt_cls.filter_all(
+            iter([host1, host2]), objects.RequestSpec())))
+
+    def test_filter_all_falls_back_to_host_passes(self):
+        filt_cls = all_hosts_filter.AllHostsFilter()
+        host = fakes.FakeHostState('host1', 'node1', {})
+        with mock.patch.object(filt_cls, 'host_passes',
+                               return_value=False) as mock_passes:
+            self.assertEqual([], list(filt_cls.filter_all(
+                [host], objects.RequestSpec())))
+        mock_passes.assert_called_once_with(host, mock.ANY)
+
+    def test_filter_all_skipped_on_rebuild(self):
+        class VectorFilter(filters.BaseHostFilter):
+            def filter_vector(self, host_states, spec_obj):
+                raise AssertionError('filter_vector() should not be called')
+
+        host = fakes.FakeHostState('host1', 'node1', {})
+        spec_obj = objects.RequestSpec(
+            scheduler_hints={'_nova_check_type': ['rebuild']})
+        self.assertEqual([host], list(VectorFilter().filter_all(
+            [host], spec_obj)))
+
+    @mock.patch('time.sleep')
+    def test_filter_all_yields_between_batches(self, mock_sleep):
+        self.flags(host_filter_batch_size=2, group='filter_scheduler')
+
+        class OddFilter(filters.BaseHostFilter):
+            def host_passes(self, host_state, spec_obj):
+                return host_state.host in ('host1', 'host3', 'host5')
+
+        hosts = [fakes.FakeHostState('host%d' % i, 'node%d' % i, {})
+                 for i in range(1, 6)]
+        self.assertEqual([hosts[0], hosts[2], hosts[4]], list(
+            OddFilter().filter_all(hosts, objects.RequestSpec())))
+        self.assertEqual(2, mock_sleep.call_count)
@@ -22,6 +22,8 @@ import datetime
 
 import mock
 from oslo_serialization import jsonutils
+from oslo_utils import fixture as utils_fixture
+from oslo_utils import timeutils
 from oslo_utils import versionutils
 import six
 
@@ -1048,6 +1050,81 @@ class HostManagerTestCase(test.NoDBTestCase):
                                         mock.sentinel.c1n2]}, cns)
         self.assertEqual(['a', 'b'], sorted(srv.keys()))
 
+    @mock.patch('nova.objects.ComputeNodeList.get_all_changed_since')
+    @mock.patch('nova.objects.ComputeNodeList.get_all')
+    @mock.patch('nova.objects.ServiceList.get_by_binary')
+    @mock.patch('nova.context.scatter_gather_cells')
+    def test_get_computes_for_cells_cached(self, mock_sg, mock_sl, mock_cn,
+                                           mock_changed):
+        self.flags(host_state_resync_interval=60, group='filter_scheduler')
+        cells = [objects.CellMapping(uuid=uuids.cell1)]
+
+        def fake_scatter_gather(context, cells, timeout, fn):
+            return {cell.uuid: fn(mock.sentinel.cctxt) for cell in cells}
+
+        mock_sg.side_effect = fake_scatter_gather
+        mock_sl.return_value = [objects.Service(host='foo')]
+        cn1 = objects.ComputeNode(uuid=uuids.cn1, host='foo', deleted=False)
+        cn2 = objects.ComputeNode(uuid=uuids.cn2, host='foo', deleted=False)
+        mock_cn.return_value = [cn1, cn2]
+        context = nova_context.RequestContext('fake', 'fake')
+        start = timeutils.utcnow()
+        time_fixture = self.useFixture(utils_fixture.TimeFixture(start))
+
+        # The first call loads all the compute nodes.
+        cns, srv = self.host_manager._get_computes_for_cells(context, cells)
+        self.assertEqual({uuids.cell1: [cn1, cn2]},
+                         {cell: sorted(computes, key=lambda cn: cn.uuid)
+                          for cell, computes in cns.items()})
+        self.assertEqual(['foo'], list(srv.keys()))
+        mock_cn.assert_called_once_with(mock.sentinel.cctxt)
+        mock_changed.assert_not_called()
+
+        # The following ones only read the changes since the last call.
+        time_fixture.advance_time_seconds(10)
+        cn1_updated = objects.ComputeNode(uuid=uuids.cn1, host='foo',
+                                          deleted=False, vcpus_used=1)
+        cn2_deleted = objects.ComputeNode(uuid=uuids.cn2, host='foo',
+                                          deleted=True)
+        mock_changed.return_value = [cn1_updated, cn2_deleted]
+        cns, srv = self.host_manager._get_computes_for_cells(
+            context, cells, compute_uuids=[uuids.cn1, uuids.cn2])
+        self.assertEqual({uuids.cell1: [cn1_updated]}, cns)
+        mock_changed.assert_called_once_with(
+            mock.sentinel.cctxt, start - datetime.timedelta(seconds=1))
+        self.assertEqual(1, mock_cn.call_count)
+
+        # Everything is reloaded once the resync interval has passed.
+        time_fixture.advance_time_seconds(60)
+        mock_cn.return_value = [cn1]
+        cns, srv = self.host_manager._get_computes_for_cells(context, cells)
+        self.assertEqual({uuids.cell1: [cn1]}, cns)
+        self.assertEqual(2, mock_cn.call_count)
+        self.assertEqual(1, mock_changed.call_count)
+
+    @mock.patch('nova.objects.ComputeNodeList.get_all_changed_since')
+    @mock.patch('nova.objects.ComputeNodeList.get_all')
+    @mock.patch('nova.objects.ServiceList.get_by_binary')
+    @mock.patch('nova.context.scatter_gather_cells')
+    def test_get_computes_for_cells_cached_new_cell(self, mock_sg, mock_sl,
+                                                    mock_cn, mock_changed):
+        # A cell which was never loaded forces a full reload.
+        self.flags(host_state_resync_interval=60, group='filter_scheduler')
+        cells = [objects.CellMapping(uuid=uuids.cell1),
+                 objects.CellMapping(uuid=uuids.cell2)]
+
+        def fake_scatter_gather(context, cells, timeout, fn):
+            return {cell.uuid: fn(mock.sentinel.cctxt) for cell in cells}
+
+        mock_sg.side_effect = fake_scatter_gather
+        mock_sl.return_value = []
+        mock_cn.return_value = []
+        context = nova_context.RequestContext('fake', 'fake')
+        self.host_manager._get_computes_for_cells(context, cells[:1])
+        self.host_manager._get_computes_for_cells(context, cells)
+        self.assertEqual(3, mock_cn.call_count)
+        mock_changed.assert_not_called()
+
 
 class HostManagerChangedNodesTestCase(test.NoDBTestCase):
     """Test case for HostManager class."""
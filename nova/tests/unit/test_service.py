@@ -18,9 +18,11 @@
 Unit Tests for remote procedure calls using queue
 """
 
+import eventlet
 import mock
 from oslo_concurrency import processutils
 from oslo_config import cfg
+from oslo_service import periodic_task
 from oslo_service import service as _service
 import testtools
 
@@ -51,6 +53,20 @@ class FakeManager(manager.Manager):
         return 'manager'
 
 
+class FakePeriodicManager(manager.Manager):
+    """Fake manager with a periodic task for tests."""
+    def __init__(self, *args, **kwargs):
+        super(FakePeriodicManager, self).__init__(*args, **kwargs)
+        self.event = None
+        self.calls = 0
+
+    @periodic_task.periodic_task(spacing=10, run_immediately=True)
+    def _fake_task(self, context):
+        self.calls += 1
+        if self.event:
+            self.event.wait()
+
+
 class ExtendedService(service.Service):
     def test_method(self):
         return 'service'
@@ -83,6 +99,97 @@ class ServiceManagerTestCase(test.NoDBTestCase):
         self.assertEqual(25, CONF.service_down_time)
 
 
+class ManagerPeriodicTasksTestCase(test.NoDBTestCase):
+    """Test cases for the periodic tasks of managers."""
+
+    def setUp(self):
+        super(ManagerPeriodicTasksTestCase, self).setUp()
+        self.manager = FakePeriodicManager()
+
+    def _run_periodic_tasks(self):
+        # make the task due again
+        self.manager._periodic_last_run['_fake_task'] = None
+        self.manager.periodic_tasks(mock.sentinel.context)
+
+    def test_periodic_task_inline(self):
+        self._run_periodic_tasks()
+
+        self.assertEqual(1, self.manager.calls)
+        stats = self.manager.periodic_task_stats['_fake_task']
+        self.assertEqual(1, stats['runs'])
+        self.assertEqual(0, stats['skips'])
+        self.assertEqual(0, stats['overruns'])
+        self.assertIsNotNone(stats['last_duration'])
+
+    def test_periodic_task_in_pool_skipped_while_running(self):
+        self.manager._init_periodic_task_pool(2)
+        self.manager.event = eventlet.event.Event()
+
+        self._run_periodic_tasks()
+        eventlet.sleep(0)
+        # the previous run is still in progress
+        self._run_periodic_tasks()
+        self.manager.event.send()
+        self.manager._periodic_task_pool.waitall()
+
+        self.assertEqual(1, self.manager.calls)
+        stats = self.manager.periodic_task_stats['_fake_task']
+        self.assertEqual(1, stats['runs'])
+        self.assertEqual(1, stats['skips'])
+
+        self._run_periodic_tasks()
+        self.manager._periodic_task_pool.waitall()
+        self.assertEqual(2, self.manager.calls)
+
+    @mock.patch('nova.manager.LOG.exception')
+    def test_periodic_task_in_pool_error(self, mock_log):
+        self.manager._init_periodic_task_pool(2)
+
+        self.manager.event = mock.Mock()
+        self.manager.event.wait.side_effect = test.TestingException
+        self._run_periodic_tasks()
+        self.manager._periodic_task_pool.waitall()
+
+        mock_log.assert_called_once_with(
+            'Error during periodic task %s', '_fake_task')
+        self.assertEqual(
+            1, self.manager.periodic_task_stats['_fake_task']['runs'])
+        # the task can run again
+        self.assertEqual(set(), self.manager._periodic_tasks_running)
+
+    def test_added_periodic_task(self):
+        # Use a subclass, as oslo.service also adds the task to the class.
+        class AddedTaskManager(FakePeriodicManager):
+            pass
+
+        calls = []
+
+        @periodic_task.periodic_task(spacing=10, run_immediately=True)
+        def _added_task(manager, context):
+            calls.append((manager, context))
+
+        self.manager = AddedTaskManager()
+        self.manager.add_periodic_task(_added_task)
+        self.manager._periodic_last_run['_added_task'] = None
+        self._run_periodic_tasks()
+
+        self.assertEqual([(self.manager, mock.sentinel.context)], calls)
+        self.assertEqual(
+            1, self.manager.periodic_task_stats['_added_task']['runs'])
+
+    def test_report_periodic_task_overrun(self):
+        self.manager._report_periodic_task('_fake_task', duration=12,
+                                           spacing=10)
+        self.manager._report_periodic_task('_fake_task', duration=2,
+                                           spacing=10)
+
+        stats = self.manager.periodic_task_stats['_fake_task']
+        self.assertEqual(2, stats['runs'])
+        self.assertEqual(1, stats['overruns'])
+        self.assertEqual(2, stats['last_duration'])
+        self.assertEqual(14, stats['total_duration'])
+
+
 class ServiceTestCase(test.NoDBTestCase):
     """Test cases for Services."""
 
@@ -72,3 +72,24 @@ class TestWeigher(test.NoDBTestCase):
         self.assertEqual(1, len(weighed_host))
         self.assertEqual('host1', weighed_host[0].obj.host)
         self.assertFalse(mock_weigh.called)
+
+    def test_limit(self):
+        class FakeWeigher(weights.BaseWeigher):
+            def _weigh_object(self, obj, weight_properties):
+                return obj
+
+        weight_handler = scheduler_weights.HostWeightHandler()
+        objs = [3, 1, 5, 2, 5, 4]
+        weighed_objs = weight_handler.get_weighed_objects(
+            [FakeWeigher()], objs, {}, limit=3)
+        # The best objects come first, sorted, then the others in their
+        # original order.
+        self.assertEqual([5, 5, 4, 3, 1, 2],
+                         [w.obj for w in weighed_objs])
+        self.assertEqual([1.0, 1.0, 0.75],
+                         [w.weight for w in weighed_objs[:3]])
+
+        weighed_objs = weight_handler.get_weighed_objects(
+            [FakeWeigher()], objs, {}, limit=10)
+        self.assertEqual([5, 5, 4, 3, 2, 1],
+                         [w.obj for w in weighed_objs])
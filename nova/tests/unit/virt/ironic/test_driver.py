@@ -15,6 +15,8 @@
 
 """Tests for the ironic driver."""
 
+import time
+
 from ironicclient import exc as ironic_exception
 import mock
 from oslo_config import cfg
@@ -555,6 +557,24 @@ class IronicDriverTestCase(test.NoDBTestCase):
         expected = [n.instance_uuid for n in nodes]
         self.assertEqual(sorted(expected), sorted(uuids))
 
+    @mock.patch.object(cw.IronicClientWrapper, 'call')
+    def test_get_power_states(self, mock_call):
+        nodes = [ironic_utils.get_test_node(
+                     instance_uuid=uuidutils.generate_uuid(),
+                     power_state=ironic_states.POWER_ON),
+                 ironic_utils.get_test_node(
+                     instance_uuid=uuidutils.generate_uuid(),
+                     power_state=ironic_states.POWER_OFF)]
+        mock_call.return_value = nodes
+
+        power_states = self.driver.get_power_states()
+        mock_call.assert_called_once_with(
+            'node.list', associated=True, limit=0,
+            fields=('instance_uuid', 'power_state'))
+        self.assertEqual({nodes[0].instance_uuid: nova_states.RUNNING,
+                          nodes[1].instance_uuid: nova_states.SHUTDOWN},
+                         power_states)
+
     @mock.patch.object(FAKE_CLIENT.node, 'list')
     @mock.patch.object(FAKE_CLIENT.node, 'get')
     @mock.patch.object(objects.InstanceList, 'get_uuids_by_host')
@@ -3123,6 +3143,81 @@ class NodeCacheTestCase(test.NoDBTestCase):
         expected_cache = {n.uuid: n for n in nodes[1:]}
         self.assertEqual(expected_cache, self.driver.node_cache)
 
+    @mock.patch.object(ironic_driver.IronicDriver, '_refresh_hash_ring')
+    @mock.patch.object(hash_ring.HashRing, 'get_nodes')
+    @mock.patch.object(ironic_driver.IronicDriver, '_get_node')
+    @mock.patch.object(ironic_driver.IronicDriver, '_get_node_list')
+    @mock.patch.object(objects.InstanceList, 'get_uuids_by_host')
+    def _test__refresh_cache_incremental(self, changed, mock_instances,
+                                         mock_nodes, mock_get_node,
+                                         mock_hosts, mock_hash_ring):
+        self.flags(incremental_node_cache_refresh=True, group='ironic')
+        mock_instances.return_value = []
+        mock_hosts.return_value = {self.host}
+        cached = [_get_cached_node(uuid=uuidutils.generate_uuid(),
+                                   updated_at='2018-06-01T00:00:00')
+                  for i in range(20)]
+        self.driver.node_cache = {n.uuid: n for n in cached}
+        listed = [
+            ironic_utils.get_test_node(
+                fields=ironic_driver._NODE_CHANGE_FIELDS, uuid=n.uuid,
+                updated_at=('2018-06-02T00:00:00' if i < changed else
+                            n.updated_at))
+            for i, n in enumerate(cached)]
+        fetched = [_get_cached_node(uuid=n.uuid,
+                                    updated_at='2018-06-02T00:00:00')
+                   for n in cached[:changed]]
+        mock_nodes.side_effect = [listed, fetched + cached[changed:]]
+        mock_get_node.side_effect = fetched
+
+        self.driver._refresh_cache()
+
+        expected_cache = {n.uuid: n for n in fetched + cached[changed:]}
+        self.assertEqual(expected_cache, self.driver.node_cache)
+        return mock_nodes, mock_get_node
+
+    def test__refresh_cache_incremental(self):
+        mock_nodes, mock_get_node = self._test__refresh_cache_incremental(2)
+
+        # Only the changed nodes are fetched
+        mock_nodes.assert_called_once_with(
+            fields=ironic_driver._NODE_CHANGE_FIELDS, limit=0)
+        self.assertEqual(2, mock_get_node.call_count)
+
+    def test__refresh_cache_incremental_many_changed(self):
+        mock_nodes, mock_get_node = self._test__refresh_cache_incremental(3)
+
+        # Too many nodes changed, so all the nodes are listed
+        mock_nodes.assert_has_calls([
+            mock.call(fields=ironic_driver._NODE_CHANGE_FIELDS, limit=0),
+            mock.call(fields=ironic_driver._NODE_FIELDS, limit=0)])
+        mock_get_node.assert_not_called()
+
+    @mock.patch.object(ironic_driver.IronicDriver,
+                       '_validate_instance_and_node')
+    def test_get_info_from_cache(self, mock_validate):
+        self.flags(node_cache_max_age=60, group='ironic')
+        instance_uuid = uuidutils.generate_uuid()
+        node = _get_cached_node(uuid=uuidutils.generate_uuid(),
+                                instance_uuid=instance_uuid,
+                                power_state=ironic_states.POWER_ON)
+        self.driver._node_cache_by_instance = {instance_uuid: node}
+        self.driver.node_cache_time = time.time()
+        instance = fake_instance.fake_instance_obj(self.ctx,
+                                                   uuid=instance_uuid)
+
+        result = self.driver.get_info(instance)
+
+        self.assertEqual(hardware.InstanceInfo(state=nova_states.RUNNING),
+                         result)
+        mock_validate.assert_not_called()
+
+        # A stale cache is not used
+        self.driver.node_cache_time = time.time() - 61
+        mock_validate.return_value = node
+        self.driver.get_info(instance)
+        mock_validate.assert_called_once_with(instance)
+
 
 @mock.patch.object(FAKE_CLIENT, 'node')
 class IronicDriverConsoleTestCase(test.NoDBTestCase):
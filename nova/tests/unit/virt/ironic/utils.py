@@ -49,8 +49,8 @@ def get_test_node(fields=None, **kw):
             'resource_class': kw.get('resource_class'),
             'traits': kw.get('traits', []),
             'extra': kw.get('extra', {}),
-            'updated_at': kw.get('created_at'),
-            'created_at': kw.get('updated_at')}
+            'updated_at': kw.get('updated_at'),
+            'created_at': kw.get('created_at')}
     if fields is not None:
         node = {key: value for key, value in node.items() if key in fields}
     return type('node', (object,), node)()
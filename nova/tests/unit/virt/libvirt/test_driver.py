@@ -7155,6 +7155,25 @@ class LibvirtConnTestCase(test.NoDBTestCase,
         self.assertEqual(uuids[3], vm4.UUIDString())
         mock_list.assert_called_with(only_guests=True, only_running=False)
 
+    @mock.patch.object(host.Host, 'list_guests')
+    def test_get_power_states(self, mock_list):
+        running = mock.Mock(uuid=uuids.running)
+        running.get_power_state.return_value = power_state.RUNNING
+        undefined = mock.Mock(uuid=uuids.undefined)
+        undefined.get_power_state.side_effect = exception.InstanceNotFound(
+            instance_id=uuids.undefined)
+        broken = mock.Mock(uuid=uuids.broken)
+        broken.get_power_state.side_effect = exception.InternalError(
+            err='broken')
+        mock_list.return_value = [running, undefined, broken]
+
+        drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        # The guests which failed are left out of the power states.
+        self.assertEqual({uuids.running: power_state.RUNNING},
+                         drvr.get_power_states())
+        mock_list.assert_called_once_with(only_running=False)
+        broken.get_power_state.assert_called_once_with(drvr._host)
+
     @mock.patch('nova.virt.libvirt.host.Host.get_online_cpus',
                 return_value=None)
     @mock.patch('nova.virt.libvirt.host.Host.get_cpu_count',
@@ -2782,6 +2782,78 @@ class CPUPinningTestCase(test.NoDBTestCase, _CPUPinningTestCaseBase):
         inst_topo = hw.numa_fit_instance_to_host(host_topo, inst_topo)
         self.assertIsNone(inst_topo)
 
+    def test_host_numa_fit_instance_to_host_skip_same_unfit_cells(self):
+        host_topo = objects.NUMATopology(
+                cells=[objects.NUMACell(id=0, cpuset=set([0, 1]),
+                                        memory=2048, memory_usage=0,
+                                        mempages=[],
+                                        siblings=[set([0]), set([1])],
+                                        pinned_cpus=set([0, 1])),
+                       objects.NUMACell(id=1, cpuset=set([2, 3]),
+                                        memory=2048, memory_usage=0,
+                                        mempages=[],
+                                        siblings=[set([2]), set([3])],
+                                        pinned_cpus=set([2, 3])),
+                       objects.NUMACell(id=2, cpuset=set([4, 5]),
+                                        memory=2048, memory_usage=0,
+                                        mempages=[],
+                                        siblings=[set([4]), set([5])],
+                                        pinned_cpus=set([])),
+                       objects.NUMACell(id=3, cpuset=set([6, 7]),
+                                        memory=2048, memory_usage=0,
+                                        mempages=[],
+                                        siblings=[set([6]), set([7])],
+                                        pinned_cpus=set([]))])
+        inst_topo = objects.InstanceNUMATopology(
+                cells=[objects.InstanceNUMACell(
+                            cpuset=set([0, 1]), memory=1024,
+                            cpu_policy=fields.CPUAllocationPolicy.DEDICATED),
+                       objects.InstanceNUMACell(
+                            cpuset=set([2, 3]), memory=1024,
+                            cpu_policy=fields.CPUAllocationPolicy.DEDICATED)])
+
+        with mock.patch.object(hw, '_numa_fit_instance_cell',
+                               wraps=hw._numa_fit_instance_cell) as mock_fit:
+            inst_topo = hw.numa_fit_instance_to_host(host_topo, inst_topo)
+
+        self.assertInstanceCellPinned(inst_topo.cells[0], cell_ids=(2,))
+        self.assertInstanceCellPinned(inst_topo.cells[1], cell_ids=(3,))
+        # Host cell 1 is never tried as it is in the same state as host cell
+        # 0, onto which neither of the instance cells fit, and host cell 2 is
+        # only tried once for the first instance cell.
+        self.assertEqual(4, mock_fit.call_count)
+
+    def test_host_numa_fit_instance_to_host_permutations_order(self):
+        host_topo = objects.NUMATopology(
+                cells=[objects.NUMACell(id=0, cpuset=set([0, 1]),
+                                        memory=2048, memory_usage=0,
+                                        mempages=[], siblings=[],
+                                        pinned_cpus=set([])),
+                       objects.NUMACell(id=1, cpuset=set([2, 3]),
+                                        memory=1024, memory_usage=0,
+                                        mempages=[], siblings=[],
+                                        pinned_cpus=set([])),
+                       objects.NUMACell(id=2, cpuset=set([4, 5]),
+                                        memory=2048, memory_usage=0,
+                                        mempages=[], siblings=[],
+                                        pinned_cpus=set([]))])
+        inst_topo = objects.InstanceNUMATopology(
+                cells=[objects.InstanceNUMACell(
+                            id=0, cpuset=set([0]), memory=2048),
+                       objects.InstanceNUMACell(
+                            id=1, cpuset=set([1]), memory=2048)])
+        pci_stats = mock.Mock()
+        pci_stats.support_requests.side_effect = [False, True]
+
+        inst_topo = hw.numa_fit_instance_to_host(
+            host_topo, inst_topo, pci_requests=mock.sentinel.pci_requests,
+            pci_stats=pci_stats)
+
+        # The first placement found, onto host cells 0 and 2, is refused by
+        # the PCI requests so the next permutation is used.
+        self.assertEqual([2, 0], [cell.id for cell in inst_topo.cells])
+        self.assertEqual(2, pci_stats.support_requests.call_count)
+
     def test_cpu_pinning_usage_from_instances(self):
         host_pin = objects.NUMATopology(
                 cells=[objects.NUMACell(id=0, cpuset=set([0, 1, 2, 3]),
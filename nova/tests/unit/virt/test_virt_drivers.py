@@ -523,6 +523,12 @@ class _VirtDriverTestCase(_FakeDriverBackendTestCase):
         info = self.connection.get_info(instance_ref)
         self.assertIsInstance(info, hardware.InstanceInfo)
 
+    @catch_notimplementederror
+    def test_get_power_states(self):
+        instance_ref, network_info = self._get_running_instance()
+        power_states = self.connection.get_power_states()
+        self.assertIn(instance_ref['uuid'], power_states)
+
     @catch_notimplementederror
     def test_get_info_for_unknown_instance(self):
         fake_instance = test_utils.get_test_instance(obj=True)
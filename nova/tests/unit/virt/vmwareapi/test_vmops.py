@@ -238,6 +238,55 @@ class VMwareVMOpsTestCase(test.NoDBTestCase):
         vms = ops._get_valid_vms_from_retrieve_result(fake_objects)
         self.assertEqual(1, len(vms))
 
+    def test_get_valid_vms_from_retrieve_result_without_uuid(self):
+        ops = vmops.VMwareVMOps(self._session, mock.Mock(), mock.Mock())
+        fake_objects = vmwareapi_fake.FakeRetrieveResult()
+        vm_uuid = uuidutils.generate_uuid()
+        valid_vm = vmwareapi_fake.VirtualMachine()
+        valid_vm.set('config.extraConfig["nvp.vm-uuid"]',
+                     vmwareapi_fake.OptionValue(value=vm_uuid))
+        fake_objects.add_object(valid_vm)
+        # VMs with an empty or without nvp.vm-uuid are ignored.
+        empty_uuid_vm = vmwareapi_fake.VirtualMachine()
+        empty_uuid_vm.set('config.extraConfig["nvp.vm-uuid"]',
+                          vmwareapi_fake.OptionValue(value=''))
+        fake_objects.add_object(empty_uuid_vm)
+        no_uuid_vm = vmwareapi_fake.VirtualMachine()
+        no_uuid_vm.delete('config.extraConfig["nvp.vm-uuid"]')
+        fake_objects.add_object(no_uuid_vm)
+        vms = ops._get_valid_vms_from_retrieve_result(fake_objects)
+        self.assertEqual([vm_uuid], vms)
+
+    def test_get_power_states(self):
+        ops = vmops.VMwareVMOps(self._session, mock.Mock(), mock.Mock())
+        ops._root_resource_pool = mock.sentinel.res_pool
+        fake_objects = vmwareapi_fake.FakeRetrieveResult()
+        expected = {}
+        for powerstate in ('poweredOn', 'poweredOff'):
+            vm_uuid = uuidutils.generate_uuid()
+            vm = vmwareapi_fake.VirtualMachine(powerstate=powerstate)
+            vm.set('config.extraConfig["nvp.vm-uuid"]',
+                   vmwareapi_fake.OptionValue(value=vm_uuid))
+            fake_objects.add_object(vm)
+            expected[vm_uuid] = constants.POWER_STATES[powerstate]
+        # VMs without a known power state are left out.
+        for powerstate in (None, 'unknown'):
+            vm = vmwareapi_fake.VirtualMachine(powerstate=powerstate)
+            if powerstate is None:
+                vm.delete('runtime.powerState')
+            vm.set('config.extraConfig["nvp.vm-uuid"]',
+                   vmwareapi_fake.OptionValue(
+                       value=uuidutils.generate_uuid()))
+            fake_objects.add_object(vm)
+        with mock.patch.object(self._session, '_call_method',
+                               side_effect=[fake_objects, None]) as mock_call:
+            self.assertEqual(expected, ops.get_power_states())
+            mock_call.assert_any_call(
+                vim_util, 'get_inner_objects', mock.sentinel.res_pool, 'vm',
+                'VirtualMachine', ['runtime.connectionState',
+                                   'runtime.powerState',
+                                   'config.extraConfig["nvp.vm-uuid"]'])
+
     def test_delete_vm_snapshot(self):
         def fake_call_method(module, method, *args, **kwargs):
             self.assertEqual('RemoveSnapshot_Task', method)
@@ -167,6 +167,19 @@ class ComputeDriver(object):
         # TODO(Vek): Need to pass context in for access to auth_token
         raise NotImplementedError()
 
+    def get_power_states(self):
+        """Get the current power state of all the instances on the host.
+
+        This is an optional, more efficient alternative to calling get_info
+        for every instance, used by the power state sync periodic task.
+        Drivers which can retrieve the power state of all their instances
+        with a single query of the hypervisor should implement it.
+
+        :returns: A dict of nova.compute.power_state values, keyed by the
+                  UUIDs of the instances known to the virtualization layer.
+        """
+        raise NotImplementedError()
+
     def get_num_instances(self):
         """Return the total number of virtual machines.
 
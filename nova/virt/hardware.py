@@ -1582,37 +1582,52 @@ def numa_fit_instance_to_host(
         host_cells = sorted(host_cells, key=lambda cell: cell.id in [
             pool['numa_node'] for pool in pci_stats.pools])
 
-    # TODO(ndipanov): We may want to sort permutations differently
-    # depending on whether we want packing/spreading over NUMA nodes
-    for host_cell_perm in itertools.permutations(
-            host_cells, len(instance_topology)):
-        cells = []
-        for host_cell, instance_cell in zip(
-                host_cell_perm, instance_topology.cells):
+    # Whether an instance cell fits onto a host cell does not depend on where
+    # the other instance cells are placed, so the host cells an instance cell
+    # did not fit onto are recorded, along with the host cells in the same
+    # state, and skipped for all of the other permutations. The page size of
+    # the instance cell is part of the key as fitting it sets the page size
+    # to the one selected on the host cell.
+    cell_keys = [_numa_cell_fit_key(host_cell) for host_cell in host_cells]
+    unfit = set()
+
+    def _fit_cells(used, cells):
+        # Yields the successful placements of the instance cells onto
+        # distinct host cells, in the order of itertools.permutations()
+        index = len(cells)
+        if index == len(instance_topology):
+            yield cells
+            return
+        instance_cell = instance_topology.cells[index]
+        for i, host_cell in enumerate(host_cells):
+            unfit_key = (index, instance_cell.pagesize, cell_keys[i])
+            if i in used or unfit_key in unfit:
+                continue
+            cpuset_reserved = 0
+            if instance_topology.emulator_threads_isolated and index == 0:
+                # For the case of isolate emulator threads, to
+                # make predictable where that CPU overhead is
+                # located we always configure it to be on host
+                # NUMA node associated to the guest NUMA node
+                # 0.
+                cpuset_reserved = 1
             try:
-                cpuset_reserved = 0
-                if (instance_topology.emulator_threads_isolated
-                    and len(cells) == 0):
-                    # For the case of isolate emulator threads, to
-                    # make predictable where that CPU overhead is
-                    # located we always configure it to be on host
-                    # NUMA node associated to the guest NUMA node
-                    # 0.
-                    cpuset_reserved = 1
                 got_cell = _numa_fit_instance_cell(
                     host_cell, instance_cell, limits, cpuset_reserved)
             except exception.MemoryPageSizeNotSupported:
                 # This exception will been raised if instance cell's
                 # custom pagesize is not supported with host cell in
                 # _numa_cell_supports_pagesize_request function.
-                break
+                got_cell = None
             if got_cell is None:
-                break
-            cells.append(got_cell)
-
-        if len(cells) != len(host_cell_perm):
-            continue
+                unfit.add(unfit_key)
+                continue
+            for fitted_cells in _fit_cells(used | {i}, cells + [got_cell]):
+                yield fitted_cells
 
+    # TODO(ndipanov): We may want to sort permutations differently
+    # depending on whether we want packing/spreading over NUMA nodes
+    for cells in _fit_cells(frozenset(), []):
         if not pci_requests or ((pci_stats is not None) and
                 pci_stats.support_requests(pci_requests, cells)):
             return objects.InstanceNUMATopology(
@@ -1620,6 +1635,26 @@ def numa_fit_instance_to_host(
                 emulator_threads_policy=emulator_threads_policy)
 
 
+def _numa_cell_fit_key(host_cell):
+    """Returns a key identifying the state of a host cell which matters when
+    fitting an instance cell onto it.
+
+    Two host cells with the same key accept the same instance cells, even if
+    the IDs of their CPUs differ.
+    """
+    if not all(host_cell.obj_attr_is_set(attr)
+               for attr in ('pinned_cpus', 'siblings', 'mempages')):
+        # The state of this host cell is not fully known, so it is only
+        # identified by itself.
+        return id(host_cell)
+    return (host_cell.memory, host_cell.memory_usage, host_cell.cpu_usage,
+            len(host_cell.cpuset), host_cell.avail_cpus,
+            tuple(sorted(len(sib) for sib in host_cell.siblings)),
+            tuple(sorted(len(sib) for sib in host_cell.free_siblings)),
+            tuple((page.size_kb, page.total, page.used, page.reserved)
+                  for page in host_cell.mempages))
+
+
 def numa_get_reserved_huge_pages():
     """Returns reserved memory pages from host option.
 
@@ -77,7 +77,15 @@ _UNPROVISION_STATES = (ironic_states.ACTIVE, ironic_states.DEPLOYFAIL,
 
 _NODE_FIELDS = ('uuid', 'power_state', 'target_power_state', 'provision_state',
                 'target_provision_state', 'last_error', 'maintenance',
-                'properties', 'instance_uuid', 'traits', 'resource_class')
+                'properties', 'instance_uuid', 'traits', 'resource_class',
+                'updated_at')
+
+# Fields listed to find out which nodes changed since the last cache refresh
+_NODE_CHANGE_FIELDS = ('uuid', 'instance_uuid', 'updated_at')
+
+# Beyond this share of changed nodes, the node cache is refreshed by listing
+# the details of all nodes rather than fetching the changed nodes one by one
+_NODE_CACHE_MAX_CHANGED_RATIO = 0.1
 
 # Console state checking interval in seconds
 _CONSOLE_STATE_CHECKING_INTERVAL = 1
@@ -163,6 +171,8 @@ class IronicDriver(virt_driver.ComputeDriver):
             default='nova.virt.firewall.NoopFirewallDriver')
         self.node_cache = {}
         self.node_cache_time = 0
+        # The nodes of the cache having an instance, keyed by instance UUID
+        self._node_cache_by_instance = {}
         self.servicegroup_api = servicegroup.API()
 
         self.ironicclient = client_wrapper.IronicClientWrapper()
@@ -187,6 +197,9 @@ class IronicDriver(virt_driver.ComputeDriver):
         Check with the Ironic service that this instance is associated with a
         node, and return the node.
         """
+        # The node is about to be acted upon, so stop serving it from the
+        # cache until the next refresh.
+        self._node_cache_by_instance.pop(instance.uuid, None)
         try:
             return self.ironicclient.call('node.get_by_instance_uuid',
                                           instance.uuid, fields=_NODE_FIELDS)
@@ -616,6 +629,21 @@ class IronicDriver(virt_driver.ComputeDriver):
         return list(n.instance_uuid
                     for n in self._get_node_list(associated=True, limit=0))
 
+    def get_power_states(self):
+        """Return the power state of all the instances provisioned.
+
+        The states are retrieved from a single listing of the associated
+        nodes, rather than by looking up the node of each instance.
+
+        :returns: a dict of power states, keyed by instance UUID.
+        :raises: VirtDriverNotReady
+
+        """
+        nodes = self._get_node_list(associated=True, limit=0,
+                                    fields=('instance_uuid', 'power_state'))
+        return {n.instance_uuid: map_power_state(n.power_state)
+                for n in nodes}
+
     def node_is_available(self, nodename):
         """Confirms a Nova hypervisor node exists in the Ironic inventory.
 
@@ -664,32 +692,89 @@ class IronicDriver(virt_driver.ComputeDriver):
         self.hash_ring = hash_ring.HashRing(services,
                                             partitions=_HASH_RING_PARTITIONS)
 
-    def _refresh_cache(self):
+    def _is_managed_node(self, node, instances):
+        """Return True if the node is managed by this compute service.
+
+        :param node: The node, which must have the uuid and instance_uuid
+                     fields.
+        :param instances: The UUIDs of the instances on this compute service.
+        """
+        # NOTE(jroll): we always manage the nodes for instances we manage
+        if node.instance_uuid in instances:
+            return True
+
+        # NOTE(jroll): check if the node matches us in the hash ring, and
+        # does not have an instance_uuid (which would imply the node has
+        # an instance managed by another compute service).
+        # Note that this means nodes with an instance that was deleted in
+        # nova while the service was down, and not yet reaped, will not be
+        # reported until the periodic task cleans it up.
+        return (node.instance_uuid is None and
+                CONF.host in
+                self.hash_ring.get_nodes(node.uuid.encode('utf-8')))
+
+    def _get_managed_nodes(self, instances):
+        """Return a dict, keyed by UUID, of the nodes managed by this compute
+        service, listing the details of all nodes.
+        """
         # NOTE(lucasagomes): limit == 0 is an indicator to continue
         # pagination until there're no more values to be returned.
+        return {node.uuid: node
+                for node in self._get_node_list(fields=_NODE_FIELDS, limit=0)
+                if self._is_managed_node(node, instances)}
+
+    def _get_changed_managed_nodes(self, instances):
+        """Return a dict, keyed by UUID, of the nodes managed by this compute
+        service, only fetching the details of the nodes which changed since
+        they were cached.
+
+        The hash ring and instance filtering is done on a listing of the
+        minimal fields of the nodes, so nodes managed by other compute
+        services are never fetched.
+        """
+        node_cache = {}
+        changed = []
+        for node in self._get_node_list(fields=_NODE_CHANGE_FIELDS, limit=0):
+            if not self._is_managed_node(node, instances):
+                continue
+            cached = self.node_cache.get(node.uuid)
+            if (cached is not None and
+                    getattr(cached, 'updated_at', None) == node.updated_at and
+                    cached.instance_uuid == node.instance_uuid):
+                node_cache[node.uuid] = cached
+            else:
+                changed.append(node.uuid)
+
+        total = len(node_cache) + len(changed)
+        if len(changed) > total * _NODE_CACHE_MAX_CHANGED_RATIO:
+            LOG.debug("%(changed)s of %(total)s node(s) changed, listing the "
+                      "details of all nodes",
+                      {'changed': len(changed), 'total': total})
+            return self._get_managed_nodes(instances)
+
+        for node_uuid in changed:
+            try:
+                node_cache[node_uuid] = self._get_node(node_uuid)
+            except ironic.exc.NotFound:
+                # The node was deleted since it was listed
+                pass
+        return node_cache
+
+    def _refresh_cache(self):
         ctxt = nova_context.get_admin_context()
         self._refresh_hash_ring(ctxt)
         instances = objects.InstanceList.get_uuids_by_host(ctxt, CONF.host)
-        node_cache = {}
 
-        for node in self._get_node_list(fields=_NODE_FIELDS, limit=0):
-            # NOTE(jroll): we always manage the nodes for instances we manage
-            if node.instance_uuid in instances:
-                node_cache[node.uuid] = node
-
-            # NOTE(jroll): check if the node matches us in the hash ring, and
-            # does not have an instance_uuid (which would imply the node has
-            # an instance managed by another compute service).
-            # Note that this means nodes with an instance that was deleted in
-            # nova while the service was down, and not yet reaped, will not be
-            # reported until the periodic task cleans it up.
-            elif (node.instance_uuid is None and
-                  CONF.host in
-                  self.hash_ring.get_nodes(node.uuid.encode('utf-8'))):
-                node_cache[node.uuid] = node
+        if CONF.ironic.incremental_node_cache_refresh and self.node_cache:
+            node_cache = self._get_changed_managed_nodes(instances)
+        else:
+            node_cache = self._get_managed_nodes(instances)
 
         self.node_cache = node_cache
         self.node_cache_time = time.time()
+        self._node_cache_by_instance = {
+            node.instance_uuid: node for node in node_cache.values()
+            if node.instance_uuid}
         # For Pike, we need to ensure that all instances have their flavor
         # migrated to include the resource_class. Since there could be many,
         # many instances controlled by this host, spawn this asynchronously so
@@ -844,6 +929,15 @@ class IronicDriver(virt_driver.ComputeDriver):
             self.node_cache[node_uuid] = node
             return node
 
+    def _instance_node_from_cache(self, instance):
+        """Returns the node of an instance from the cache, or None if the
+        cache is older than [ironic]node_cache_max_age or doesn't have it.
+        """
+        max_age = CONF.ironic.node_cache_max_age
+        if not max_age or time.time() - self.node_cache_time > max_age:
+            return None
+        return self._node_cache_by_instance.get(instance.uuid)
+
     def get_info(self, instance):
         """Get the current state and resource usage for this instance.
 
@@ -853,11 +947,13 @@ class IronicDriver(virt_driver.ComputeDriver):
         :param instance: the instance object.
         :returns: an InstanceInfo object
         """
-        try:
-            node = self._validate_instance_and_node(instance)
-        except exception.InstanceNotFound:
-            return hardware.InstanceInfo(
-                state=map_power_state(ironic_states.NOSTATE))
+        node = self._instance_node_from_cache(instance)
+        if node is None:
+            try:
+                node = self._validate_instance_and_node(instance)
+            except exception.InstanceNotFound:
+                return hardware.InstanceInfo(
+                    state=map_power_state(ironic_states.NOSTATE))
 
         properties = self._parse_node_properties(node)
         memory_kib = properties['memory_mb'] * 1024
@@ -5451,6 +5451,25 @@ class LibvirtDriver(driver.ComputeDriver):
         # workaround, see libvirt/compat.py
         return guest.get_info(self._host)
 
+    def get_power_states(self):
+        """Retrieve the power state of all the guests from a single listing
+        of the libvirt domains, instead of looking up each of them by UUID.
+        """
+        power_states = {}
+        for guest in self._host.list_guests(only_running=False):
+            try:
+                power_states[guest.uuid] = guest.get_power_state(self._host)
+            except exception.InstanceNotFound:
+                # The domain was undefined since it was listed.
+                pass
+            except exception.InternalError as e:
+                # Leave the guest out, so that its power state is queried
+                # on its own rather than failing the whole listing.
+                LOG.warning('Failed to retrieve the power state of guest '
+                            '%(uuid)s: %(error)s',
+                            {'uuid': guest.uuid, 'error': e})
+        return power_states
+
     def _create_domain_setup_lxc(self, context, instance, image_meta,
                                  block_device_info):
         inst_path = libvirt_utils.get_instance_path(instance)
@@ -521,6 +521,10 @@ class VMwareVCDriver(driver.ComputeDriver):
         """Return info about the VM instance."""
         return self._vmops.get_info(instance)
 
+    def get_power_states(self):
+        """Return the power state of all the VM instances."""
+        return self._vmops.get_power_states()
+
     def get_diagnostics(self, instance):
         """Return data about VM diagnostics."""
         return self._vmops.get_diagnostics(instance)
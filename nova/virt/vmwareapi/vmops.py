@@ -1764,27 +1764,30 @@ class VMwareVMOps(object):
 
     def _get_valid_vms_from_retrieve_result(self, retrieve_result):
         """Returns list of valid vms from RetrieveResult object."""
-        lst_vm_names = []
+        return [vm_uuid for vm_uuid, _props
+                in self._iter_valid_vms(retrieve_result)]
 
+    def _iter_valid_vms(self, retrieve_result):
+        """Yields the uuid and the properties of the valid vms of a
+        RetrieveResult object.
+        """
         while retrieve_result:
             for vm in retrieve_result.objects:
+                props = {prop.name: prop.val for prop in vm.propSet}
                 vm_uuid = None
-                conn_state = None
-                for prop in vm.propSet:
-                    if prop.name == "runtime.connectionState":
-                        conn_state = prop.val
-                    elif prop.name == 'config.extraConfig["nvp.vm-uuid"]':
-                        vm_uuid = prop.val.value
+                option_value = props.get('config.extraConfig["nvp.vm-uuid"]')
+                if option_value is not None:
+                    vm_uuid = option_value.value
                 # Ignore VM's that do not have nvp.vm-uuid defined
                 if not vm_uuid:
                     continue
                 # Ignoring the orphaned or inaccessible VMs
+                conn_state = props.get("runtime.connectionState")
                 if conn_state not in ["orphaned", "inaccessible"]:
-                    lst_vm_names.append(vm_uuid)
+                    yield vm_uuid, props
             retrieve_result = self._session._call_method(vutil,
                                                          'continue_retrieval',
                                                          retrieve_result)
-        return lst_vm_names
 
     def instance_exists(self, instance):
         try:
@@ -2019,6 +2022,27 @@ class VMwareVMOps(object):
         LOG.debug("Got total of %s instances", str(len(lst_vm_names)))
         return lst_vm_names
 
+    def get_power_states(self):
+        """Return the power state of the VM instances of the vCenter cluster,
+        as retrieved by a single property collector query.
+        """
+        properties = ['runtime.connectionState',
+                      'runtime.powerState',
+                      'config.extraConfig["nvp.vm-uuid"]']
+        vms = []
+        if self._root_resource_pool:
+            vms = self._session._call_method(
+                vim_util, 'get_inner_objects', self._root_resource_pool, 'vm',
+                'VirtualMachine', properties)
+        power_states = {}
+        for vm_uuid, props in self._iter_valid_vms(vms):
+            vm_power_state = props.get('runtime.powerState')
+            # Leave out the VMs without a known power state, so that their
+            # power state is queried on its own.
+            if vm_power_state in constants.POWER_STATES:
+                power_states[vm_uuid] = constants.POWER_STATES[vm_power_state]
+        return power_states
+
     def get_vnc_console(self, instance):
         """Return connection info for a vnc console using vCenter logic."""
 
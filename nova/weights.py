@@ -18,6 +18,7 @@ Pluggable Weighing support
 """
 
 import abc
+import heapq
 
 import six
 
@@ -121,8 +122,15 @@ class BaseWeigher(object):
 class BaseWeightHandler(loadables.BaseLoader):
     object_class = WeighedObject
 
-    def get_weighed_objects(self, weighers, obj_list, weighing_properties):
-        """Return a sorted (descending), normalized list of WeighedObjects."""
+    def get_weighed_objects(self, weighers, obj_list, weighing_properties,
+                            limit=None):
+        """Return a sorted (descending), normalized list of WeighedObjects.
+
+        If limit is set, only the limit WeighedObjects with the highest
+        weights are sorted. They are followed by the other WeighedObjects in
+        the order of obj_list, which saves sorting the whole list when only
+        its head is used.
+        """
         weighed_objs = [self.object_class(obj, 0.0) for obj in obj_list]
 
         if len(weighed_objs) <= 1:
@@ -136,8 +144,17 @@ class BaseWeightHandler(loadables.BaseLoader):
                                 minval=weigher.minval,
                                 maxval=weigher.maxval)
 
-            for i, weight in enumerate(weights):
-                obj = weighed_objs[i]
-                obj.weight += weigher.weight_multiplier() * weight
+            multiplier = weigher.weight_multiplier()
+            for obj, weight in zip(weighed_objs, weights):
+                obj.weight += multiplier * weight
+
+        if limit is None or limit >= len(weighed_objs):
+            return sorted(weighed_objs, key=lambda x: x.weight, reverse=True)
 
-        return sorted(weighed_objs, key=lambda x: x.weight, reverse=True)
+        # heapq.nlargest() is stable, like sorted(), so the objects with the
+        # same weight keep their relative order.
+        best_objs = heapq.nlargest(limit, weighed_objs,
+                                   key=lambda x: x.weight)
+        best_ids = set(id(obj) for obj in best_objs)
+        return best_objs + [obj for obj in weighed_objs
+                            if id(obj) not in best_ids]
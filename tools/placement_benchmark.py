@@ -0,0 +1,340 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""Benchmark the placement service against synthetic provider trees.
+
+The placement service is run in-process using PlacementDirect, against
+either an in-memory SQLite database (the default) or any database named by
+--connection, for example a local MySQL server. A set of compute node
+provider trees is generated, each with NUMA node and physical function
+child providers, along with sharing storage providers associated to the
+compute nodes through aggregates. The latency and number of SQL queries of
+the following operations is then recorded:
+
+* GET /allocation_candidates
+* PUT /allocations/{consumer_uuid}
+* SchedulerReportClient.update_from_provider_tree
+
+The results are written as JSON, either to stdout or to --output.
+
+Example::
+
+  python tools/placement_benchmark.py --computes 500 --iterations 50 \\
+      --output results.json
+"""
+
+from __future__ import print_function
+
+import argparse
+import collections
+import json
+import random
+import sys
+import time
+
+from oslo_utils import uuidutils
+import sqlalchemy
+
+from nova.api.openstack.placement import db_api
+from nova.api.openstack.placement import direct
+from nova.compute import provider_tree
+import nova.conf
+from nova import context as nova_context
+from nova.db.sqlalchemy import migration
+from nova.scheduler.client import report
+
+CONF = nova.conf.CONF
+
+PERCENTILES = (50, 90, 99)
+SHARING_TRAIT = 'MISC_SHARES_VIA_AGGREGATE'
+CPU_TRAITS = ('HW_CPU_X86_AVX', 'HW_CPU_X86_AVX2', 'HW_CPU_X86_SSE42')
+PHYSNET_TRAIT = 'CUSTOM_PHYSNET_%d'
+
+
+class QueryCounter(object):
+    """Count the SQL statements executed against an engine."""
+
+    def __init__(self, engine):
+        self.count = 0
+        sqlalchemy.event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args, **kwargs):
+        self.count += 1
+
+
+class Recorder(object):
+    """Collect the latency and query count samples of named operations."""
+
+    def __init__(self, counter):
+        self.counter = counter
+        self.samples = collections.OrderedDict()
+
+    def measure(self, name, func, *args, **kwargs):
+        queries = self.counter.count
+        start = time.time()
+        ret = func(*args, **kwargs)
+        elapsed = time.time() - start
+        self.samples.setdefault(name, []).append(
+            (elapsed, self.counter.count - queries))
+        return ret
+
+    def summary(self):
+        results = collections.OrderedDict()
+        for name, samples in self.samples.items():
+            latencies = [elapsed * 1000 for elapsed, _queries in samples]
+            queries = [count for _elapsed, count in samples]
+            results[name] = collections.OrderedDict([
+                ('iterations', len(samples)),
+                ('latency_ms', _stats(latencies)),
+                ('queries', _stats(queries)),
+            ])
+        return results
+
+
+def _percentile(ordered, percent):
+    """Return the nearest-rank percentile of an already sorted list."""
+    index = max(0, int(round(percent / 100.0 * len(ordered))) - 1)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def _stats(values):
+    ordered = sorted(values)
+    stats = collections.OrderedDict([
+        ('min', ordered[0]),
+        ('mean', sum(ordered) / float(len(ordered))),
+    ])
+    for percent in PERCENTILES:
+        stats['p%d' % percent] = _percentile(ordered, percent)
+    stats['max'] = ordered[-1]
+    return stats
+
+
+def _call(adapter, method, url, body=None):
+    kwargs = {}
+    if body is not None:
+        kwargs['json'] = body
+    resp = getattr(adapter, method)(url, **kwargs)
+    if resp.status_code >= 400:
+        raise RuntimeError('%s %s failed with %d: %s' %
+                           (method.upper(), url, resp.status_code, resp.text))
+    if resp.status_code == 204 or not resp.content:
+        return None
+    return resp.json()
+
+
+class ProviderFactory(object):
+    """Create resource providers, with their inventory, traits and
+    aggregates, through the placement REST API.
+    """
+
+    def __init__(self, adapter):
+        self.adapter = adapter
+
+    def create(self, name, parent_uuid=None, inventory=None, traits=None,
+               aggregates=None):
+        body = {'name': name, 'uuid': uuidutils.generate_uuid()}
+        if parent_uuid is not None:
+            body['parent_provider_uuid'] = parent_uuid
+        provider = _call(self.adapter, 'post', '/resource_providers', body)
+        rp_uuid = provider['uuid']
+        generation = provider['generation']
+        url = '/resource_providers/%s' % rp_uuid
+        if inventory:
+            resp = _call(self.adapter, 'put', url + '/inventories', {
+                'inventories': inventory,
+                'resource_provider_generation': generation})
+            generation = resp['resource_provider_generation']
+        if traits:
+            resp = _call(self.adapter, 'put', url + '/traits', {
+                'traits': sorted(traits),
+                'resource_provider_generation': generation})
+            generation = resp['resource_provider_generation']
+        if aggregates:
+            _call(self.adapter, 'put', url + '/aggregates', {
+                'aggregates': sorted(aggregates),
+                'resource_provider_generation': generation})
+        return rp_uuid
+
+
+def _inventory(total, **kwargs):
+    inventory = {'total': total}
+    inventory.update(kwargs)
+    return inventory
+
+
+def build_providers(adapter, args):
+    """Generate the synthetic provider trees.
+
+    :returns: A list of the root provider UUIDs of the compute nodes.
+    """
+    factory = ProviderFactory(adapter)
+    for physnet in range(args.pfs):
+        _call(adapter, 'put', '/traits/' + PHYSNET_TRAIT % physnet)
+
+    pool_aggs = [uuidutils.generate_uuid() for _ in range(args.shared_pools)]
+    for index, agg in enumerate(pool_aggs):
+        factory.create(
+            'shared-storage-%d' % index,
+            inventory={'DISK_GB': _inventory(
+                args.computes * 1000, max_unit=2000)},
+            traits=[SHARING_TRAIT], aggregates=[agg])
+
+    computes = []
+    for index in range(args.computes):
+        aggregates = []
+        if pool_aggs:
+            aggregates.append(pool_aggs[index % len(pool_aggs)])
+        traits = CPU_TRAITS[:index % len(CPU_TRAITS) + 1]
+        root = factory.create('compute-%d' % index, traits=traits,
+                              aggregates=aggregates)
+        for numa in range(args.numa_nodes):
+            numa_uuid = factory.create(
+                'compute-%d-numa-%d' % (index, numa), parent_uuid=root,
+                inventory={
+                    'VCPU': _inventory(16, allocation_ratio=16.0),
+                    'MEMORY_MB': _inventory(65536, reserved=512)})
+            for pf in range(args.pfs):
+                factory.create(
+                    'compute-%d-numa-%d-pf-%d' % (index, numa, pf),
+                    parent_uuid=numa_uuid,
+                    inventory={'SRIOV_NET_VF': _inventory(64)},
+                    traits=[PHYSNET_TRAIT % pf])
+        computes.append(root)
+    return computes
+
+
+def _allocation_candidates_url(args):
+    url = '/allocation_candidates?resources=%s' % args.resources
+    if args.required:
+        url += '&required=%s' % args.required
+    if args.limit:
+        url += '&limit=%d' % args.limit
+    return url
+
+
+def bench_allocation_candidates(adapter, recorder, args):
+    url = _allocation_candidates_url(args)
+    candidates = []
+    for _ in range(args.iterations):
+        resp = recorder.measure(
+            'GET /allocation_candidates', _call, adapter, 'get', url)
+        candidates.append(len(resp['allocation_requests']))
+    return resp['allocation_requests'], candidates
+
+
+def bench_allocations(adapter, recorder, alloc_reqs, args):
+    if not alloc_reqs:
+        return
+    for _ in range(args.iterations):
+        consumer = uuidutils.generate_uuid()
+        url = '/allocations/%s' % consumer
+        body = dict(random.choice(alloc_reqs),
+                    project_id=uuidutils.generate_uuid(),
+                    user_id=uuidutils.generate_uuid(),
+                    consumer_generation=None)
+        recorder.measure('PUT /allocations', _call, adapter, 'put', url, body)
+        _call(adapter, 'delete', url)
+
+
+def bench_update_from_provider_tree(adapter, recorder, computes, args):
+    client = report.SchedulerReportClient(adapter=adapter)
+    ctx = nova_context.get_admin_context()
+    for _ in range(args.iterations):
+        root = random.choice(computes)
+        ptree = client.get_provider_tree_and_ensure_root(ctx, root)
+        # The periodic update most often finds nothing to flush...
+        recorder.measure('update_from_provider_tree (unchanged)',
+                         client.update_from_provider_tree, ctx, ptree)
+        # ...but occasionally the inventory of a child provider changes.
+        _bump_reserved(ptree, root)
+        recorder.measure('update_from_provider_tree (changed)',
+                         client.update_from_provider_tree, ctx, ptree)
+
+
+def _bump_reserved(ptree, root):
+    children = ptree.get_provider_uuids(root)[1:] or [root]
+    data = ptree.data(random.choice(children))
+    inventory = data.inventory
+    for inv in inventory.values():
+        inv['reserved'] = (inv.get('reserved', 0) + 1) % inv['total']
+    ptree.update_inventory(data.uuid, inventory)
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Benchmark placement against synthetic provider trees.')
+    parser.add_argument('--connection', default='sqlite://',
+                        help='SQLAlchemy connection string of the placement '
+                             'database. The schema is created if needed.')
+    parser.add_argument('--computes', type=int, default=100,
+                        help='Number of compute node provider trees.')
+    parser.add_argument('--numa-nodes', type=int, default=2,
+                        help='NUMA node child providers per compute node.')
+    parser.add_argument('--pfs', type=int, default=2,
+                        help='Physical function child providers per NUMA '
+                             'node.')
+    parser.add_argument('--shared-pools', type=int, default=4,
+                        help='Sharing storage providers, each in its own '
+                             'aggregate.')
+    parser.add_argument('--iterations', type=int, default=20,
+                        help='Number of samples taken per operation.')
+    parser.add_argument('--resources',
+                        default='VCPU:1,MEMORY_MB:512,DISK_GB:10',
+                        help='The resources of GET /allocation_candidates.')
+    parser.add_argument('--required', default=None,
+                        help='The required traits of '
+                             'GET /allocation_candidates.')
+    parser.add_argument('--limit', type=int, default=0,
+                        help='The limit of GET /allocation_candidates.')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed of the random choices made.')
+    parser.add_argument('--output', default=None,
+                        help='File the JSON results are written to. Defaults '
+                             'to stdout.')
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = _parse_args(argv)
+    random.seed(args.seed)
+    CONF([], project='nova', default_config_files=[])
+    CONF.set_override('connection', args.connection,
+                      group='placement_database')
+    db_api.configure(CONF)
+    migration.db_sync(database='placement')
+    recorder = Recorder(QueryCounter(db_api.get_placement_engine()))
+
+    with direct.PlacementDirect(CONF, latest_microversion=True) as adapter:
+        start = time.time()
+        computes = build_providers(adapter, args)
+        setup = time.time() - start
+        alloc_reqs, candidates = bench_allocation_candidates(
+            adapter, recorder, args)
+        bench_allocations(adapter, recorder, alloc_reqs, args)
+        bench_update_from_provider_tree(adapter, recorder, computes, args)
+
+    results = collections.OrderedDict([
+        ('config', vars(args)),
+        ('setup_seconds', setup),
+        ('allocation_candidates', _stats(candidates)),
+        ('operations', recorder.summary()),
+    ])
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))